@@ -0,0 +1,119 @@
+"""
+Texas Hold'em Batch Hand Evaluator (batch_evaluator)
+
+Description:
+    This module scores large batches of hands at once with NumPy. Each row of cards is
+    reduced to the same prime-product keys hand_evaluator uses, and the keys are looked up
+    in sorted copies of its tables with np.searchsorted, so strengths agree exactly with
+    HoldemGame._set_player_hand/_set_winners.
+
+    Keys of disjoint sets of cards combine by multiplying their products and adding their
+    suit counts, so callers scoring many hands that share cards (one board against many
+    holdings, say) can build the shared keys once and broadcast them with card_keys() and
+    evaluate_keys().
+
+    Cards are given as Card.index values (suit*13 + rank). Keys only reachable with combined
+    decks (more than four of a rank) aren't in the sorted tables and fall back to
+    hand_evaluator one hand at a time.
+"""
+
+import numpy as np
+import hand_evaluator
+
+_PRIMES = np.array(hand_evaluator.PRIMES, dtype=np.int64)
+_tables = None
+
+def _get_tables():
+    """
+    Helper function to build the sorted key/strength arrays on first use.
+    """
+    global _tables
+    if _tables is None:
+        hand_evaluator.build_tables((5, 6, 7))
+        tables = []
+        for table in (hand_evaluator.RANK_TABLE, hand_evaluator.FLUSH_TABLE):
+            keys = np.array(sorted(table), dtype=np.int64)
+            values = np.array([table[k] for k in keys], dtype=np.int64)
+            tables.append((keys, values))
+        _tables = tables
+    return _tables
+
+def _lookup(keys, values, products):
+    """
+    Helper function to look up products in a sorted table.
+
+    Returns:
+        Tuple of the strengths found and a boolean array of which products were found.
+    """
+    idx = np.searchsorted(keys, products)
+    np.minimum(idx, len(keys) - 1, out=idx)
+    return values[idx], keys[idx] == products
+
+def card_keys(cards):
+    """
+    Computes the lookup keys of sets of cards.
+
+    Args:
+        cards (int[]): Array of Card.index values; the last axis holds each set's cards
+
+    Returns:
+        Tuple of the rank prime products, the per-suit prime products (with a trailing axis
+        of 4) and the per-suit card counts (likewise).
+    """
+    cards = np.asarray(cards, dtype=np.int64)
+    primes = _PRIMES[cards % 13]
+    suits = cards // 13
+    shape = cards.shape[:-1] + (4,)
+    suit_products = np.empty(shape, dtype=np.int64)
+    suit_counts = np.empty(shape, dtype=np.int64)
+    for s in range(4):
+        in_suit = suits == s
+        suit_products[..., s] = np.where(in_suit, primes, 1).prod(axis=-1)
+        suit_counts[..., s] = in_suit.sum(axis=-1)
+    return primes.prod(axis=-1), suit_products, suit_counts
+
+def evaluate_keys(products, suit_products, suit_counts):
+    """
+    Computes hand strengths from lookup keys.
+
+    Args:
+        products (int[]): Rank prime products of each hand
+        suit_products (int[]): Per-suit prime products, shaped like products plus an axis of 4
+        suit_counts (int[]): Per-suit card counts, shaped like suit_products
+
+    Returns:
+        Array of strengths shaped like products.
+    """
+    (rank_keys, rank_values), (flush_keys, flush_values) = _get_tables()
+    shape = np.shape(products)
+    products = np.ravel(products)
+    suit_products = np.reshape(suit_products, (-1, 4))
+    suit_counts = np.reshape(suit_counts, (-1, 4))
+
+    strengths, found = _lookup(rank_keys, rank_values, products)
+    #combined-deck hands aren't in the sorted tables
+    for i in np.flatnonzero(~found):
+        strengths[i] = hand_evaluator.RANK_TABLE[int(products[i])]
+    #at most one suit can hold a flush in a single-deck hand, but check all four
+    for s in range(4):
+        rows = np.flatnonzero(suit_counts[:, s] >= 5)
+        if len(rows) == 0:
+            continue
+        flush, found = _lookup(flush_keys, flush_values, suit_products[rows, s])
+        for i in np.flatnonzero(~found):
+            flush[i] = hand_evaluator.FLUSH_TABLE[int(suit_products[rows[i], s])]
+        strengths[rows] = np.maximum(strengths[rows], flush)
+    return strengths.reshape(shape)
+
+def evaluate_batch(cards):
+    """
+    Computes the strength and hand type of every row in a batch of hands.
+
+    Args:
+        cards (int[][]): (N, 7) array of Card.index values; 5 or 6 columns also work
+
+    Returns:
+        Tuple of an (N,) int64 array of strengths and an (N,) array of Hands enums.
+    """
+    strengths = evaluate_keys(*card_keys(cards))
+    return strengths, strengths >> hand_evaluator.HAND_SHIFT
@@ -0,0 +1,332 @@
+"""
+Texas Hold'em Batched Game Engine (batched_engine)
+
+Description:
+    This module plays many Texas Hold'em tables in lockstep. Instead of one HoldemGame object
+    graph per table, every piece of game state is a NumPy array indexed by table (and by seat
+    where it belongs to a player), and a step applies one action per table at once. It
+    follows the betting rules of HoldemGame.make_bid()/call()/check()/fold(), _end_move() and
+    _process_round() move for move, including who deals first, burn cards and how the pot
+    is awarded, so a policy trained here plays the same game as the GUI.
+
+    Seats keep HoldemGame's turn order: actor is the seat index of the player whose turn it
+    is, as HoldemGame.actor is, and every table has the same number of seats.
+
+    Cards are Card.index values (suit*13 + rank), with -1 for a card not dealt yet.
+"""
+
+import numpy as np
+import batch_evaluator
+from texas_holdem import HoldemGame, Moves, Player
+
+class BatchedHoldem:
+    """
+    Lockstep batch of Texas Hold'em tables.
+
+    Note:
+        Call shuffle() to deal the first hand. Finished tables ignore further actions until
+        they are shuffled again.
+
+    Args:
+        num_tables (int): Number of tables
+        num_players (int): Number of seats at every table
+        num_decks (int, optional): Number of 52-card sets per deck
+        balance (int, optional): Initial balance of every seat
+        seed (int, optional): Seed of the random number generator the decks shuffle with
+
+    Attributes:
+        num_tables (int): Number of tables
+        num_players (int): Number of seats at every table
+        num_decks (int): Number of 52-card sets per deck
+        pot (int[]): Amount of money in each table's pot
+        bid (int[]): Current highest bid at each table
+        lastraise (int[]): Last amount each table's bid was raised by
+        movecounter (int[]): Non-volatile moves left in each table's round
+        players_left (int[]): Seats at each table that haven't folded/bankrupted
+        street (int[]): 0 before the deal, 1 preflop, 2 flop, 3 turn, 4 river
+        actor (int[]): Seat whose turn it is at each table
+        dealer (int[]): Dealer seat at each table
+        finished (boolean[]): Denotes whether each table's game is over
+        everyone_folded (boolean[]): Denotes whether all except one player folded
+        balance (int[][]): Money left per table and seat
+        player_bid (int[][]): Money bid in the current round per table and seat
+        folded (boolean[][]): Denotes whether each seat has folded
+        bankrupt (boolean[][]): Denotes whether each seat has gone all in
+        hole (int[][][]): Two hole cards per table and seat
+        board (int[][]): Five flop cards per table
+        strength (int[][]): Showdown strength per table and seat, -1 if not scored
+        winners (boolean[][]): Seats that won each table's last game
+    """
+    def __init__(self, num_tables, num_players, num_decks=HoldemGame.DEF_NUM_DECKS,
+                    balance=Player.DEF_BALANCE, seed=None):
+        self.num_tables = num_tables
+        self.num_players = num_players
+        self.num_decks = num_decks
+        self._rng = np.random.RandomState(seed)
+        self._tables = np.arange(num_tables)
+        self._deck = np.zeros((num_tables, 52*num_decks), dtype=np.int64)
+        self._cursor = np.zeros(num_tables, dtype=np.int64)
+
+        shape = (num_tables, num_players)
+        self.pot = np.zeros(num_tables, dtype=np.int64)
+        self.bid = np.zeros(num_tables, dtype=np.int64)
+        self.lastraise = np.zeros(num_tables, dtype=np.int64)
+        self.movecounter = np.zeros(num_tables, dtype=np.int64)
+        self.players_left = np.zeros(num_tables, dtype=np.int64)
+        self.street = np.zeros(num_tables, dtype=np.int64)
+        self.actor = np.zeros(num_tables, dtype=np.int64)
+        self.dealer = np.zeros(num_tables, dtype=np.int64)
+        self.finished = np.ones(num_tables, dtype=bool)
+        self.everyone_folded = np.zeros(num_tables, dtype=bool)
+        self.balance = np.full(shape, balance, dtype=np.int64)
+        self.player_bid = np.zeros(shape, dtype=np.int64)
+        self.folded = np.zeros(shape, dtype=bool)
+        self.bankrupt = np.zeros(shape, dtype=bool)
+        self.hole = np.full(shape + (2,), -1, dtype=np.int64)
+        self.board = np.full((num_tables, 5), -1, dtype=np.int64)
+        self.strength = np.full(shape, -1, dtype=np.int64)
+        self.winners = np.zeros(shape, dtype=bool)
+
+    def _rows(self, tables):
+        """Helper function to turn a boolean table mask (or None for all) into indices."""
+        if tables is None:
+            return self._tables
+        tables = np.asarray(tables)
+        if tables.dtype == bool:
+            return np.flatnonzero(tables)
+        return tables
+
+    def _next_player(self, rows):
+        """
+        Helper function to pass the turn to the next seat after the actor that is still able
+        to make moves.
+        """
+        if len(rows) == 0:
+            return
+        seats = (self.actor[rows, None] + 1 + np.arange(self.num_players)) % self.num_players
+        able = ~(self.folded[rows[:, None], seats] | self.bankrupt[rows[:, None], seats])
+        self.actor[rows] = seats[np.arange(len(rows)), able.argmax(axis=1)]
+
+    def _draw(self, rows, count):
+        """Helper function to deal count cards to each row, in deck order."""
+        cards = self._deck[rows[:, None], self._cursor[rows, None] + np.arange(count)]
+        self._cursor[rows] += count
+        return cards
+
+    def _deal(self, rows):
+        """
+        Helper function to deal two cards to every seat that hasn't folded, one card at a
+        time starting from the actor, as HoldemGame.deal() does.
+        """
+        if len(rows) == 0:
+            return
+        seats = (self.actor[rows, None] + np.arange(self.num_players)) % self.num_players
+        dealt = ~self.folded[rows[:, None], seats]
+        order = np.cumsum(dealt, axis=1) - 1
+        count = dealt.sum(axis=1)
+        first = self._cursor[rows, None] + order
+        second = first + count[:, None]
+        table_rows, seat_cols = np.nonzero(dealt)
+        table_idx = rows[table_rows]
+        seat_idx = seats[table_rows, seat_cols]
+        self.hole[table_idx, seat_idx, 0] = self._deck[table_idx, first[table_rows, seat_cols]]
+        self.hole[table_idx, seat_idx, 1] = self._deck[table_idx, second[table_rows, seat_cols]]
+        self._cursor[rows] += 2 * count
+        self.street[rows] = 1
+
+    def _reveal(self, rows):
+        """Helper function to burn one card and reveal the next street's cards."""
+        #latest street first, so no table moves on by more than one street
+        for street, start, count in ((3, 4, 1), (2, 3, 1), (1, 0, 3)):
+            at = rows[self.street[rows] == street]
+            if len(at) == 0:
+                continue
+            self._cursor[at] += 1 #burn one as per standard poker rules (pointless, i know)
+            self.board[at, start:start+count] = self._draw(at, count)
+            self.street[at] = street + 1
+
+    def _resolve_game(self, rows):
+        """
+        Helper function to award the pot of finished games and set the seat after the
+        dealer to take an action next, as HoldemGame._resolve_game() does.
+        """
+        if len(rows) == 0:
+            return
+        self.finished[rows] = True
+        self.winners[rows] = False
+        folded_out = rows[self.everyone_folded[rows]]
+        if len(folded_out):
+            #the first seat still in, counting from the actor
+            seats = (self.actor[folded_out, None] + np.arange(self.num_players)) % self.num_players
+            first = (~self.folded[folded_out[:, None], seats]).argmax(axis=1)
+            self.winners[folded_out, seats[np.arange(len(folded_out)), first]] = True
+        shown = rows[~self.everyone_folded[rows]]
+        if len(shown):
+            contenders = ~self.folded[shown]
+            table_rows, seats = np.nonzero(contenders)
+            table_idx = shown[table_rows]
+            cards = np.hstack((self.hole[table_idx, seats], self.board[table_idx]))
+            strength = np.full((len(shown), self.num_players), -1, dtype=np.int64)
+            strength[table_rows, seats] = batch_evaluator.evaluate_batch(cards)[0]
+            self.strength[shown] = strength
+            self.winners[shown] = strength == strength.max(axis=1)[:, None]
+        num_winners = self.winners[rows].sum(axis=1)
+        self.balance[rows] += self.winners[rows] * (self.pot[rows] // num_winners)[:, None]
+        self.actor[rows] = (self.dealer[rows] + 1) % self.num_players
+
+    def _resolve_game_abrupt(self, rows):
+        """
+        Helper function to draw all remaining cards without actions being taken and end the
+        game, as HoldemGame._resolve_game_abrupt() does.
+        """
+        self._deal(rows[self.street[rows] == 0])
+        for _ in range(3):
+            self._reveal(rows)
+        self._resolve_game(rows)
+
+    def _process_round(self, rows):
+        """
+        Helper function to end a round of betting and either reveal more cards or end the
+        game, as HoldemGame._process_round() does.
+        """
+        self.movecounter[rows] = self.players_left[rows]
+        self.player_bid[rows] = 0
+        self.bid[rows] = 0
+        self.lastraise[rows] = 0
+        few = self.players_left[rows] <= 1
+        self._resolve_game_abrupt(rows[few])
+        rows = rows[~few]
+        river = self.street[rows] == 4
+        self._resolve_game(rows[river])
+        rows = rows[~river]
+        undealt = self.street[rows] == 0
+        self._reveal(rows[~undealt])
+        self._deal(rows[undealt])
+        self.actor[rows] = self.dealer[rows]
+        self._next_player(rows)
+
+    def _end_move(self, rows):
+        """
+        Helper function used after a move to either end the game abruptly, process the
+        round, or pass the turn on, as HoldemGame._end_move() and its callers do.
+        """
+        broke = self.players_left[rows] == 0
+        over = rows[broke]
+        self._resolve_game_abrupt(over)
+        self.bankrupt[over] = False
+        round_over = ~broke & (self.movecounter[rows] == 0)
+        self._process_round(rows[round_over])
+        self._next_player(rows[~round_over])
+
+    def shuffle(self, tables=None, decks=None):
+        """
+        Gets tables ready for a new game, as HoldemGame.shuffle() does.
+
+        Args:
+            tables (boolean[], optional): Mask or indices of tables to shuffle; default all
+            decks (int[][], optional): Card.index values to deal each shuffled table, in
+                order, instead of shuffling its deck randomly
+        """
+        rows = self._rows(tables)
+        if decks is None:
+            order = np.argsort(self._rng.rand(len(rows), 52*self.num_decks), axis=1)
+            decks = order % 52
+        self._deck[rows] = decks
+        self._cursor[rows] = 0
+        self.hole[rows] = -1
+        self.board[rows] = -1
+        self.strength[rows] = -1
+        self.winners[rows] = False
+        self.player_bid[rows] = 0
+        self.folded[rows] = False
+        self.bankrupt[rows] = False
+        broke = self.balance[rows] == 0
+        self.balance[rows] += broke * Player.DEF_BALANCE
+        self.bid[rows] = HoldemGame.BASE_BID
+        self.lastraise[rows] = 0
+        self.pot[rows] = 0
+        self.movecounter[rows] = self.num_players
+        self.players_left[rows] = self.num_players
+        self.street[rows] = 0
+        self.finished[rows] = False
+        self.everyone_folded[rows] = False
+        #rotate dealer
+        self.dealer[rows] = self.actor[rows]
+        self._next_player(rows)
+
+    def step(self, moves, amounts=None, tables=None):
+        """
+        Performs one action at every table for the seat whose turn it is.
+
+        Args:
+            moves (int[]): Moves enum of each table's action
+            amounts (int[], optional): Amount to bid/raise at each table, for RAISE_BID
+            tables (boolean[], optional): Mask or indices of tables to act at; default all
+
+        Returns:
+            Boolean array of which tables' actions were performed. Invalid actions, finished
+            tables and tables left out leave the table unchanged.
+        """
+        rows = self._rows(tables)
+        moves = np.array(moves, dtype=np.int64)[rows]
+        if amounts is None:
+            amounts = np.zeros(len(rows), dtype=np.int64)
+        else:
+            amounts = np.asarray(amounts, dtype=np.int64)[rows]
+        actor = self.actor[rows]
+        bid = self.bid[rows]
+        balance = self.balance[rows, actor]
+        player_bid = self.player_bid[rows, actor]
+
+        #a zero raise is a call, and a call without anything to match is a check
+        moves[(moves == Moves.RAISE_BID) & (amounts == 0)] = Moves.CALL
+        moves[(moves == Moves.CALL) & (player_bid == bid)] = Moves.CHECK
+        valid = ((moves == Moves.FOLD) | (moves == Moves.CALL) |
+                    ((moves == Moves.CHECK) & (player_bid >= bid)) |
+                    ((moves == Moves.RAISE_BID) & (amounts >= self.lastraise[rows]) &
+                        (balance >= amounts + bid - player_bid)))
+        valid &= ~self.finished[rows]
+
+        picked = np.flatnonzero(valid & (moves == Moves.RAISE_BID))
+        if len(picked):
+            raised = rows[picked]
+            seats = actor[picked]
+            self.movecounter[raised] = self.players_left[raised] - 1
+            self.lastraise[raised] = np.maximum(self.lastraise[raised], amounts[picked])
+            self.bid[raised] += amounts[picked]
+            owed = self.bid[raised] - player_bid[picked]
+            self.pot[raised] += owed
+            self.balance[raised, seats] -= owed
+            self.player_bid[raised, seats] = self.bid[raised]
+            all_in = self.balance[raised, seats] == 0
+            self.players_left[raised[all_in]] -= 1
+            self.bankrupt[raised[all_in], seats[all_in]] = True
+
+        picked = np.flatnonzero(valid & (moves == Moves.CALL))
+        if len(picked):
+            called = rows[picked]
+            seats = actor[picked]
+            owed = np.minimum(bid[picked] - player_bid[picked], balance[picked])
+            self.pot[called] += owed
+            self.player_bid[called, seats] += owed
+            self.balance[called, seats] -= owed
+            all_in = self.balance[called, seats] == 0
+            self.players_left[called[all_in]] -= 1
+            self.bankrupt[called[all_in], seats[all_in]] = True
+            self.movecounter[called] -= 1
+
+        self.movecounter[rows[valid & (moves == Moves.CHECK)]] -= 1
+
+        picked = valid & (moves == Moves.FOLD)
+        folded = rows[picked]
+        self.movecounter[folded] -= 1
+        self.players_left[folded] -= 1
+        self.folded[folded, actor[picked]] = True
+        last = picked & (self.players_left[rows] == 1)
+        self.everyone_folded[rows[last]] = True
+        self._resolve_game(rows[last])
+
+        self._end_move(rows[valid & ~last])
+        performed = np.zeros(self.num_tables, dtype=bool)
+        performed[rows] = valid
+        return performed
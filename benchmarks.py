@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+"""
+Texas Hold'em Benchmark Suite (benchmarks)
+
+Description:
+    This module times the hot paths of the engine and the GUI, so a change that makes
+    them slower shows up before it ships: building a Deck and drawing from it, scoring a
+    player's hand with _set_player_hand() for every Hands category, picking winners among
+    many players with _set_winners(), whole games driven through make_bid(), call(), check()
+    and fold(), and the GUI's _set_card_image() and _update_display().
+
+    Every benchmark is repeated several times, and reported as the median seconds per
+    operation along with the spread of the repeats (slowest less fastest, over the median).
+    Results are written as JSON, and can be compared against a baseline file written by an
+    earlier run: a benchmark counts as a regression, and the script exits with status 1,
+    when it is more than the tolerance slower than its baseline and the slowdown is also
+    larger than the spreads of both runs put together, so a noisy machine doesn't flag
+    changes that are within its own jitter.
+
+    The GUI benchmarks need gtk and a display to draw on; on a headless machine run the
+    script under a virtual display (e.g. xvfb-run). Without them they are skipped.
+
+"Constant" Variables:
+    DEF_REPEATS (int): Default number of times each benchmark is repeated
+    DEF_MIN_TIME (float): Default seconds each repeat of a benchmark runs for, at least
+    DEF_TOLERANCE (float): Default fraction a benchmark may slow down by before it counts as
+        a regression
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import hand_evaluator
+from texas_holdem import Card, Deck, HoldemGame, Moves, Player, RandomStream
+
+DEF_REPEATS = 5
+DEF_MIN_TIME = 1.0
+DEF_TOLERANCE = 0.10
+
+_SEED = 0
+_MANY_PLAYERS = 9
+#a seven-card hand of every Hands category, as (rank, suit) pairs
+_CATEGORY_HANDS = (
+    ((0, 0), (2, 1), (5, 2), (7, 3), (9, 0), (11, 1), (1, 2)),    #HIGH_CARD
+    ((0, 0), (0, 1), (5, 2), (7, 3), (9, 0), (11, 1), (1, 2)),    #PAIR
+    ((0, 0), (0, 1), (5, 2), (5, 3), (9, 0), (11, 1), (1, 2)),    #TWO_PAIR
+    ((0, 0), (0, 1), (0, 2), (7, 3), (9, 0), (11, 1), (1, 2)),    #THREE_OF_A_KIND
+    ((3, 0), (4, 1), (5, 2), (6, 3), (7, 0), (11, 1), (0, 2)),    #STRAIGHT
+    ((0, 0), (2, 0), (5, 0), (7, 0), (9, 0), (11, 1), (1, 2)),    #FLUSH
+    ((0, 0), (0, 1), (0, 2), (7, 3), (7, 0), (11, 1), (1, 2)),    #FULL_HOUSE
+    ((0, 0), (0, 1), (0, 2), (0, 3), (9, 0), (11, 1), (1, 2)),    #FOUR_OF_A_KIND
+    ((3, 0), (4, 0), (5, 0), (6, 0), (7, 0), (11, 1), (0, 2)),    #STRAIGHT_FLUSH
+    ((8, 2), (9, 2), (10, 2), (11, 2), (12, 2), (0, 1), (1, 0)),  #ROYAL_FLUSH
+)
+_CATEGORY_NAMES = ('high_card', 'pair', 'two_pair', 'three_of_a_kind', 'straight', 'flush',
+                    'full_house', 'four_of_a_kind', 'straight_flush', 'royal_flush')
+
+def _deck_construction():
+    """Helper function to benchmark building a single-deck Deck."""
+    rng = RandomStream(_SEED)
+    return (lambda: Deck(1, rng)), 1
+
+def _deck_draw_card():
+    """Helper function to benchmark drawing every card of a Deck, one at a time."""
+    deck = Deck(1, RandomStream(_SEED))
+    draw = deck.draw_card
+    def run():
+        deck.reset()
+        for _ in xrange(52):
+            draw()
+    return run, 52
+
+def _set_player_hand(category):
+    """Helper function to benchmark scoring a seven-card hand of a Hands category."""
+    def setup():
+        game = HoldemGame(verbose=False)
+        player = Player('benchmark')
+        player.hand_state.add_cards([Card(r, s) for r, s in _CATEGORY_HANDS[category]])
+        #strength() caches the hand's score, so every run starts from the cards
+        state = player.hand_state
+        def run():
+            state._strength = None
+            game._set_player_hand(player)
+        return run, 1
+    return setup
+
+def _set_winners():
+    """Helper function to benchmark picking the winners among many players at showdown."""
+    game = HoldemGame(verbose=False, rng=RandomStream(_SEED))
+    for i in range(_MANY_PLAYERS):
+        game.add_player(Player('benchmark %d' % i))
+    game.shuffle()
+    game.deal()
+    board = game.deck.deal_many(5)
+    for p in game.players:
+        p.strength = hand_evaluator.evaluate([p.card1, p.card2] + board)
+    return game._set_winners, 1
+
+def _full_hands():
+    """
+    Helper function to benchmark whole heads-up games, with moves picked at random among
+    raising, calling, checking and folding.
+    """
+    game = HoldemGame(verbose=False, rng=RandomStream(_SEED))
+    for i in range(2):
+        game.add_player(Player('benchmark %d' % i))
+    rng = RandomStream(_SEED + 1)
+    def run():
+        game.shuffle()
+        while not game.finished:
+            player = game.players[game.actor]
+            draw = rng.random()
+            if draw < 0.1 and player.bid < game.bid:
+                game.fold(player)
+            elif draw < 0.3 and player.balance > 2 * (game.bid + 100):
+                game.make_bid(player, max(100, game.lastraise))
+            elif player.bid < game.bid:
+                game.call(player)
+            else:
+                game.check(player)
+        for p in game.players:
+            #keep stacks from running dry and changing what the games look like
+            p.balance = Player.DEF_BALANCE
+    return run, 1
+
+def _gui():
+    """
+    Helper function to build the GUI for its benchmarks, with nothing recorded or saved.
+
+    Returns:
+        The PlayHoldem window, or None if there's no gtk or display.
+    """
+    try:
+        import play_holdem
+        gui = play_holdem.PlayHoldem(model_path=None, history_path=None)
+    except Exception:
+        return None
+    gui.game.observers = []
+    return gui
+
+def _gui_set_card_image(gui):
+    """Helper function to benchmark changing the image of a card on the table."""
+    cards = [Card(12, 3), Card(0, 0)]
+    def run():
+        cards.reverse()
+        gui._set_card_image(gui.card1_box, gui.card1, cards[0])
+    return run, 1
+
+def _gui_update_display(gui, changed):
+    """
+    Helper function to benchmark refreshing the whole GUI, either after the game moved on
+    or with nothing changed since the last refresh.
+    """
+    game = gui.game
+    game.shuffle()
+    game.deal()
+    balances = [gui.player.balance, gui.player.balance + 50]
+    def run():
+        if changed:
+            balances.reverse()
+            gui.player.balance = balances[0]
+            game.pot = balances[1]
+        gui._update_display(True)
+    return run, 1
+
+def benchmarks(gui=None):
+    """
+    Args:
+        gui (PlayHoldem, optional): Window to run the GUI benchmarks on; they're left out
+            without one
+
+    Returns:
+        List of (name, setup function) pairs. Each setup function returns a function to
+        time and the number of operations one call of it performs.
+    """
+    suite = [('deck.construction', _deck_construction),
+                ('deck.draw_card', _deck_draw_card)]
+    for category, name in enumerate(_CATEGORY_NAMES):
+        suite.append(('game.set_player_hand.' + name, _set_player_hand(category)))
+    suite.append(('game.set_winners.%d_players' % _MANY_PLAYERS, _set_winners))
+    suite.append(('game.full_hand', _full_hands))
+    if gui is not None:
+        suite.append(('gui.set_card_image', lambda: _gui_set_card_image(gui)))
+        suite.append(('gui.update_display.changed', lambda: _gui_update_display(gui, True)))
+        suite.append(('gui.update_display.unchanged',
+                        lambda: _gui_update_display(gui, False)))
+    return suite
+
+def run_benchmarks(repeats=DEF_REPEATS, min_time=DEF_MIN_TIME, gui=True):
+    """
+    Times every benchmark.
+
+    Args:
+        repeats (int, optional): Times each benchmark is repeated; the median counts
+        min_time (float, optional): Seconds each repeat runs for, at least
+        gui (boolean, optional): Run the GUI benchmarks too, if there's a display
+
+    Returns:
+        Dictionary of results, with each benchmark's median seconds per operation and the
+        spread of its repeats under 'results', and anything skipped, with why, under
+        'skipped'.
+    """
+    hand_evaluator.build_tables()
+    window = _gui() if gui else None
+    results = {}
+    for name, setup in benchmarks(window):
+        func, ops = setup()
+        timer = timeit.Timer(func)
+        number = 1
+        while timer.timeit(number) < min_time / 10:
+            number *= 10
+        number = max(1, int(number * min_time / max(timer.timeit(number), 1e-9)))
+        times = sorted(t / number / ops for t in timer.repeat(repeats, number))
+        middle = len(times) // 2
+        median = times[middle] if len(times) % 2 else (times[middle-1] + times[middle]) / 2
+        results[name] = dict(seconds_per_op=median, ops_per_second=1.0 / median,
+                        spread=(times[-1] - times[0]) / median)
+    skipped = {}
+    if window is None:
+        skipped['gui'] = "no gtk or display" if gui else "not requested"
+    return dict(python=platform.python_version(), machine=platform.machine(),
+                    results=results, skipped=skipped)
+
+def compare(current, baseline, tolerance=DEF_TOLERANCE):
+    """
+    Compares results against a baseline.
+
+    Args:
+        current (dict): Results of run_benchmarks()
+        baseline (dict): Earlier results of run_benchmarks()
+        tolerance (float, optional): Fraction a benchmark may slow down by before it counts
+            as a regression; it must also slow down by more than the spreads of both runs
+
+    Returns:
+        List of (name, baseline seconds per op, current seconds per op, ratio, regressed)
+        tuples for every benchmark in both.
+    """
+    rows = []
+    for name in sorted(current['results']):
+        if name not in baseline['results']:
+            continue
+        old = baseline['results'][name]
+        new = current['results'][name]
+        ratio = new['seconds_per_op'] / old['seconds_per_op']
+        #baselines written before spreads were recorded count as noiseless
+        noise = old.get('spread', 0.0) + new.get('spread', 0.0)
+        rows.append((name, old['seconds_per_op'], new['seconds_per_op'], ratio,
+                        ratio > 1 + max(tolerance, noise)))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times the engine's and GUI's hot paths.")
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('-b', '--baseline', help="compare against results in this JSON file")
+    parser.add_argument('-t', '--tolerance', type=float, default=DEF_TOLERANCE,
+                    help="slowdown allowed before a regression, as a fraction")
+    parser.add_argument('-r', '--repeats', type=int, default=DEF_REPEATS)
+    parser.add_argument('-m', '--min-time', type=float, default=DEF_MIN_TIME,
+                    help="seconds each repeat runs for, at least")
+    parser.add_argument('--no-gui', action='store_true', help="skip the GUI benchmarks")
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.repeats, args.min_time, gui=not args.no_gui)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for name, old, new, ratio, slower in compare(current, baseline, args.tolerance):
+            regressed = regressed or slower
+            print "%-40s %10.3fus %10.3fus %6.2fx%s" % (name, old * 1e6, new * 1e6, ratio,
+                            "  REGRESSION" if slower else "")
+    else:
+        for name, result in sorted(current['results'].items()):
+            print "%-40s %10.3fus %12.0f ops/sec" % (name, result['seconds_per_op'] * 1e6,
+                            result['ops_per_second'])
+    for name, reason in sorted(current['skipped'].items()):
+        print "skipped %s: %s" % (name, reason)
+    sys.exit(1 if regressed else 0)
@@ -0,0 +1,514 @@
+#!/usr/bin/env python
+"""
+Texas Hold'em Counterfactual Regret Minimization (cfr)
+
+Description:
+    This module trains a heads-up strategy for the computer player by counterfactual regret
+    minimization (CFR) over an abstracted version of HoldemGame's betting rules.
+
+    The abstract game keeps HoldemGame's five betting rounds (a blind round before the deal,
+    then preflop, flop, turn and river), with the same player (the one after the dealer)
+    acting first in each. Bets are abstracted to a single raise size per round and a cap on
+    raises per round, so a round ends on a call or on two checks as it does in the game, and
+    stacks are never deep enough in play to go all in. Cards are abstracted by a card
+    abstraction, which maps every deal to one bucket per player per round.
+
+    Training is chance-sampled CFR vectorized over batches of deals: each batch walks the
+    betting tree once with NumPy arrays holding every deal's reach probabilities and payoffs,
+    and adds the batch's regrets and strategy weights to the tables with np.bincount. With
+    plus=True regrets are floored at zero after every merge, as CFR+ does. Batches run on a
+    process pool against a snapshot of the regrets; their updates are merged in batch order
+    after every merge_batches batches, so a run gives the same tables for any number of
+    processes, and can be checkpointed and resumed at every merge.
+
+    Running the module as a script trains with the default abstraction, prints the
+    iterations (sampled deals) per second, and saves the average strategy to the policy
+    file (see policy) that the computer player plays from.
+
+"Constant" Variables:
+    FOLD, CALL, RAISE (int): Abstract actions; CALL checks when nothing is owed
+    NUM_ACTIONS (int): Number of abstract actions
+    NUM_ROUNDS (int): Number of betting rounds
+    DEF_BET_SIZES (int[]): Raise size of each betting round
+    DEF_MAX_RAISES (int): Raises allowed per betting round
+"""
+
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import numpy as np
+import batch_evaluator
+import hand_evaluator
+import policy
+import preflop_equity
+
+FOLD, CALL, RAISE = range(3)
+NUM_ACTIONS = 3
+NUM_ROUNDS = 5
+DEF_BET_SIZES = (100, 100, 100, 200, 200)
+DEF_MAX_RAISES = 2
+DEF_BATCH_SIZE = 4096
+DEF_MERGE_BATCHES = 8
+
+_DECISION, _FOLDED, _SHOWDOWN = range(3)
+
+class BettingTree:
+    """
+    Abstract heads-up betting tree, stored as flat per-node lists.
+
+    Note:
+        Player 0 acts first in every round, as the seat after the dealer does in
+        HoldemGame. Folding is only offered when facing a raise, since folding instead of
+        checking never gains anything.
+
+    Args:
+        bet_sizes (int[], optional): Raise size of each betting round
+        max_raises (int, optional): Raises allowed per betting round
+
+    Attributes:
+        kind (int[]): Per node, whether it's a decision, a fold or a showdown
+        player (int[]): Per node, the player to act, or the player who folded
+        round (int[]): Per node, the betting round
+        children (int[][]): Per node, the child of each action, or -1 if it isn't legal
+        contrib (tuple[]): Per node, the chips each player has put in the pot
+        history (tuple[]): Per node, the actions taken to reach it
+        offset (int[]): Per decision node, the index of its first info set
+        num_infosets (int): Number of info sets given the buckets per round
+    """
+    def __init__(self, bet_sizes=DEF_BET_SIZES, max_raises=DEF_MAX_RAISES):
+        self.bet_sizes = tuple(bet_sizes)
+        self.max_raises = max_raises
+        self.kind = []
+        self.player = []
+        self.round = []
+        self.children = []
+        self.contrib = []
+        self.history = []
+        self._index = {}
+        self._build(0, 0, 0, 0, False, (0, 0), ())
+
+    def _add(self, kind, player, rnd, contrib, history):
+        """Helper function to append a node and return its number."""
+        node = len(self.kind)
+        self.kind.append(kind)
+        self.player.append(player)
+        self.round.append(rnd)
+        self.children.append([-1] * NUM_ACTIONS)
+        self.contrib.append(contrib)
+        self.history.append(history)
+        self._index[history] = node
+        return node
+
+    def _end_round(self, rnd, contrib, history):
+        """Helper function to build whatever follows the end of a betting round."""
+        if rnd == NUM_ROUNDS - 1:
+            return self._add(_SHOWDOWN, -1, rnd, contrib, history)
+        return self._build(rnd + 1, 0, 0, 0, False, contrib, history)
+
+    def _build(self, rnd, player, owed, raises, checked, contrib, history):
+        """Helper function to build the subtree of a decision node."""
+        node = self._add(_DECISION, player, rnd, contrib, history)
+        children = self.children[node]
+        other = 1 - player
+        if owed:
+            children[FOLD] = self._add(_FOLDED, player, rnd, contrib, history + (FOLD,))
+        paid = list(contrib)
+        paid[player] += owed
+        paid = tuple(paid)
+        if owed or checked:
+            children[CALL] = self._end_round(rnd, paid, history + (CALL,))
+        else:
+            children[CALL] = self._build(rnd, other, 0, raises, True, paid, history + (CALL,))
+        if raises < self.max_raises:
+            size = self.bet_sizes[rnd]
+            raised = list(paid)
+            raised[player] += size
+            children[RAISE] = self._build(rnd, other, size, raises + 1, False, tuple(raised),
+                            history + (RAISE,))
+        return node
+
+    def assign_infosets(self, num_buckets):
+        """
+        Numbers the info sets of every decision node, one per bucket of its round.
+
+        Args:
+            num_buckets (int[]): Number of buckets in each betting round
+        """
+        self.num_buckets = tuple(num_buckets)
+        self.offset = [-1] * len(self.kind)
+        total = 0
+        for node, kind in enumerate(self.kind):
+            if kind == _DECISION:
+                self.offset[node] = total
+                total += num_buckets[self.round[node]]
+        self.num_infosets = total
+
+    def node(self, history):
+        """
+        Args:
+            history (tuple): Abstract actions taken since the start of the hand
+
+        Returns:
+            Number of the node the actions lead to.
+
+        Raises:
+            KeyError: The actions aren't a path through the tree.
+        """
+        return self._index[tuple(history)]
+
+    def legal(self, node):
+        """
+        Returns:
+            Boolean array of which actions are legal at a node.
+        """
+        return np.array([c >= 0 for c in self.children[node]])
+
+
+class HandTypeAbstraction:
+    """
+    Default card abstraction: the 169 canonical starting hands preflop, and the type of
+    the best hand made so far (the Hands enum) after the flop. The blind round before the
+    deal has a single bucket.
+    """
+    num_buckets = (1, 169, 10, 10, 10)
+
+    def buckets(self, hole, board):
+        """
+        Args:
+            hole (int[][][]): (N, 2, 2) array of each deal's hole cards per player, as
+                Card.index values
+            board (int[][]): (N, 5) array of each deal's flop cards
+
+        Returns:
+            (N, 2, NUM_ROUNDS) array of each player's bucket per round.
+        """
+        buckets = np.zeros(hole.shape[:2] + (NUM_ROUNDS,), dtype=np.int64)
+        ranks = hole % 13
+        high, low = ranks.max(axis=2), ranks.min(axis=2)
+        suited = (hole[..., 0] // 13 == hole[..., 1] // 13) & (high != low)
+        #same numbering as preflop_equity.hand_class()
+        buckets[..., 1] = np.where(suited, high*13 + low, low*13 + high)
+        for rnd, shown in ((2, 3), (3, 4), (4, 5)):
+            for p in range(2):
+                cards = np.hstack((hole[:, p], board[:, :shown]))
+                buckets[:, p, rnd] = batch_evaluator.evaluate_batch(cards)[1]
+        return buckets
+
+    def bucket(self, rnd, card1, card2, board):
+        """
+        Scalar form of buckets(), for a single player during play.
+
+        Args:
+            rnd (int): Betting round
+            card1 (Card): First card in the player's hand
+            card2 (Card): Second card in the player's hand
+            board (Card[]): Flop cards revealed so far
+
+        Returns:
+            The player's bucket in the round.
+        """
+        if rnd == 0:
+            return 0
+        elif rnd == 1:
+            return preflop_equity.hand_class(card1, card2)
+        indices = [card1.index, card2.index] + [c.index for c in board]
+        return hand_evaluator.hand_type(hand_evaluator.evaluate_indices(indices))
+
+
+def _regret_matching(regrets, legal):
+    """
+    Helper function to turn rows of regrets into strategies, playing uniformly at random
+    among the legal actions where no action has positive regret.
+    """
+    positive = np.maximum(regrets, 0.0) * legal
+    total = positive.sum(axis=1)[:, None]
+    uniform = legal / float(legal.sum())
+    return np.where(total > 0, positive / np.maximum(total, 1e-300), uniform)
+
+class _Batch:
+    """
+    Helper class that walks the betting tree once for a batch of sampled deals, playing
+    the strategies of a snapshot of the regrets and accumulating the batch's updates.
+    """
+    def __init__(self, tree, regrets, buckets, showdown):
+        self.tree = tree
+        self.regrets = regrets
+        self.regret_delta = np.zeros_like(regrets)
+        self.strategy_delta = np.zeros_like(regrets)
+        self.buckets = buckets
+        self.showdown = showdown
+        self.legal = [tree.legal(n) for n in range(len(tree.kind))]
+        #table cells of every deal's (bucket, action) pairs, per player and round
+        actions = np.arange(NUM_ACTIONS)
+        self.cells = [[((buckets[:, p, rnd] * NUM_ACTIONS)[:, None] + actions).ravel()
+                        for rnd in range(NUM_ROUNDS)] for p in range(2)]
+
+    def walk(self, node, reach):
+        """
+        Returns:
+            Player 0's payoff of every deal from the node on, given both players'
+            probabilities (reach[0] and reach[1]) of playing to it.
+        """
+        tree = self.tree
+        kind = tree.kind[node]
+        if kind == _FOLDED:
+            folder = tree.player[node]
+            #the folder loses what they put in; the other player wins it
+            payoff = tree.contrib[node][folder]
+            return np.full(len(self.showdown), -payoff if folder == 0 else payoff)
+        elif kind == _SHOWDOWN:
+            return self.showdown * tree.contrib[node][0]
+
+        player = tree.player[node]
+        rnd = tree.round[node]
+        size = tree.num_buckets[rnd]
+        start = tree.offset[node]
+        legal = self.legal[node]
+        bucket = self.buckets[:, player, rnd]
+        strategy = _regret_matching(self.regrets[start:start+size], legal)[bucket]
+        payoffs = np.zeros(strategy.shape)
+        for action, child in enumerate(tree.children[node]):
+            if child < 0:
+                continue
+            child_reach = list(reach)
+            child_reach[player] = reach[player] * strategy[:, action]
+            payoffs[:, action] = self.walk(child, child_reach)
+        payoff = (strategy * payoffs).sum(axis=1)
+
+        #regrets are from the acting player's point of view, weighted by the opponent's reach
+        sign = 1.0 if player == 0 else -1.0
+        regret = (payoffs - payoff[:, None]) * (sign * reach[1 - player])[:, None]
+        weight = strategy * reach[player][:, None]
+        cells = self.cells[player][rnd]
+        self.regret_delta[start:start+size] += np.bincount(cells, weights=regret.ravel(),
+                        minlength=size*NUM_ACTIONS).reshape(size, -1)
+        self.strategy_delta[start:start+size] += np.bincount(cells, weights=weight.ravel(),
+                        minlength=size*NUM_ACTIONS).reshape(size, -1)
+        return payoff
+
+
+def _deal_batch(rng, batch_size):
+    """
+    Helper function to deal a batch of heads-up hands from single decks.
+
+    Returns:
+        Tuple of the (N, 2, 2) hole cards and (N, 5) flop cards.
+    """
+    cards = np.argsort(rng.rand(batch_size, 52), axis=1)[:, :9]
+    return cards[:, :4].reshape(batch_size, 2, 2), cards[:, 4:]
+
+def _run_batch(tree, abstraction, regrets, batch_size, seed):
+    """
+    Helper function to sample a batch of deals and walk the tree for them.
+
+    Returns:
+        Tuple of the regret and strategy-weight updates.
+    """
+    rng = np.random.RandomState(seed)
+    hole, board = _deal_batch(rng, batch_size)
+    buckets = abstraction.buckets(hole, board)
+    strengths = [batch_evaluator.evaluate_batch(np.hstack((hole[:, p], board)))[0]
+                    for p in range(2)]
+    showdown = np.sign(strengths[0] - strengths[1]).astype(np.float64)
+    walker = _Batch(tree, regrets, buckets, showdown)
+    walker.walk(0, [np.ones(batch_size), np.ones(batch_size)])
+    return walker.regret_delta, walker.strategy_delta
+
+_worker_trees = {}
+
+def _train_task(args):
+    """
+    Helper function run by the workers to train on one batch against a snapshot of the
+    regrets.
+
+    Returns:
+        Tuple of the regret update, strategy-weight update and CPU seconds spent.
+    """
+    regrets, abstraction, bet_sizes, max_raises, batch_size, seed = args
+    began = time.time()
+    key = (bet_sizes, max_raises, abstraction.num_buckets)
+    tree = _worker_trees.get(key)
+    if tree is None:
+        tree = BettingTree(bet_sizes, max_raises)
+        tree.assign_infosets(abstraction.num_buckets)
+        _worker_trees[key] = tree
+    regret_delta, strategy_delta = _run_batch(tree, abstraction, regrets, batch_size, seed)
+    return regret_delta, strategy_delta, time.time() - began
+
+
+class CFRTrainer:
+    """
+    Regret and average-strategy tables of a heads-up CFR run, and the training loop.
+
+    Args:
+        abstraction (object, optional): Card abstraction with a num_buckets tuple and a
+            buckets(hole, board) method; HandTypeAbstraction by default
+        bet_sizes (int[], optional): Raise size of each betting round
+        max_raises (int, optional): Raises allowed per betting round
+        plus (boolean, optional): Floor regrets at zero after every merge (CFR+)
+
+    Attributes:
+        tree (BettingTree): The abstract betting tree
+        regrets (float[][]): Cumulative regret per info set and action
+        strategy_sum (float[][]): Reach-weighted sum of strategies per info set and action
+        iterations (int): Number of deals trained on
+        elapsed (float): Wall-clock seconds spent training, across resumes
+        cpu_time (float): Seconds the workers spent training
+    """
+    def __init__(self, abstraction=None, bet_sizes=DEF_BET_SIZES, max_raises=DEF_MAX_RAISES,
+                    plus=True):
+        self.abstraction = abstraction if abstraction is not None else HandTypeAbstraction()
+        self.bet_sizes = tuple(bet_sizes)
+        self.max_raises = max_raises
+        self.plus = plus
+        self.tree = BettingTree(bet_sizes, max_raises)
+        self.tree.assign_infosets(self.abstraction.num_buckets)
+        self.regrets = np.zeros((self.tree.num_infosets, NUM_ACTIONS))
+        self.strategy_sum = np.zeros((self.tree.num_infosets, NUM_ACTIONS))
+        self.iterations = 0
+        self.batches = 0
+        self.elapsed = 0.0
+        self.cpu_time = 0.0
+
+    def _params(self):
+        """Helper function to describe the run, for checking checkpoints against."""
+        return dict(abstraction=self.abstraction.__class__.__name__,
+                    num_buckets=list(self.abstraction.num_buckets),
+                    bet_sizes=list(self.bet_sizes), max_raises=self.max_raises, plus=self.plus)
+
+    def save(self, path):
+        """
+        Atomically writes the tables and progress to a checkpoint file.
+
+        Args:
+            path (string): Path of the checkpoint (.npz) file
+        """
+        state = dict(self._params(), iterations=self.iterations, batches=self.batches,
+                        elapsed=self.elapsed, cpu_time=self.cpu_time)
+        temp = path + '.tmp'
+        with open(temp, 'wb') as f:
+            np.savez(f, regrets=self.regrets, strategy_sum=self.strategy_sum,
+                            state=np.array(json.dumps(state)))
+        os.rename(temp, path)
+
+    def load(self, path):
+        """
+        Restores the tables and progress from a checkpoint file.
+
+        Args:
+            path (string): Path of the checkpoint (.npz) file
+
+        Raises:
+            ValueError: The checkpoint is from a run with different settings.
+        """
+        saved = np.load(path)
+        state = json.loads(str(saved['state']))
+        if any(state[k] != v for k, v in self._params().items()):
+            raise ValueError("checkpoint %s is from a different run" % path)
+        self.regrets = saved['regrets']
+        self.strategy_sum = saved['strategy_sum']
+        self.iterations = state['iterations']
+        self.batches = state['batches']
+        self.elapsed = state['elapsed']
+        self.cpu_time = state['cpu_time']
+
+    def _merge(self, results, batch_size):
+        """Helper function to add the updates returned by the workers, in batch order."""
+        for regret_delta, strategy_delta, cpu_time in results:
+            self.regrets += regret_delta
+            self.strategy_sum += strategy_delta
+            self.cpu_time += cpu_time
+            self.iterations += batch_size
+            self.batches += 1
+        if self.plus:
+            np.maximum(self.regrets, 0.0, out=self.regrets)
+
+    def train(self, iterations, processes=None, seed=0, batch_size=DEF_BATCH_SIZE,
+                    merge_batches=DEF_MERGE_BATCHES, checkpoint=None, report=None):
+        """
+        Trains until a number of sampled deals have been trained on in total, counting any
+        training already done or restored from the checkpoint.
+
+        Note:
+            Resuming from a checkpoint requires the same seed and batch_size as the
+            checkpointed run for the results to match an uninterrupted one.
+
+        Args:
+            iterations (int): Total number of deals to train on, rounded up to whole batches
+            processes (int, optional): Worker processes; None uses every core and 1 trains
+                in this process
+            seed (int, optional): Master seed the batch seeds are drawn from
+            batch_size (int, optional): Deals walked together per batch
+            merge_batches (int, optional): Batches run against one snapshot of the regrets
+                before their updates are merged
+            checkpoint (string, optional): Path to save progress to after every merge, and
+                to resume from if it already exists
+            report (function, optional): Called with the trainer after every merge
+        """
+        if checkpoint is not None and os.path.exists(checkpoint):
+            self.load(checkpoint)
+        master = random.Random(seed)
+        for _ in xrange(self.batches):
+            master.getrandbits(32)
+        goal = -(-iterations // batch_size)
+        pool = multiprocessing.Pool(processes) if processes != 1 else None
+        try:
+            while self.batches < goal:
+                began = time.time()
+                tasks = [(self.regrets, self.abstraction, self.bet_sizes, self.max_raises,
+                            batch_size, master.getrandbits(32))
+                            for _ in range(min(merge_batches, goal - self.batches))]
+                if pool is None:
+                    results = map(_train_task, tasks)
+                else:
+                    results = pool.map(_train_task, tasks)
+                self._merge(results, batch_size)
+                self.elapsed += time.time() - began
+                if checkpoint is not None:
+                    self.save(checkpoint)
+                if report is not None:
+                    report(self)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def iterations_per_second(self):
+        return self.iterations / self.elapsed if self.elapsed else 0.0
+
+    def average_strategy(self):
+        """
+        Returns:
+            Array of the average strategy per info set and action, which is what converges
+            to equilibrium. Info sets never reached play uniformly among legal actions.
+        """
+        legal = np.zeros(self.regrets.shape, dtype=bool)
+        tree = self.tree
+        for node, kind in enumerate(tree.kind):
+            if kind == _DECISION:
+                start = tree.offset[node]
+                legal[start:start + tree.num_buckets[tree.round[node]]] = tree.legal(node)
+        total = self.strategy_sum.sum(axis=1)[:, None]
+        uniform = legal / legal.sum(axis=1)[:, None].astype(np.float64)
+        return np.where(total > 0, self.strategy_sum / np.maximum(total, 1e-300), uniform)
+
+    def report(self):
+        """
+        Returns:
+            One-line summary of training progress and throughput.
+        """
+        return "%d iterations in %.2fs (%.0f iterations/sec, %d info sets)" % (
+                        self.iterations, self.elapsed, self.iterations_per_second(),
+                        self.tree.num_infosets)
+
+
+if __name__ == "__main__":
+    #usage: cfr.py [iterations [checkpoint]]
+    trainer = CFRTrainer()
+    def progress(t):
+        print t.report()
+    trainer.train(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+                    checkpoint=sys.argv[2] if len(sys.argv) > 2 else None, report=progress)
+    policy.save_policy(trainer)
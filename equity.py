@@ -0,0 +1,207 @@
+"""
+Texas Hold'em Equity Estimation (equity)
+
+Description:
+    This module estimates how often a hand wins, ties and loses against a number of random
+    opponents by Monte Carlo sampling of the unseen cards. Sampling is split into chunks that
+    are farmed out to a process pool, each chunk drawing from its own random.Random stream
+    seeded from a master seed, and running totals are reported as each chunk comes back.
+
+    Equity counts a tie as the share of the pot the hand would take, so a two-way tie adds
+    half a win.
+"""
+
+import math
+import multiprocessing
+import random
+import time
+import hand_evaluator
+
+DEF_CHUNK_SIZE = 2000
+
+class EquityEstimate:
+    """
+    Running totals of a Monte Carlo equity estimate.
+
+    Attributes:
+        samples (int): Number of deals sampled so far
+        wins (int): Deals where the hand beat every opponent
+        ties (int): Deals where the hand tied for best
+        losses (int): Deals where an opponent beat the hand
+        share (float): Sum of the pot shares won by the hand
+        share_sq (float): Sum of the squared pot shares, for the confidence interval
+    """
+    def __init__(self):
+        self.samples = 0
+        self.wins = 0
+        self.ties = 0
+        self.losses = 0
+        self.share = 0.0
+        self.share_sq = 0.0
+
+    def _merge(self, totals):
+        """Helper function to add the totals returned by a worker."""
+        samples, wins, ties, share, share_sq = totals
+        self.samples += samples
+        self.wins += wins
+        self.ties += ties
+        self.losses += samples - wins - ties
+        self.share += share
+        self.share_sq += share_sq
+
+    @property
+    def win(self):
+        return float(self.wins) / self.samples if self.samples else 0.0
+
+    @property
+    def tie(self):
+        return float(self.ties) / self.samples if self.samples else 0.0
+
+    @property
+    def loss(self):
+        return float(self.losses) / self.samples if self.samples else 0.0
+
+    @property
+    def equity(self):
+        return self.share / self.samples if self.samples else 0.0
+
+    def interval(self, z=1.96):
+        """
+        Normal-approximation confidence interval for the equity.
+
+        Args:
+            z (float, optional): Standard score of the interval (1.96 for 95%)
+
+        Returns:
+            Tuple of the lower and upper bounds.
+        """
+        if self.samples < 2:
+            return (0.0, 1.0)
+        mean = self.equity
+        variance = max(0.0, self.share_sq / self.samples - mean * mean)
+        half = z * math.sqrt(variance / (self.samples - 1))
+        return (max(0.0, mean - half), min(1.0, mean + half))
+
+
+def _sample_chunk(args):
+    """
+    Helper function run by the workers to sample one chunk of deals.
+
+    Returns:
+        Tuple of (samples, wins, ties, share, share_sq).
+    """
+    hole, board, num_opponents, remaining, samples, seed = args
+    rng = random.Random(seed)
+    draw = rng.sample
+    evaluate = hand_evaluator.evaluate_indices
+    missing = 5 - len(board)
+    needed = missing + 2 * num_opponents
+    wins = ties = 0
+    share = share_sq = 0.0
+    for _ in range(samples):
+        drawn = draw(remaining, needed)
+        full_board = board + drawn[:missing]
+        strength = evaluate(hole + full_board)
+        best = 0
+        tied = 0
+        for i in range(missing, needed, 2):
+            opponent = evaluate(drawn[i:i+2] + full_board)
+            if opponent > best:
+                best = opponent
+                tied = 0
+            if opponent == best:
+                tied += 1
+        if strength > best:
+            wins += 1
+            share += 1.0
+            share_sq += 1.0
+        elif strength == best:
+            ties += 1
+            split = 1.0 / (tied + 1)
+            share += split
+            share_sq += split * split
+    return (samples, wins, ties, share, share_sq)
+
+def iter_equity(hole_cards, board=(), num_opponents=1, samples=100000, time_budget=None,
+                processes=None, seed=None, num_decks=1, chunk_size=DEF_CHUNK_SIZE):
+    """
+    Estimates equity progressively, yielding the running estimate as each chunk finishes.
+
+    Note:
+        Sampling stops once the sample budget is used up or the time budget runs out,
+        whichever comes first. Chunks already handed to workers are always waited for.
+
+    Args:
+        hole_cards (Card[]): The hand's two cards
+        board (Card[], optional): Revealed cards in the flop; empty Card() slots are ignored
+        num_opponents (int, optional): Number of opponents holding random cards
+        samples (int, optional): Sample budget, or None to rely on time_budget alone
+        time_budget (float, optional): Seconds to keep sampling for, or None for no limit
+        processes (int, optional): Worker processes; None uses every core, 1 samples in-process
+        seed (int, optional): Master seed the per-chunk seeds are drawn from
+        num_decks (int, optional): Number of 52-card sets in the deck
+        chunk_size (int, optional): Deals sampled per task
+
+    Yields:
+        The same EquityEstimate object, updated after each chunk.
+    """
+    if samples is None and time_budget is None:
+        raise ValueError("a sample or time budget is required")
+    hole = [c.index for c in hole_cards]
+    known = [c.index for c in board if c.rank is not None]
+    remaining = range(52) * num_decks
+    for i in hole + known:
+        remaining.remove(i)
+    hand_evaluator.build_tables()
+
+    master = random.Random(seed)
+    deadline = None if time_budget is None else time.time() + time_budget
+    estimate = EquityEstimate()
+
+    def tasks():
+        left = samples
+        while (left is None or left > 0) and (deadline is None or time.time() < deadline):
+            size = chunk_size if left is None else min(chunk_size, left)
+            if left is not None:
+                left -= size
+            yield (hole, known, num_opponents, remaining, size, master.getrandbits(64))
+
+    if processes == 1:
+        for task in tasks():
+            estimate._merge(_sample_chunk(task))
+            yield estimate
+        return
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        #keep a couple of chunks queued per worker so the deadline is checked as we go
+        pending = []
+        backlog = 2 * (processes or multiprocessing.cpu_count())
+        for task in tasks():
+            pending.append(pool.apply_async(_sample_chunk, (task,)))
+            if len(pending) >= backlog:
+                estimate._merge(pending.pop(0).get())
+                yield estimate
+        for result in pending:
+            estimate._merge(result.get())
+            yield estimate
+    finally:
+        pool.terminate()
+
+def estimate_equity(hole_cards, board=(), num_opponents=1, **kwargs):
+    """
+    Estimates equity, returning only the final estimate.
+
+    Args:
+        hole_cards (Card[]): The hand's two cards
+        board (Card[], optional): Revealed cards in the flop
+        num_opponents (int, optional): Number of opponents holding random cards
+        **kwargs: Budget and pool options accepted by iter_equity()
+
+    Returns:
+        EquityEstimate with the final totals.
+    """
+    estimate = EquityEstimate()
+    for estimate in iter_equity(hole_cards, board, num_opponents, **kwargs):
+        pass
+    return estimate
@@ -0,0 +1,219 @@
+"""
+Texas Hold'em Exact Heads-Up Equity (exact_equity)
+
+Description:
+    This module computes exact heads-up equity once the flop is out by enumerating every
+    remaining turn/river runout against every opponent holding. Lookup keys are built once
+    for the known board, once per runout and once per holding, then combined for every
+    (runout, holding) pair by NumPy broadcasting, so nothing shared between matchups is
+    scored twice.
+
+    Against a random hand, every opponent holding together with the runout is a set of
+    unseen cards, and each such set turns up once for every way of splitting it into a
+    runout and a holding. The opponent's hand is scored once per set rather than once per
+    split, with the set's keys put together from keys of its pair and of a runout, so a
+    query from the flop takes about 55 milliseconds and one from the turn a few. The first
+    query of each street also builds its layout, which takes about a second from the flop.
+
+    Results are returned as equity.EquityEstimate objects whose totals are exact counts of
+    (runout, holding) matchups. Only single-deck games are enumerated.
+"""
+
+import itertools
+import numpy as np
+import batch_evaluator
+from equity import EquityEstimate
+
+_layouts = {}
+
+def _masks(cards):
+    """Helper function to compute the card bitmask of each row of Card.index values."""
+    cards = np.asarray(cards, dtype=np.int64)
+    return np.bitwise_or.reduce(np.left_shift(1, cards), axis=-1)
+
+def _known_cards(hole_cards, board):
+    """
+    Helper function to check a hand and board for an exact query.
+
+    Returns:
+        Tuple of the hand's and the board's Card.index values.
+    """
+    hole = [c.index for c in hole_cards]
+    known = [c.index for c in board if c.rank is not None]
+    if len(known) < 3:
+        raise ValueError("exact enumeration needs at least the flop")
+    if len(set(hole + known)) < len(hole) + len(known):
+        raise ValueError("the hand and the board share a card")
+    return hole, known
+
+def _totals(ahead):
+    """Helper function to total an array of hand-minus-opponent strength differences."""
+    estimate = EquityEstimate()
+    estimate.samples = int(ahead.size)
+    estimate.wins = int((ahead > 0).sum())
+    estimate.ties = int((ahead == 0).sum())
+    estimate.losses = estimate.samples - estimate.wins - estimate.ties
+    estimate.share = estimate.wins + estimate.ties / 2.0
+    estimate.share_sq = estimate.wins + estimate.ties / 4.0
+    return estimate
+
+def _enumerate(hole_cards, board, holdings):
+    """
+    Helper function to count wins, ties and losses against each holding on every runout.
+
+    Args:
+        hole_cards (Card[]): The hand's two cards
+        board (Card[]): Revealed cards in the flop; empty Card() slots are ignored
+        holdings (int[][]): Opponent holdings as pairs of Card.index values
+
+    Returns:
+        EquityEstimate with the exact totals.
+    """
+    hole, known = _known_cards(hole_cards, board)
+    dead = hole + known
+    live = [i for i in range(52) if i not in dead]
+
+    #drop holdings that use the hand's cards or the board's
+    holdings = np.asarray(holdings, dtype=np.int64).reshape(-1, 2)
+    holding_masks = _masks(holdings)
+    keep = (holding_masks & int(_masks(dead))) == 0
+    holdings = holdings[keep]
+    holding_masks = holding_masks[keep]
+    if len(holdings) == 0:
+        raise ValueError("every holding shares a card with the hand or the board")
+
+    runouts = list(itertools.combinations(live, 5 - len(known)))
+    runouts = np.array(runouts, dtype=np.int64).reshape(len(runouts), 5 - len(known))
+    runout_masks = _masks(runouts)
+
+    #keys of every full board: the known cards' keys combined with each runout's
+    known_product, known_suit_products, known_suit_counts = batch_evaluator.card_keys(known)
+    products, suit_products, suit_counts = batch_evaluator.card_keys(runouts)
+    products = products * known_product
+    suit_products = suit_products * known_suit_products
+    suit_counts = suit_counts + known_suit_counts
+
+    hole_product, hole_suit_products, hole_suit_counts = batch_evaluator.card_keys(hole)
+    strengths = batch_evaluator.evaluate_keys(products * hole_product,
+                    suit_products * hole_suit_products, suit_counts + hole_suit_counts)
+
+    #only score holdings that don't collide with the runout
+    runout_idx, held_idx = np.nonzero((runout_masks[:, None] & holding_masks[None, :]) == 0)
+    held_products, held_suit_products, held_suit_counts = batch_evaluator.card_keys(holdings)
+    opponents = batch_evaluator.evaluate_keys(
+                    products[runout_idx] * held_products[held_idx],
+                    suit_products[runout_idx] * held_suit_products[held_idx],
+                    suit_counts[runout_idx] + held_suit_counts[held_idx])
+    return _totals(strengths[runout_idx] - opponents)
+
+def _layout(num_live, num_runout):
+    """
+    Helper function to build, on first use, the layout of a query against a random hand
+    with the given numbers of live cards and runout cards. Cards are given as positions
+    within the live cards, and every set of runout and holding cards is split into a pair
+    and a runout-sized rest, so its keys can be put together from keys computed once.
+
+    Returns:
+        Tuple of the (runouts, num_runout) positions of every runout, the (pairs, 2)
+        positions of every pair, and for every set its pair's number, its rest's runout
+        number and the (sets, splits) runout numbers of the ways to split it.
+    """
+    key = (num_live, num_runout)
+    if key not in _layouts:
+        runouts = list(itertools.combinations(range(num_live), num_runout))
+        runouts = np.array(runouts, dtype=np.int64).reshape(len(runouts), num_runout)
+        pairs = np.array(list(itertools.combinations(range(num_live), 2)), dtype=np.int64)
+        sets = np.array(list(itertools.combinations(range(num_live), num_runout + 2)),
+                        dtype=np.int64)
+        pair_numbers = np.zeros((num_live, num_live), dtype=np.int64)
+        pair_numbers[pairs[:, 0], pairs[:, 1]] = np.arange(len(pairs))
+        if num_runout == 0:
+            rests = splits = np.zeros((len(sets), 1), dtype=np.int64)
+        else:
+            #number each runout by its positions, so the runout a split leaves is looked up
+            numbers = np.zeros((num_live,) * num_runout, dtype=np.int64)
+            numbers[tuple(runouts.T)] = np.arange(len(runouts))
+            rests = numbers[tuple(sets[:, 2:].T)]
+            splits = np.column_stack([numbers[tuple(sets[:, list(part)].T)] for part in
+                            itertools.combinations(range(num_runout + 2), num_runout)])
+        _layouts[key] = (runouts, pairs, pair_numbers[sets[:, 0], sets[:, 1]],
+                        rests.ravel(), splits)
+    return _layouts[key]
+
+def equity_vs_hand(hole_cards, board, opponent_cards):
+    """
+    Computes exact equity against a known hand.
+
+    Args:
+        hole_cards (Card[]): The hand's two cards
+        board (Card[]): Revealed cards in the flop (at least 3)
+        opponent_cards (Card[]): The opponent's two cards
+
+    Returns:
+        EquityEstimate with exact totals over every runout.
+
+    Raises:
+        ValueError: If any two of the cards are the same
+    """
+    opponent = [c.index for c in opponent_cards]
+    hole, known = _known_cards(hole_cards, board)
+    if len(set(hole + known + opponent)) < len(hole) + len(known) + 2:
+        raise ValueError("the opponent's hand shares a card with the hand or the board")
+    return _enumerate(hole_cards, board, [opponent])
+
+def equity_vs_range(hole_cards, board, opponent_range):
+    """
+    Computes exact equity against a range of hands, each weighted equally.
+
+    Note:
+        Holdings that share a card with the hand or the board are left out.
+
+    Args:
+        hole_cards (Card[]): The hand's two cards
+        board (Card[]): Revealed cards in the flop (at least 3)
+        opponent_range (Card[][]): The opponent's possible holdings, as pairs of cards
+
+    Returns:
+        EquityEstimate with exact totals over every runout and holding.
+
+    Raises:
+        ValueError: If every holding shares a card with the hand or the board
+    """
+    return _enumerate(hole_cards, board,
+                    [[c1.index, c2.index] for c1, c2 in opponent_range])
+
+def equity_vs_random(hole_cards, board):
+    """
+    Computes exact equity against every possible opponent holding.
+
+    Args:
+        hole_cards (Card[]): The hand's two cards
+        board (Card[]): Revealed cards in the flop (at least 3)
+
+    Returns:
+        EquityEstimate with exact totals over every runout and holding.
+
+    Raises:
+        ValueError: If the hand and the board share a card
+    """
+    hole, known = _known_cards(hole_cards, board)
+    live = np.array([i for i in range(52) if i not in hole + known], dtype=np.int64)
+    runouts, pairs, set_pairs, set_rests, splits = _layout(len(live), 5 - len(known))
+
+    known_product, known_suit_products, known_suit_counts = batch_evaluator.card_keys(known)
+    products, suit_products, suit_counts = batch_evaluator.card_keys(live[runouts])
+    products = products * known_product
+    suit_products = suit_products * known_suit_products
+    suit_counts = suit_counts + known_suit_counts
+    #the hand's strength on every runout
+    hole_product, hole_suit_products, hole_suit_counts = batch_evaluator.card_keys(hole)
+    strengths = batch_evaluator.evaluate_keys(products * hole_product,
+                    suit_products * hole_suit_products, suit_counts + hole_suit_counts)
+    #the opponent's strength on every set of unseen cards, whichever way it's split
+    pair_products, pair_suit_products, pair_suit_counts = batch_evaluator.card_keys(
+                    live[pairs])
+    opponents = batch_evaluator.evaluate_keys(
+                    products[set_rests] * pair_products[set_pairs],
+                    suit_products[set_rests] * pair_suit_products[set_pairs],
+                    suit_counts[set_rests] + pair_suit_counts[set_pairs])
+    return _totals(strengths[splits] - opponents[:, None])
@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+"""
+Texas Hold'em Card Abstraction Buckets (hand_buckets)
+
+Description:
+    This module groups hands into a small number of buckets per street by expected hand
+    strength (EHS): the pot share a hand takes on average against one random opponent, with
+    any flop cards still to come dealt at random. Hands of similar strength share a bucket,
+    which is what strategies trained by cfr are keyed on instead of the cards themselves.
+
+    Buckets are precomputed for every hand up to suit isomorphism (see hand_indexer) and
+    kept in a binary file that is memory-mapped when the module is imported, so looking up
+    a hand's bucket is an index computation and a single byte read. Running the module as a
+    script (re)generates the file.
+
+    Generating works street by street: the EHS of every canonical hand is estimated by
+    Monte Carlo sampling with NumPy in chunks farmed out to a process pool, and written to
+    a float32 file in a work directory as each chunk comes back, alongside a progress file
+    listing the finished chunks. An interrupted run picks up from the chunks already done.
+    Once every street's EHS is known, it is clustered into buckets by 1-D k-means (over a
+    fine histogram, so the river's hundred million hands cluster in a few passes), and
+    bucket 0 always holds the weakest hands.
+
+    Only generating the buckets needs NumPy; looking them up needs nothing beyond the
+    standard library.
+
+    File layout (little-endian):
+        header: magic 'HBKT', version (uint16), number of streets (uint16)
+        per street: hands (uint32), buckets (uint16), bytes per bucket (uint16),
+            byte offset of its buckets (uint64)
+        per street's buckets: uint8 or uint16 bucket[hands], by hand_indexer index
+
+"Constant" Variables:
+    BUCKET_PATH (string): Default path of the bucket file, next to this module
+    DEF_NUM_BUCKETS (int[]): Default number of buckets per street
+    DEF_SAMPLES (int[]): Default Monte Carlo samples per hand per street
+"""
+
+import json
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import hand_indexer
+
+BUCKET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hand_buckets.bin')
+DEF_NUM_BUCKETS = (169, 50, 50, 50)
+DEF_SAMPLES = (20000, 500, 200, 100)
+DEF_CHUNK_SIZE = 20000
+DEF_HISTOGRAM_BINS = 1 << 16
+
+_MAGIC = 'HBKT'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHH')
+_SECTION = struct.Struct('<IHHQ')
+_UINT16 = struct.Struct('<H')
+_MAX_ROWS = 200000
+_BLOCK = 1 << 20
+
+_mmap = None
+_sections = []
+
+def load_buckets(path=BUCKET_PATH):
+    """
+    Memory-maps a bucket file, replacing any buckets already loaded.
+
+    Args:
+        path (string, optional): Path of the bucket file
+
+    Returns:
+        True if the file was loaded, False if it doesn't exist or isn't a bucket file.
+    """
+    global _mmap, _sections
+    if not os.path.exists(path):
+        return False
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count = _HEADER.unpack_from(mapped, 0)
+    if magic != _MAGIC or version != _VERSION:
+        mapped.close()
+        return False
+    _mmap = mapped
+    _sections = [_SECTION.unpack_from(mapped, _HEADER.size + i*_SECTION.size)
+                    for i in range(count)]
+    return True
+
+def _section(street):
+    """Helper function to find a street's section of the bucket file."""
+    if street >= len(_sections):
+        raise LookupError("no hand buckets loaded; run hand_buckets.py")
+    return _sections[street]
+
+def num_buckets(street):
+    """
+    Args:
+        street (int): hand_indexer.PREFLOP, FLOP, TURN or RIVER
+
+    Returns:
+        Number of buckets on the street.
+    """
+    return _section(street)[1]
+
+def index_bucket(street, idx):
+    """
+    Args:
+        street (int): hand_indexer.PREFLOP, FLOP, TURN or RIVER
+        idx (int): Canonical index of a hand on the street
+
+    Returns:
+        Bucket of the hand.
+    """
+    hands, buckets, itemsize, offset = _section(street)
+    if itemsize == 1:
+        return ord(_mmap[offset + idx])
+    return _UINT16.unpack_from(_mmap, offset + idx*itemsize)[0]
+
+def index_buckets(street, indices):
+    """
+    Batch form of index_bucket(); needs NumPy.
+
+    Args:
+        street (int): hand_indexer.PREFLOP, FLOP, TURN or RIVER
+        indices (int[]): Canonical indices of hands on the street
+
+    Returns:
+        Array of the bucket of each hand.
+    """
+    import numpy as np
+    hands, buckets, itemsize, offset = _section(street)
+    table = np.frombuffer(_mmap, dtype='<u%d' % itemsize, count=hands, offset=offset)
+    return table[np.asarray(indices, dtype=np.int64)].astype(np.int64)
+
+def bucket(card1, card2, board=()):
+    """
+    Args:
+        card1 (Card): First card in the player's hand
+        card2 (Card): Second card in the player's hand
+        board (Card[], optional): Flop cards; empty slots (Card()) are skipped, so
+            HoldemGame.card1 to card5 can be passed as they are
+
+    Returns:
+        Bucket of the hand on the street given by the number of flop cards revealed.
+    """
+    cards = [card1.index, card2.index] + [c.index for c in board if c.rank is not None]
+    street = hand_indexer.STREET_CARDS.index(len(cards))
+    return index_bucket(street, hand_indexer.index(cards))
+
+
+def _ehs(cards, samples, rng):
+    """
+    Helper function to estimate the expected hand strength of rows of hole cards followed
+    by known flop cards, against one random opponent.
+    """
+    import numpy as np
+    import batch_evaluator
+    hands, known = cards.shape
+    needed = 2 + 7 - known
+    rows = hands * samples
+    used = np.repeat(cards, samples, axis=0)
+    order = rng.rand(rows, 52)
+    order[np.arange(rows)[:, None], used] = 2.0
+    drawn = np.argsort(order, axis=1)[:, :needed]
+    board = np.hstack((used[:, 2:], drawn[:, 2:]))
+    hero = batch_evaluator.evaluate_batch(np.hstack((used[:, :2], board)))[0]
+    villain = batch_evaluator.evaluate_batch(np.hstack((drawn[:, :2], board)))[0]
+    share = (hero > villain) + 0.5 * (hero == villain)
+    return share.reshape(hands, samples).mean(axis=1)
+
+def _ehs_task(args):
+    """
+    Helper function run by the workers to estimate the EHS of a chunk of canonical hands.
+
+    Returns:
+        Tuple of (street, start, float32 EHS array).
+    """
+    import numpy as np
+    street, start, stop, samples, seed = args
+    rng = np.random.RandomState(seed)
+    cards = hand_indexer.unindex_batch(street, np.arange(start, stop))
+    block = max(1, _MAX_ROWS // samples)
+    ehs = np.concatenate([_ehs(cards[i:i+block], samples, rng)
+                    for i in range(0, len(cards), block)])
+    return (street, start, ehs.astype(np.float32))
+
+def _cluster(ehs, k, bins=DEF_HISTOGRAM_BINS):
+    """
+    Helper function to split EHS values into k buckets by 1-D k-means.
+
+    Returns:
+        Sorted array of the k-1 EHS values separating neighbouring buckets.
+    """
+    import numpy as np
+    counts = np.zeros(bins)
+    for i in range(0, len(ehs), _BLOCK):
+        counts += np.bincount(np.minimum((ehs[i:i+_BLOCK] * bins).astype(np.int64), bins - 1),
+                        minlength=bins)
+    values = (np.arange(bins) + 0.5) / bins
+    #start from equal-frequency buckets
+    cumulative = np.cumsum(counts) / counts.sum()
+    centers = values[np.minimum(np.searchsorted(cumulative, (np.arange(k) + 0.5) / k), bins-1)]
+    for _ in range(100):
+        bounds = (centers[1:] + centers[:-1]) / 2
+        members = np.searchsorted(bounds, values)
+        weight = np.bincount(members, weights=counts, minlength=k)
+        total = np.bincount(members, weights=counts * values, minlength=k)
+        moved = np.where(weight > 0, total / np.maximum(weight, 1e-300), centers)
+        moved.sort()
+        if np.allclose(moved, centers):
+            break
+        centers = moved
+    return (centers[1:] + centers[:-1]) / 2
+
+def _save_progress(path, state):
+    """Helper function to atomically write the progress of a run."""
+    temp = path + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump(state, f)
+    os.rename(temp, path)
+
+def generate_buckets(path=BUCKET_PATH, num_buckets=DEF_NUM_BUCKETS, samples=DEF_SAMPLES,
+                    processes=None, seed=0, chunk_size=DEF_CHUNK_SIZE, work_dir=None):
+    """
+    Computes every street's buckets and writes them to a file, then loads it. Progress is
+    kept in a work directory, and a run interrupted at any point resumes from it.
+
+    Note:
+        Resuming requires the same samples, seed and chunk_size as the interrupted run.
+
+    Args:
+        path (string, optional): Path of the bucket file to write
+        num_buckets (int[], optional): Number of buckets per street, at most 65536 each
+        samples (int[], optional): Monte Carlo samples per hand per street
+        processes (int, optional): Worker processes; None uses every core
+        seed (int, optional): Master seed the per-chunk seeds are drawn from
+        chunk_size (int, optional): Hands per chunk of work
+        work_dir (string, optional): Directory to keep the EHS files and progress in;
+            path + '.work' by default
+    """
+    import numpy as np
+    import hand_evaluator
+    work_dir = work_dir or path + '.work'
+    if not os.path.isdir(work_dir):
+        os.makedirs(work_dir)
+    params = dict(samples=list(samples), seed=seed, chunk_size=chunk_size)
+    progress = os.path.join(work_dir, 'progress.json')
+    state = dict(params, done=[[] for _ in hand_indexer.STREET_CARDS])
+    if os.path.exists(progress):
+        with open(progress) as f:
+            state = json.load(f)
+        if any(state[k] != v for k, v in params.items()):
+            raise ValueError("work directory %s is from a different run" % work_dir)
+
+    hand_evaluator.build_tables()
+    master = random.Random(seed)
+    ehs_files = []
+    tasks = []
+    for street in range(len(hand_indexer.STREET_CARDS)):
+        hands = hand_indexer.size(street)
+        ehs_path = os.path.join(work_dir, 'ehs_%d.f32' % street)
+        ehs_files.append(np.memmap(ehs_path, dtype=np.float32,
+                        mode='r+' if os.path.exists(ehs_path) else 'w+', shape=(hands,)))
+        done = set(state['done'][street])
+        for start in range(0, hands, chunk_size):
+            chunk_seed = master.getrandbits(32)
+            if start not in done:
+                tasks.append((street, start, min(start + chunk_size, hands),
+                                samples[street], chunk_seed))
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for street, start, ehs in pool.imap_unordered(_ehs_task, tasks):
+            ehs_files[street][start:start + len(ehs)] = ehs
+            ehs_files[street].flush()
+            state['done'][street].append(start)
+            _save_progress(progress, state)
+    finally:
+        pool.terminate()
+
+    sections = []
+    for street, ehs in enumerate(ehs_files):
+        k = num_buckets[street]
+        dtype = np.uint8 if k <= 256 else np.uint16
+        if k >= len(ehs):
+            #every hand gets its own bucket, in order of strength
+            buckets = np.empty(len(ehs), dtype=dtype)
+            buckets[np.argsort(ehs, kind='mergesort')] = np.arange(len(ehs))
+        else:
+            bounds = _cluster(ehs, k)
+            buckets = np.empty(len(ehs), dtype=dtype)
+            for i in range(0, len(ehs), _BLOCK):
+                buckets[i:i+_BLOCK] = np.searchsorted(bounds, ehs[i:i+_BLOCK])
+        sections.append((min(k, len(ehs)), buckets))
+
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(sections)))
+        offset = _HEADER.size + len(sections)*_SECTION.size
+        for k, buckets in sections:
+            f.write(_SECTION.pack(len(buckets), k, buckets.itemsize, offset))
+            offset += buckets.nbytes
+        for _, buckets in sections:
+            f.write(buckets.astype('<u%d' % buckets.itemsize).tostring())
+    os.rename(temp, path)
+    load_buckets(path)
+
+
+class BucketAbstraction:
+    """
+    Card abstraction for cfr.CFRTrainer that uses the loaded buckets. The blind round before
+    the deal has a single bucket.
+    """
+    def __init__(self):
+        self.num_buckets = (1,) + tuple(num_buckets(s)
+                        for s in range(len(hand_indexer.STREET_CARDS)))
+
+    def buckets(self, hole, board):
+        """
+        Args:
+            hole (int[][][]): (N, 2, 2) array of each deal's hole cards per player, as
+                Card.index values
+            board (int[][]): (N, 5) array of each deal's flop cards
+
+        Returns:
+            (N, 2, 5) array of each player's bucket per betting round.
+        """
+        import numpy as np
+        result = np.zeros(hole.shape[:2] + (1 + len(hand_indexer.STREET_CARDS),),
+                        dtype=np.int64)
+        for street, known in enumerate(hand_indexer.STREET_CARDS):
+            for p in range(2):
+                cards = np.hstack((hole[:, p], board[:, :known - 2]))
+                result[:, p, street + 1] = index_buckets(street,
+                                hand_indexer.index_batch(cards))
+        return result
+
+    def bucket(self, rnd, card1, card2, board):
+        """
+        Scalar form of buckets(), for a single player during play.
+
+        Args:
+            rnd (int): Betting round
+            card1 (Card): First card in the player's hand
+            card2 (Card): Second card in the player's hand
+            board (Card[]): Flop cards revealed so far
+
+        Returns:
+            The player's bucket in the round.
+        """
+        if rnd == 0:
+            return 0
+        return bucket(card1, card2, board)
+
+load_buckets()
+
+
+if __name__ == "__main__":
+    #usage: hand_buckets.py [processes]
+    generate_buckets(processes=int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,424 @@
+"""
+Texas Hold'em Hand Evaluator (hand_evaluator)
+
+Description:
+    This module maps a set of 5 to 7 cards to a single comparable strength integer using
+    precomputed lookup tables keyed on prime products of card ranks. Two tables are kept:
+    one for the rank multiset of all cards (every non-flush hand) and one for the ranks of
+    the cards sharing a flush suit. A hand's strength is the larger of the two lookups.
+
+    Strengths are packed as category << 20 followed by five 4-bit kicker ranks, so the
+    Hands enum value and the tiebreak ranks used by texas_holdem can be read straight back
+    out of the integer. Straights only use the first kicker (the straight's high card).
+
+    Tables fill in lazily: a hand is scored the first time its rank product is seen and
+    memoized from then on. build_tables() fills them for every single-deck hand up front,
+    which long-running simulations should call once before timing anything (or before
+    forking worker processes, so the tables are shared).
+
+    HandState keeps the same keys, plus rank/suit histograms and rank masks, for a hand
+    that grows a card at a time, so the best hand made so far and any straight or flush
+    draws can be read at every street without rescanning the cards.
+
+Attributes:
+    HAND_SHIFT (int): Bit offset of the Hands enum within a strength
+    KICKER_BITS (int): Bits used per kicker rank within a strength
+    PRIMES (int[]): Prime assigned to each card rank, indexed by Ranks enum
+    RANK_TABLE (dict): Strength of the best non-flush hand, keyed by prime product of all ranks
+    FLUSH_TABLE (dict): Strength of a flush, keyed by prime product of the suited ranks
+"""
+
+import itertools
+
+HAND_SHIFT = 20
+KICKER_BITS = 4
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+_CARD_PRIMES = tuple(PRIMES[i % 13] for i in range(52))
+_CARD_SUITS = tuple(i // 13 for i in range(52))
+
+#Hands enum values, duplicated here so texas_holdem can import this module
+_HIGH_CARD, _PAIR, _TWO_PAIR, _THREE_OF_A_KIND, _STRAIGHT, _FLUSH, _FULL_HOUSE, \
+        _FOUR_OF_A_KIND, _STRAIGHT_FLUSH, _ROYAL_FLUSH = range(10)
+_ACE = 12
+_FIVE = 3
+
+def _pack(hand, kickers):
+    """Helper function to pack a hand type and up to 5 kicker ranks into a strength."""
+    strength = hand
+    for i in range(5):
+        strength <<= KICKER_BITS
+        if i < len(kickers):
+            strength |= kickers[i]
+    return strength
+
+def _straight_high(distinct):
+    """
+    Helper function to find the high card of the best straight within a set of ranks,
+    or None if there isn't one. The ace-low straight counts as five-high.
+    """
+    for i in range(_ACE, _FIVE, -1):
+        if (i in distinct and i-1 in distinct and i-2 in distinct and
+                    i-3 in distinct and i-4 in distinct):
+            return i
+    if _ACE in distinct and 0 in distinct and 1 in distinct and 2 in distinct and 3 in distinct:
+        return _FIVE
+    return None
+
+def _score_flush(ranks):
+    """Helper function to score the cards of a single suit, given 5 or more of them."""
+    high = _straight_high(set(ranks))
+    if high == _ACE:
+        return _pack(_ROYAL_FLUSH, [high])
+    elif high is not None:
+        return _pack(_STRAIGHT_FLUSH, [high])
+    return _pack(_FLUSH, sorted(ranks, reverse=True)[:5])
+
+def _score_ranks(ranks):
+    """Helper function to score the best non-flush hand within a rank multiset."""
+    counts = [0] * 13
+    for r in ranks:
+        counts[r] += 1
+    ordered = sorted(ranks, reverse=True)
+    quads = [r for r in ordered if counts[r] >= 4]
+    trips = [r for r in range(_ACE, -1, -1) if counts[r] == 3]
+    pairs = [r for r in range(_ACE, -1, -1) if counts[r] == 2]
+    #FOUR OF A KIND
+    if quads:
+        if counts[quads[0]] >= 5:
+            #five or more of a rank with several decks; every kicker is the rank itself
+            return _pack(_FOUR_OF_A_KIND, [quads[0]]*5)
+        rest = list(ordered)
+        for _ in range(4):
+            rest.remove(quads[0])
+        return _pack(_FOUR_OF_A_KIND, [quads[0]]*4 + rest[:1])
+    #FULL HOUSE
+    if trips and (len(trips) > 1 or pairs):
+        pair = max(trips[1:] + pairs)
+        return _pack(_FULL_HOUSE, [trips[0]]*3 + [pair]*2)
+    #STRAIGHT
+    high = _straight_high(set(ranks))
+    if high is not None:
+        return _pack(_STRAIGHT, [high])
+    #THREE OF A KIND
+    if trips:
+        rest = [r for r in ordered if r != trips[0]]
+        return _pack(_THREE_OF_A_KIND, [trips[0]]*3 + rest[:2])
+    #TWO PAIR
+    if len(pairs) >= 2:
+        rest = [r for r in ordered if r != pairs[0] and r != pairs[1]]
+        return _pack(_TWO_PAIR, [pairs[0]]*2 + [pairs[1]]*2 + rest[:1])
+    #PAIR
+    if pairs:
+        rest = [r for r in ordered if r != pairs[0]]
+        return _pack(_PAIR, [pairs[0]]*2 + rest[:3])
+    #HIGH CARD
+    return _pack(_HIGH_CARD, ordered[:5])
+
+def _factor(product):
+    """Helper function to recover the rank multiset behind a prime product."""
+    ranks = []
+    for r in range(13):
+        while product % PRIMES[r] == 0:
+            ranks.append(r)
+            product //= PRIMES[r]
+    return ranks
+
+
+class _StrengthTable(dict):
+    """
+    Lookup table from a prime product of ranks to a strength. Missing keys are scored and
+    memoized on first access.
+    """
+    def __init__(self, score):
+        dict.__init__(self)
+        self._score = score
+
+    def __missing__(self, product):
+        strength = self._score(_factor(product))
+        self[product] = strength
+        return strength
+
+
+RANK_TABLE = _StrengthTable(_score_ranks)
+FLUSH_TABLE = _StrengthTable(_score_flush)
+_built = set()
+
+def build_tables(sizes=(7,)):
+    """
+    Fills the lookup tables for every single-deck hand of the given sizes.
+
+    Args:
+        sizes (int[], optional): Numbers of cards per hand, each from 5 to 7
+    """
+    for size in sizes:
+        if size in _built:
+            continue
+        _built.add(size)
+        for ranks in itertools.combinations_with_replacement(range(13), size):
+            #sorted, so five of a rank would show up as equal ranks four places apart
+            if any(ranks[i] == ranks[i+4] for i in range(size-4)):
+                continue
+            product = 1
+            for r in ranks:
+                product *= PRIMES[r]
+            if product not in RANK_TABLE:
+                RANK_TABLE[product] = _score_ranks(ranks)
+    if 'flush' in _built:
+        return
+    _built.add('flush')
+    for size in (5, 6, 7):
+        for ranks in itertools.combinations(range(13), size):
+            product = 1
+            for r in ranks:
+                product *= PRIMES[r]
+            if product not in FLUSH_TABLE:
+                FLUSH_TABLE[product] = _score_flush(ranks)
+
+def evaluate_ranks(card_ranks, card_suits):
+    """
+    Computes the strength of a hand from parallel lists of card ranks and suits.
+
+    Args:
+        card_ranks (int[]): Ranks enums of 5 to 7 cards
+        card_suits (int[]): Suits enums of the same cards
+
+    Returns:
+        Strength integer. Greater strengths beat lesser ones; equal strengths tie.
+    """
+    product = 1
+    suit_products = [1, 1, 1, 1]
+    suit_counts = [0, 0, 0, 0]
+    for r, s in zip(card_ranks, card_suits):
+        prime = PRIMES[r]
+        product *= prime
+        suit_products[s] *= prime
+        suit_counts[s] += 1
+    strength = RANK_TABLE[product]
+    for s in range(4):
+        if suit_counts[s] >= 5:
+            strength = max(strength, FLUSH_TABLE[suit_products[s]])
+    return strength
+
+def evaluate_indices(indices):
+    """
+    Computes the strength of a hand from Card.index values.
+
+    Args:
+        indices (int[]): Indices of 5 to 7 cards
+
+    Returns:
+        Strength integer. Greater strengths beat lesser ones; equal strengths tie.
+    """
+    product = 1
+    suit_products = [1, 1, 1, 1]
+    suit_counts = [0, 0, 0, 0]
+    for i in indices:
+        prime = _CARD_PRIMES[i]
+        s = _CARD_SUITS[i]
+        product *= prime
+        suit_products[s] *= prime
+        suit_counts[s] += 1
+    strength = RANK_TABLE[product]
+    for s in range(4):
+        if suit_counts[s] >= 5:
+            strength = max(strength, FLUSH_TABLE[suit_products[s]])
+    return strength
+
+def evaluate(cards):
+    """
+    Computes the strength of a hand of Card objects.
+
+    Args:
+        cards (Card[]): 5 to 7 dealt cards
+
+    Returns:
+        Strength integer. Greater strengths beat lesser ones; equal strengths tie.
+    """
+    return evaluate_ranks([c.rank for c in cards], [c.suit for c in cards])
+
+#5-rank windows of every straight, high card first, ending with the ace-low straight
+_STRAIGHT_WINDOWS = tuple(0x1F << (i-4) for i in range(_ACE, _FIVE, -1)) + (0x100F,)
+
+class HandState(object):
+    """
+    Incrementally updated evaluation state of a player's cards.
+
+        Cards are added one at a time as they're dealt and revealed, and each addition only
+        updates a few counters, so the queries below cost the same at every street.
+
+    Attributes:
+        count (int): Number of cards added
+        rank_counts (int[]): Number of cards of each rank, indexed by Ranks enum
+        suit_counts (int[]): Number of cards of each suit, indexed by Suits enum
+        suit_ranks (int[]): 13-bit mask of the ranks held in each suit
+        rank_mask (int): 13-bit mask of the distinct ranks held (bit n is set for rank n)
+        product (int): Prime product of all ranks held
+        suit_products (int[]): Prime product of the ranks held in each suit
+    """
+    __slots__ = ('count', 'rank_counts', 'suit_counts', 'suit_ranks', 'rank_mask',
+                    'product', 'suit_products', '_strength')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Removes every card."""
+        self.count = 0
+        self.rank_counts = [0] * 13
+        self.suit_counts = [0, 0, 0, 0]
+        self.suit_ranks = [0, 0, 0, 0]
+        self.rank_mask = 0
+        self.product = 1
+        self.suit_products = [1, 1, 1, 1]
+        self._strength = None
+
+    def add(self, rank, suit):
+        """
+        Adds a card.
+
+        Args:
+            rank (int): Ranks enum of the card
+            suit (int): Suits enum of the card
+        """
+        prime = PRIMES[rank]
+        self.count += 1
+        self.rank_counts[rank] += 1
+        self.suit_counts[suit] += 1
+        self.suit_ranks[suit] |= 1 << rank
+        self.rank_mask |= 1 << rank
+        self.product *= prime
+        self.suit_products[suit] *= prime
+        self._strength = None
+
+    def add_cards(self, cards):
+        """
+        Adds several cards at once.
+
+        Args:
+            cards (Card[]): Dealt cards to add
+        """
+        rank_counts = self.rank_counts
+        suit_counts = self.suit_counts
+        suit_ranks = self.suit_ranks
+        suit_products = self.suit_products
+        rank_mask = self.rank_mask
+        product = self.product
+        for c in cards:
+            rank = c.rank
+            suit = c.suit
+            prime = PRIMES[rank]
+            rank_counts[rank] += 1
+            suit_counts[suit] += 1
+            suit_ranks[suit] |= 1 << rank
+            rank_mask |= 1 << rank
+            product *= prime
+            suit_products[suit] *= prime
+        self.count += len(cards)
+        self.rank_mask = rank_mask
+        self.product = product
+        self._strength = None
+
+    def strength(self):
+        """
+        Returns:
+            Strength of the best hand made from the cards so far, as evaluate() would
+            return for them. Fewer than 5 cards score as high cards, pairs, two pairs, trips
+            or quads.
+        """
+        if self._strength is None:
+            strength = RANK_TABLE[self.product]
+            for s in range(4):
+                if self.suit_counts[s] >= 5:
+                    strength = max(strength, FLUSH_TABLE[self.suit_products[s]])
+            self._strength = strength
+        return self._strength
+
+    def hand(self):
+        """
+        Returns:
+            Hands enum of the best hand made so far.
+        """
+        return self.strength() >> HAND_SHIFT
+
+    def flush_draw(self):
+        """
+        Returns:
+            Suits enum of a suit one card short of a flush, or None if there isn't one or a
+            flush is already made.
+        """
+        draw = None
+        for s in range(4):
+            if self.suit_counts[s] >= 5:
+                return None
+            elif self.suit_counts[s] == 4:
+                draw = s
+        return draw
+
+    def straight_outs(self):
+        """
+        Returns:
+            13-bit mask of the ranks that would complete a straight, or 0 if a straight is
+            already made. Two ranks make an open-ended draw, one a gutshot.
+        """
+        mask = self.rank_mask
+        outs = 0
+        for window in _STRAIGHT_WINDOWS:
+            missing = window & ~mask
+            if not missing:
+                return 0
+            elif not missing & (missing - 1):
+                outs |= missing
+        return outs
+
+    def has_draw(self, max_cards=7):
+        """
+        Args:
+            max_cards (int, optional): Number of cards the hand will have at showdown
+
+        Returns:
+            True if more cards are still to come and one of them could complete a straight
+            or flush that isn't made yet, False otherwise.
+        """
+        if self.count >= max_cards:
+            return False
+        return self.flush_draw() is not None or self.straight_outs() != 0
+
+
+def hand_type(strength):
+    """
+    Args:
+        strength (int): Strength returned by evaluate()
+
+    Returns:
+        Hands enum of the strength.
+    """
+    return strength >> HAND_SHIFT
+
+def kickers(strength):
+    """
+    Args:
+        strength (int): Strength returned by evaluate()
+
+    Returns:
+        List of kicker ranks in tiebreak order, as stored in Player.kickers.
+    """
+    hand = strength >> HAND_SHIFT
+    count = 1 if hand in (_STRAIGHT, _STRAIGHT_FLUSH, _ROYAL_FLUSH) else 5
+    return [(strength >> (KICKER_BITS * (4-i))) & 0xF for i in range(count)]
+
+def tiebreak_rank(winner, runner_up):
+    """
+    Finds the kicker rank that decided between two strengths of the same hand type.
+
+    Args:
+        winner (int): The greater strength
+        runner_up (int): The lesser strength
+
+    Returns:
+        The winner's rank at the first kicker that differs, or None if the strengths tie.
+    """
+    for i in range(5):
+        shift = KICKER_BITS * (4-i)
+        if (winner >> shift) & 0xF != (runner_up >> shift) & 0xF:
+            return (winner >> shift) & 0xF
+    return None
@@ -0,0 +1,483 @@
+"""
+Texas Hold'em Hand History Log (hand_history)
+
+Description:
+    This module records every game played to an append-only binary log, for training and
+    auditing: the seats and their starting balances, the dealer, every player's hole cards,
+    the flop, every move with its amount, the pot and the winners.
+
+    A HandLogWriter is one of HoldemGame.observers. Finished games are encoded into a
+    buffer, and every block_hands games the buffer is compressed with zlib and appended to
+    the log as one block. Each block's position is appended to an index file next to the
+    log, so a reader can find the block holding game N with a binary search and read from
+    there, and a writer reopening the log knows where the last complete block ends. Blocks
+    a crashed writer left half-written are cut off when the log is reopened.
+
+    read_hands() is a generator that reads one block at a time, so logs of any size can be
+    streamed through. read_columns() streams them as NumPy arrays instead, decoding a batch
+    of blocks at a time with only each record's lengths walked through in Python.
+
+    File layout (little-endian):
+        log header: magic 'HHLG', version (uint16), flags (uint16; bit 0 means blocks are
+            zlib-compressed)
+        per block: games (uint32), stored bytes (uint32), then the stored bytes, which are
+            the block's game records, compressed or not
+        per game record: seats (uint8), dealer seat (uint8), moves (uint16), winners
+            (uint8), pot (uint32), then per seat: name length (uint8), UTF-8 name, starting
+            balance (uint32), hole cards (uint8[2]); then flop cards (uint8[5]), per move:
+            betting round (uint8), seat (uint8), Moves enum (uint8), amount (uint32), and
+            per winner: seat (uint8). Cards are Card.index values, or 255 if not dealt.
+        index file (log path + '.idx'): per block: number of the block's first game
+            (uint64), byte offset of the block in the log (uint64)
+
+"Constant" Variables:
+    HISTORY_PATH (string): Default path of the log, in a per-user data directory
+    DEF_BLOCK_HANDS (int): Default number of games per block
+    DEF_BATCH_HANDS (int): Default number of games read_columns() decodes together
+"""
+
+import bisect
+import os
+import struct
+import zlib
+
+HISTORY_PATH = os.path.join(os.path.expanduser('~'), '.learning-texas-holdem',
+                    'hand_history.hhl')
+DEF_BLOCK_HANDS = 1000
+DEF_BATCH_HANDS = 20000
+
+_MAGIC = 'HHLG'
+_VERSION = 1
+_COMPRESSED = 1
+_HEADER = struct.Struct('<4sHH')
+_BLOCK = struct.Struct('<II')
+_INDEX = struct.Struct('<QQ')
+_GAME = struct.Struct('<BBHBI')
+_SEAT = struct.Struct('<IBB')
+_BOARD = struct.Struct('<5B')
+_MOVE = struct.Struct('<BBBI')
+_MOVE_FIELDS = [('betting_round', 'u1'), ('seat', 'u1'), ('move', 'u1'), ('amount', '<u4')]
+_NO_CARD = 255
+_LEVEL = 6
+
+def _card(card):
+    """Helper function to encode a card slot."""
+    return _NO_CARD if card.index is None else card.index
+
+
+class HandRecord(object):
+    """
+    One game read back from a log.
+
+    Attributes:
+        number (int): Number of the game in the log, from 0
+        names (string[]): Name of the player in each seat
+        balances (int[]): Balance of each seat when the game started
+        dealer (int): Seat of the dealer
+        hole_cards (tuple[]): Card.index values of each seat's two hole cards, or None for
+            seats that were never dealt any
+        board (int[]): Card.index values of the flop cards revealed
+        moves (tuple[]): (betting_round, seat, Moves enum, amount) of every move, as in
+            HoldemGame.history
+        pot (int): Chips in the pot when the game ended
+        winners (int[]): Seats of the winners
+    """
+    __slots__ = ('number', 'names', 'balances', 'dealer', 'hole_cards', 'board', 'moves',
+                    'pot', 'winners')
+
+
+class HandColumns(object):
+    """
+    Games read back from a log as NumPy arrays, one row per game, for code that goes
+    through many games at once. Per-seat arrays are as wide as the largest table, and
+    names aren't decoded.
+
+    Attributes:
+        numbers (int[]): Number of each game in the log, from 0
+        seats (int[]): Number of seats at each game
+        dealer (int[]): Seat of each game's dealer
+        balances (int[][]): Balance of each seat when the game started
+        hole_cards (int[][][]): Card.index values of each seat's two hole cards, or -1 for
+            seats that were never dealt any
+        board (int[][]): Card.index values of the five flop cards, or -1 if not revealed
+        num_moves (int[]): Number of moves made in each game
+        first_move (int[]): Row in moves of each game's first move
+        moves (numpy.ndarray): Every move, one game's after another, as a structured array
+            with the fields of HoldemGame.history: betting_round, seat, move (Moves enum)
+            and amount
+        pot (int[]): Chips in the pot when each game ended
+        winners (boolean[][]): Seats that won each game
+    """
+    __slots__ = ('numbers', 'seats', 'dealer', 'balances', 'hole_cards', 'board',
+                    'num_moves', 'first_move', 'moves', 'pot', 'winners')
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def subset(self, rows):
+        """
+        Args:
+            rows (boolean[]): Mask or indices of the games to keep
+
+        Returns:
+            HandColumns of just the given games.
+        """
+        import numpy as np
+        columns = HandColumns()
+        for name in ('numbers', 'seats', 'dealer', 'balances', 'hole_cards', 'board',
+                        'num_moves', 'pot', 'winners'):
+            setattr(columns, name, getattr(self, name)[rows])
+        games, moves = _spread(columns.num_moves)
+        columns.moves = self.moves[self.first_move[rows][games] + moves]
+        columns.first_move = np.cumsum(columns.num_moves) - columns.num_moves
+        return columns
+
+    def between(self, start, stop=None):
+        """
+        Args:
+            start (int): Number of the first game to keep
+            stop (int, optional): Number of the first game past those to keep; default none
+
+        Returns:
+            HandColumns of the games numbered from start up to stop, or these if that's all
+            of them.
+        """
+        keep = self.numbers >= start
+        if stop is not None:
+            keep &= self.numbers < stop
+        if keep.all():
+            return self
+        return self.subset(keep)
+
+
+class HandLogWriter:
+    """
+    Observer of HoldemGames that appends every finished game to a log, creating its
+    directory if need be.
+
+    Args:
+        path (string, optional): Path of the log
+        block_hands (int, optional): Games buffered per block
+        compress (boolean, optional): Compress blocks; only used when the log is created
+        append (boolean, optional): Add to an existing log rather than starting over
+
+    Attributes:
+        path (string): Path of the log
+        hands (int): Number of games in the log, including those still buffered
+    """
+    def __init__(self, path=HISTORY_PATH, block_hands=DEF_BLOCK_HANDS, compress=True,
+                    append=True):
+        self.path = path
+        self.block_hands = block_hands
+        self._index_path = path + '.idx'
+        self._buffer = []
+        self._balances = []
+        self.hands = 0
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        if append and os.path.exists(path):
+            with open(path, 'rb') as f:
+                magic, version, flags = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError("%s isn't a hand history log" % path)
+            self._compress = bool(flags & _COMPRESSED)
+            end = self._recover()
+            self._file = open(path, 'r+b')
+            self._file.truncate(end)
+            self._file.seek(end)
+            self._index = open(self._index_path, 'ab')
+        else:
+            self._compress = compress
+            self._file = open(path, 'wb')
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION, _COMPRESSED if compress else 0))
+            self._index = open(self._index_path, 'wb')
+
+    def _recover(self):
+        """
+        Helper function to count the games in the complete blocks of an existing log, and
+        drop index entries of blocks that never made it into the log.
+
+        Returns:
+            Byte offset where the last complete block ends.
+        """
+        end = _HEADER.size
+        entries = _read_index(self._index_path)
+        size = os.path.getsize(self.path)
+        with open(self.path, 'rb') as f:
+            for i, (first, offset) in enumerate(entries):
+                f.seek(offset)
+                header = f.read(_BLOCK.size)
+                if len(header) < _BLOCK.size:
+                    break
+                games, stored = _BLOCK.unpack(header)
+                if offset + _BLOCK.size + stored > size:
+                    break
+                end = offset + _BLOCK.size + stored
+                self.hands = first + games
+            else:
+                i = len(entries)
+        with open(self._index_path, 'r+b' if os.path.exists(self._index_path) else 'wb') as f:
+            f.truncate(i * _INDEX.size)
+        return end
+
+    def observe_move(self, game, seat, move, amount):
+        if len(game.history) == 1:
+            #first move of the game; nobody has bid yet
+            self._balances = [p.balance for p in game.players]
+
+    def observe_end(self, game):
+        """Encodes a finished game into the buffer, writing the block out once it's full."""
+        players = game.players
+        parts = [_GAME.pack(len(players), game.players.index(game.dealer),
+                        len(game.history), len(game.winners), game.pot)]
+        balances = self._balances if len(self._balances) == len(players) else \
+                        [p.balance for p in players]
+        for p, balance in zip(players, balances):
+            name = p.name.encode('utf-8')[:255]
+            parts.append(chr(len(name)) + name)
+            parts.append(_SEAT.pack(balance, _card(p.card1), _card(p.card2)))
+        parts.append(_BOARD.pack(_card(game.card1), _card(game.card2), _card(game.card3),
+                        _card(game.card4), _card(game.card5)))
+        for move in game.history:
+            parts.append(_MOVE.pack(*move))
+        seats = dict((id(p), i) for i, p in enumerate(players))
+        parts.append(''.join(chr(seats[id(w)]) for w in game.winners))
+        self._buffer.append(''.join(parts))
+        self._balances = []
+        self.hands += 1
+        if len(self._buffer) >= self.block_hands:
+            self.flush()
+
+    def flush(self):
+        """Writes out the buffered games as a block, if there are any."""
+        if not self._buffer:
+            return
+        data = ''.join(self._buffer)
+        if self._compress:
+            data = zlib.compress(data, _LEVEL)
+        offset = self._file.tell()
+        self._file.write(_BLOCK.pack(len(self._buffer), len(data)) + data)
+        self._file.flush()
+        #the block is in the log before the index points at it
+        self._index.write(_INDEX.pack(self.hands - len(self._buffer), offset))
+        self._index.flush()
+        self._buffer = []
+
+    def close(self):
+        """Writes out any buffered games and closes the log."""
+        self.flush()
+        self._file.close()
+        self._index.close()
+
+
+def block_starts(path=HISTORY_PATH):
+    """
+    Args:
+        path (string, optional): Path of the log
+
+    Returns:
+        Numbers of the first game of every block written out to the log, from its index.
+    """
+    return [first for first, _ in _read_index(path + '.idx')]
+
+def _read_index(path):
+    """Helper function to read a log's index as a list of (first game, offset) pairs."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        data = f.read()
+    count = len(data) // _INDEX.size
+    return [_INDEX.unpack_from(data, i * _INDEX.size) for i in range(count)]
+
+def _decode_block(data, number):
+    """Helper function to decode a block's game records, numbered from the given one."""
+    records = []
+    pos = 0
+    while pos < len(data):
+        seats, dealer, num_moves, num_winners, pot = _GAME.unpack_from(data, pos)
+        pos += _GAME.size
+        record = HandRecord()
+        record.number = number
+        record.dealer = dealer
+        record.pot = pot
+        record.names = []
+        record.balances = []
+        record.hole_cards = []
+        for _ in range(seats):
+            length = ord(data[pos])
+            record.names.append(data[pos+1:pos+1+length].decode('utf-8'))
+            pos += 1 + length
+            balance, card1, card2 = _SEAT.unpack_from(data, pos)
+            pos += _SEAT.size
+            record.balances.append(balance)
+            record.hole_cards.append(None if card1 == _NO_CARD else (card1, card2))
+        record.board = [c for c in _BOARD.unpack_from(data, pos) if c != _NO_CARD]
+        pos += _BOARD.size
+        record.moves = []
+        for _ in range(num_moves):
+            record.moves.append(_MOVE.unpack_from(data, pos))
+            pos += _MOVE.size
+        record.winners = [ord(c) for c in data[pos:pos+num_winners]]
+        pos += num_winners
+        records.append(record)
+        number += 1
+    return records
+
+def _spread(counts):
+    """
+    Helper function to number the items of consecutive runs of the given lengths.
+
+    Returns:
+        Tuple of the run and the position within it of every item.
+    """
+    import numpy as np
+    runs = np.repeat(np.arange(len(counts)), counts)
+    return runs, np.arange(len(runs)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+def _decode_columns(data, number):
+    """
+    Helper function to decode game records into HandColumns, numbered from the given one.
+    Only the lengths of each record are walked through one by one; every field is then
+    gathered for all games at once.
+    """
+    import numpy as np
+    starts = []
+    seat_positions = []
+    board_positions = []
+    moves = []
+    pos = 0
+    end = len(data)
+    unpack = _GAME.unpack_from
+    while pos < end:
+        seats, dealer, num_moves, num_winners, pot = unpack(data, pos)
+        starts.append(pos)
+        pos += _GAME.size
+        for _ in range(seats):
+            pos += 1 + ord(data[pos])
+            seat_positions.append(pos)
+            pos += _SEAT.size
+        board_positions.append(pos)
+        pos += _BOARD.size
+        #every game's moves are copied out in one piece, to be read as one array
+        moves.append(data[pos:pos + num_moves * _MOVE.size])
+        pos += num_moves * _MOVE.size + num_winners
+    moves = np.frombuffer(''.join(moves), dtype=_MOVE_FIELDS)
+
+    data = np.frombuffer(data, dtype=np.uint8)
+    starts = np.array(starts, dtype=np.int64)
+    seat_positions = np.array(seat_positions, dtype=np.int64)
+    board_positions = np.array(board_positions, dtype=np.int64)
+    columns = HandColumns()
+    count = len(starts)
+    columns.numbers = np.arange(number, number + count)
+    header = data[starts[:, None] + np.arange(_GAME.size)]
+    columns.seats = header[:, 0].astype(np.int64)
+    columns.dealer = header[:, 1].astype(np.int64)
+    columns.num_moves = header[:, 2:4].copy().view('<u2')[:, 0].astype(np.int64)
+    num_winners = header[:, 4].astype(np.int64)
+    columns.pot = header[:, 5:9].copy().view('<u4')[:, 0].astype(np.int64)
+    width = columns.seats.max() if count else 0
+
+    games, seats = _spread(columns.seats)
+    seat = data[seat_positions[:, None] + np.arange(_SEAT.size)]
+    columns.balances = np.zeros((count, width), dtype=np.int64)
+    columns.balances[games, seats] = seat[:, :4].copy().view('<u4')[:, 0]
+    cards = seat[:, 4:].astype(np.int64)
+    cards[cards == _NO_CARD] = -1
+    columns.hole_cards = np.full((count, width, 2), -1, dtype=np.int64)
+    columns.hole_cards[games, seats] = cards
+
+    columns.board = data[board_positions[:, None] + np.arange(_BOARD.size)].astype(np.int64)
+    columns.board[columns.board == _NO_CARD] = -1
+
+    columns.moves = moves
+    columns.first_move = np.cumsum(columns.num_moves) - columns.num_moves
+
+    winner_positions = board_positions + _BOARD.size + columns.num_moves * _MOVE.size
+    games, winners = _spread(num_winners)
+    columns.winners = np.zeros((count, width), dtype=bool)
+    columns.winners[games, data[winner_positions[games] + winners]] = True
+    return columns
+
+def _blocks(path, start, stop=None):
+    """
+    Helper function to read the blocks of a log holding games from start up to stop.
+
+    Returns:
+        Generator of (number of the block's first game, number of games in the block, the
+        block's game records).
+    """
+    entries = _read_index(path + '.idx')
+    with open(path, 'rb') as f:
+        magic, version, flags = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("%s isn't a hand history log" % path)
+        number = 0
+        if start and entries:
+            block = bisect.bisect_right([first for first, _ in entries], start) - 1
+            if block >= 0:
+                number, offset = entries[block]
+                f.seek(offset)
+        while stop is None or number < stop:
+            header = f.read(_BLOCK.size)
+            if len(header) < _BLOCK.size:
+                return
+            games, stored = _BLOCK.unpack(header)
+            data = f.read(stored)
+            if len(data) < stored:
+                return
+            if number + games > start:
+                if flags & _COMPRESSED:
+                    data = zlib.decompress(data)
+                yield number, games, data
+            number += games
+
+def read_hands(path=HISTORY_PATH, start=0):
+    """
+    Streams the games of a log, one block in memory at a time.
+
+    Note:
+        Games a writer still has buffered aren't in the log yet.
+
+    Args:
+        path (string, optional): Path of the log
+        start (int, optional): Number of the first game to read; found through the index
+
+    Returns:
+        Generator of HandRecords, in the order the games were played.
+    """
+    for number, games, data in _blocks(path, start):
+        for record in _decode_block(data, number):
+            if record.number >= start:
+                yield record
+
+def read_columns(path=HISTORY_PATH, start=0, stop=None, batch_hands=DEF_BATCH_HANDS):
+    """
+    Streams the games of a log as NumPy arrays, a batch of whole blocks at a time.
+
+    Note:
+        Needs NumPy. Games a writer still has buffered aren't in the log yet.
+
+    Args:
+        path (string, optional): Path of the log
+        start (int, optional): Number of the first game to read; found through the index
+        stop (int, optional): Number of the first game past those to read; default none
+        batch_hands (int, optional): Games to gather before decoding them together
+
+    Returns:
+        Generator of HandColumns, in the order the games were played.
+    """
+    parts = []
+    games = 0
+    for number, block_games, data in _blocks(path, start, stop):
+        if not parts:
+            first = number
+        parts.append(data)
+        games += block_games
+        if games >= batch_hands:
+            yield _decode_columns(''.join(parts), first).between(start, stop)
+            parts = []
+            games = 0
+    if parts:
+        yield _decode_columns(''.join(parts), first).between(start, stop)
@@ -0,0 +1,414 @@
+"""
+Texas Hold'em Suit-Isomorphic Hand Indexer (hand_indexer)
+
+Description:
+    This module numbers hands up to suit isomorphism: two sets of hole cards and flop cards
+    get the same index exactly when one turns into the other by renaming suits. Every
+    street's indices are dense, from 0 to size(street)-1, so tables keyed by them need no
+    gaps, and unindex() turns an index back into a representative hand.
+
+    A hand is split into two rounds, the hole cards and the flop cards revealed so far,
+    since the order the flop cards came in doesn't change what the hand can make. Each suit
+    is reduced to the ranks it holds in each round. Suits are sorted by how many cards they
+    hold per round, which picks out a configuration, and suits holding the same counts are
+    interchangeable, so their rank sets are numbered as a multiset. The index is the
+    configuration's offset plus the mixed-radix combination of those multiset numbers.
+
+    Cards are Card.index values (suit*13 + rank), hole cards first and then the flop cards.
+    Only cards from a single deck can be indexed.
+
+    index_batch() and unindex_batch() do the same for whole arrays of hands at once, with
+    rank sets numbered through lookup tables instead of loops. Only they need NumPy.
+
+"Constant" Variables:
+    PREFLOP, FLOP, TURN, RIVER (int): Streets
+    STREET_CARDS (int[]): Number of cards known on each street
+"""
+
+import bisect
+import itertools
+
+PREFLOP, FLOP, TURN, RIVER = range(4)
+STREET_CARDS = (2, 5, 6, 7)
+
+_CHOOSE = [[0] * 14 for _ in range(14)]
+for _n in range(14):
+    _CHOOSE[_n][0] = 1
+    for _k in range(1, _n + 1):
+        _CHOOSE[_n][_k] = _CHOOSE[_n-1][_k-1] + _CHOOSE[_n-1][_k]
+
+def _choose(n, k):
+    """Helper function for binomial coefficients, of any size."""
+    if k < 0 or k > n:
+        return 0
+    if n < 14:
+        return _CHOOSE[n][k]
+    result = 1
+    for i in range(k):
+        result = result * (n - i) // (i + 1)
+    return result
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+def _subsets(counts):
+    """Helper function to count a suit's possible rank sets for the given cards per round."""
+    total = 1
+    left = 13
+    for count in counts:
+        total *= _choose(left, count)
+        left -= count
+    return total
+
+def _rank_set_index(masks, counts):
+    """
+    Helper function to number one suit's rank sets over the rounds. Each round's ranks are
+    numbered (colexicographically) among the ranks the suit hasn't used yet.
+    """
+    index = 0
+    radix = 1
+    used = 0
+    for mask, count in zip(masks, counts):
+        sub = 0
+        i = 1
+        for r in range(13):
+            if mask >> r & 1:
+                sub += _choose(r - _popcount(used & ((1 << r) - 1)), i)
+                i += 1
+        index += radix * sub
+        radix *= _choose(13 - _popcount(used), count)
+        used |= mask
+    return index
+
+def _rank_set_unindex(index, counts):
+    """Helper function to turn a suit's rank set number back into a rank mask per round."""
+    masks = []
+    used = 0
+    for count in counts:
+        size = _choose(13 - _popcount(used), count)
+        index, sub = divmod(index, size)
+        free = [r for r in range(13) if not used >> r & 1]
+        mask = 0
+        for i in range(count, 0, -1):
+            pos = i - 1
+            while _choose(pos + 1, i) <= sub:
+                pos += 1
+            sub -= _choose(pos, i)
+            mask |= 1 << free[pos]
+        masks.append(mask)
+        used |= mask
+    return masks
+
+def _multiset_index(values):
+    """
+    Helper function to number a multiset of suit numbers, given in non-increasing order, as
+    the colexicographic index of the equivalent strictly decreasing combination.
+    """
+    m = len(values)
+    return sum(_choose(v + m - 1 - i, m - i) for i, v in enumerate(values))
+
+def _colex_top(index, i):
+    """Helper function to find the largest pos with _choose(pos, i) <= index."""
+    low = i - 1
+    high = i
+    while _choose(high, i) <= index:
+        low = high
+        high *= 2
+    while high - low > 1:
+        middle = (low + high) // 2
+        if _choose(middle, i) <= index:
+            low = middle
+        else:
+            high = middle
+    return low
+
+def _multiset_unindex(index, m):
+    """Helper function to turn a multiset number back into m values, non-increasing."""
+    values = []
+    for i in range(m, 0, -1):
+        pos = _colex_top(index, i)
+        index -= _choose(pos, i)
+        values.append(pos - (i - 1))
+    return values
+
+
+class _Street:
+    """
+    Helper class holding the configurations of a street: every way to split its rounds'
+    cards between suits, up to reordering the suits.
+    """
+    def __init__(self, street):
+        self.round_sizes = _round_sizes(street)
+        rounds = len(self.round_sizes)
+        splits = []
+        for size in self.round_sizes:
+            splits.append([s for s in itertools.product(range(size + 1), repeat=4)
+                            if sum(s) == size])
+        configs = set()
+        for per_round in itertools.product(*splits):
+            config = tuple(sorted((tuple(per_round[j][s] for j in range(rounds))
+                            for s in range(4)), reverse=True))
+            configs.add(config)
+        self.configs = sorted(configs, reverse=True)
+        self.config_ids = dict((c, i) for i, c in enumerate(self.configs))
+        self.groups = []
+        self.offsets = []
+        total = 0
+        for config in self.configs:
+            groups = []
+            for counts, members in itertools.groupby(config):
+                m = len(list(members))
+                groups.append((counts, m, _choose(_subsets(counts) + m - 1, m)))
+            self.groups.append(groups)
+            self.offsets.append(total)
+            size = 1
+            for _, _, count in groups:
+                size *= count
+            total += size
+        self.size = total
+
+def _round_sizes(street):
+    """Helper function to give the number of cards in each round of a street."""
+    if street == PREFLOP:
+        return (2,)
+    return (2, STREET_CARDS[street] - 2)
+
+_streets = {}
+
+def _get_street(street):
+    """Helper function to build a street's configurations on first use."""
+    data = _streets.get(street)
+    if data is None:
+        data = _streets[street] = _Street(street)
+    return data
+
+def size(street):
+    """
+    Args:
+        street (int): PREFLOP, FLOP, TURN or RIVER
+
+    Returns:
+        Number of distinct hands on the street up to suit isomorphism.
+    """
+    return _get_street(street).size
+
+def index(cards):
+    """
+    Computes the canonical index of a hand.
+
+    Args:
+        cards (int[]): Card.index values of the hole cards followed by the flop cards
+            revealed so far (2, 5, 6 or 7 cards in all)
+
+    Returns:
+        Index in range(size(street)), where the street follows from the number of cards.
+    """
+    street = STREET_CARDS.index(len(cards))
+    data = _get_street(street)
+    masks = [[0] * len(data.round_sizes) for _ in range(4)]
+    for j, c in enumerate(cards):
+        masks[c // 13][j >= 2] |= 1 << (c % 13)
+    suits = []
+    for s in range(4):
+        counts = tuple(_popcount(m) for m in masks[s])
+        suits.append((counts, _rank_set_index(masks[s], counts)))
+    suits.sort(reverse=True)
+    config = data.config_ids[tuple(counts for counts, _ in suits)]
+    result = 0
+    radix = 1
+    i = 0
+    for counts, m, count in data.groups[config]:
+        result += radix * _multiset_index([value for _, value in suits[i:i + m]])
+        radix *= count
+        i += m
+    return data.offsets[config] + result
+
+def unindex(street, idx):
+    """
+    Turns a canonical index back into a representative hand.
+
+    Args:
+        street (int): PREFLOP, FLOP, TURN or RIVER
+        idx (int): Index in range(size(street))
+
+    Returns:
+        Card.index values of the hole cards followed by the flop cards, each round's cards
+        in ascending order. Suits are assigned in the canonical order, so unindex(index(h))
+        is the same hand as h up to renaming suits.
+    """
+    data = _get_street(street)
+    config = bisect.bisect_right(data.offsets, idx) - 1
+    rest = idx - data.offsets[config]
+    rounds = [[] for _ in data.round_sizes]
+    suit = 0
+    for counts, m, count in data.groups[config]:
+        rest, group = divmod(rest, count)
+        for value in _multiset_unindex(group, m):
+            for rnd, mask in enumerate(_rank_set_unindex(value, counts)):
+                rounds[rnd].extend(suit*13 + r for r in range(13) if mask >> r & 1)
+            suit += 1
+    return [c for cards in rounds for c in sorted(cards)]
+
+
+_batch = None
+
+def _batch_tables():
+    """
+    Helper function to build the NumPy tables used by the batch forms on first use: the
+    popcount and colexicographic index of every 13-bit rank mask, and the masks of each
+    size in order of their index.
+    """
+    global _batch
+    if _batch is None:
+        import numpy as np
+        masks = np.arange(1 << 13)
+        popcount = np.array([_popcount(m) for m in range(1 << 13)], dtype=np.int64)
+        colex = np.zeros(1 << 13, dtype=np.int64)
+        for r in range(13):
+            below = popcount[masks & ((1 << r) - 1)]
+            bit = (masks >> r) & 1
+            colex += bit * np.array([_choose(r, i + 1) for i in range(13)])[below]
+        by_count = []
+        for k in range(14):
+            sized = masks[popcount == k]
+            ordered = np.empty(len(sized), dtype=np.int64)
+            ordered[colex[sized]] = sized
+            by_count.append(ordered)
+        _batch = (popcount, colex, by_count)
+    return _batch
+
+def _choose_batch(n, k):
+    """Helper function for binomial coefficients of an int64 array and a small int."""
+    import numpy as np
+    result = np.ones(n.shape, dtype=np.int64)
+    for i in range(k):
+        result = result * np.maximum(n - i, 0) // (i + 1)
+    return result
+
+def _compress(mask, used, popcount):
+    """Helper function to renumber the ranks of masks among the ranks not in used."""
+    import numpy as np
+    result = np.zeros(mask.shape, dtype=np.int64)
+    for r in range(13):
+        result |= ((mask >> r) & 1) << (r - popcount[used & ((1 << r) - 1)])
+    return result
+
+def _expand(compressed, used, popcount):
+    """Helper function to undo _compress()."""
+    import numpy as np
+    result = np.zeros(compressed.shape, dtype=np.int64)
+    for r in range(13):
+        free = 1 - ((used >> r) & 1)
+        result |= free * ((compressed >> (r - popcount[used & ((1 << r) - 1)])) & 1) << r
+    return result
+
+def _config_codes(data):
+    """Helper function to give every configuration of a street a sortable integer code."""
+    codes = []
+    for config in data.configs:
+        code = 0
+        for counts in config:
+            code = code * 256 + counts[0] * 16 + (counts[1] if len(counts) > 1 else 0)
+        codes.append(code)
+    return codes
+
+def index_batch(cards):
+    """
+    Computes the canonical indices of many hands of the same street at once.
+
+    Args:
+        cards (int[][]): (N, 2, 5, 6 or 7) array of Card.index values, each row holding
+            the hole cards followed by the flop cards
+
+    Returns:
+        Array of N indices, equal to index() of each row.
+    """
+    import numpy as np
+    cards = np.asarray(cards, dtype=np.int64)
+    street = STREET_CARDS.index(cards.shape[1])
+    data = _get_street(street)
+    popcount, colex, _ = _batch_tables()
+    rows = np.arange(len(cards))
+    masks = np.zeros((len(cards), 4, 2), dtype=np.int64)
+    for j in range(cards.shape[1]):
+        masks[rows, cards[:, j] // 13, int(j >= 2)] |= 1 << (cards[:, j] % 13)
+    first, second = masks[..., 0], masks[..., 1]
+    count0, count1 = popcount[first], popcount[second]
+    suit_index = colex[first] + np.array([_choose(13, k) for k in range(14)])[count0] * \
+                    colex[_compress(second, first, popcount)]
+    #sort suits by their counts, then by their rank sets, strongest first
+    keys = np.sort(((count0 * 16 + count1) << 32) | suit_index, axis=1)[:, ::-1]
+    counts_code = keys >> 32
+    values = keys & 0xFFFFFFFF
+    code = np.zeros(len(cards), dtype=np.int64)
+    for s in range(4):
+        code = code * 256 + counts_code[:, s]
+    codes = _config_codes(data)
+    order = np.argsort(codes)
+    config = order[np.searchsorted(np.array(codes)[order], code)]
+
+    result = np.array(data.offsets, dtype=np.int64)[config]
+    for c in np.unique(config):
+        chosen = np.flatnonzero(config == c)
+        radix = 1
+        i = 0
+        for counts, m, count in data.groups[c]:
+            group = np.zeros(len(chosen), dtype=np.int64)
+            for j in range(m):
+                group += _choose_batch(values[chosen, i + j] + m - 1 - j, m - j)
+            result[chosen] += radix * group
+            radix *= count
+            i += m
+    return result
+
+def unindex_batch(street, indices):
+    """
+    Turns many canonical indices of a street back into representative hands at once.
+
+    Args:
+        street (int): PREFLOP, FLOP, TURN or RIVER
+        indices (int[]): Indices in range(size(street))
+
+    Returns:
+        (N, STREET_CARDS[street]) array of Card.index values, equal to unindex() of each
+        index.
+    """
+    import numpy as np
+    indices = np.asarray(indices, dtype=np.int64)
+    data = _get_street(street)
+    popcount, _, by_count = _batch_tables()
+    offsets = np.array(data.offsets, dtype=np.int64)
+    config = np.searchsorted(offsets, indices, side='right') - 1
+    first = np.zeros((len(indices), 4), dtype=np.int64)
+    second = np.zeros((len(indices), 4), dtype=np.int64)
+    for c in np.unique(config):
+        chosen = np.flatnonzero(config == c)
+        rest = indices[chosen] - offsets[c]
+        suit = 0
+        for counts, m, count in data.groups[c]:
+            rest, group = rest // count, rest % count
+            limit = _choose(13, counts[0]) * (_choose(13 - counts[0], counts[1])
+                            if len(counts) > 1 else 1) + m
+            for i in range(m, 0, -1):
+                #largest pos with C(pos, i) <= group, by binary search
+                low = np.full(len(chosen), i - 1, dtype=np.int64)
+                high = np.full(len(chosen), limit + i, dtype=np.int64)
+                while (high - low > 1).any():
+                    middle = (low + high) // 2
+                    fits = _choose_batch(middle, i) <= group
+                    low = np.where(fits, middle, low)
+                    high = np.where(fits, high, middle)
+                group -= _choose_batch(low, i)
+                value = low - (i - 1)
+                size0 = _choose(13, counts[0])
+                first[chosen, suit] = by_count[counts[0]][value % size0]
+                if len(counts) > 1:
+                    second[chosen, suit] = _expand(by_count[counts[1]][value // size0],
+                                    first[chosen, suit], popcount)
+                suit += 1
+
+    cards = []
+    for masks in (first, second)[:len(data.round_sizes)]:
+        held = ((masks[:, :, None] >> np.arange(13)) & 1).reshape(len(indices), 52)
+        cards.append(np.nonzero(held)[1].reshape(len(indices), -1))
+    return np.hstack(cards)
@@ -0,0 +1,143 @@
+"""
+Texas Hold'em Game Instrumentation (instrumentation)
+
+Description:
+    This module measures where a HoldemGame spends its time: how often each of its main
+    steps is called and the wall time spent in it, how many hands are played per second,
+    and how many end in a showdown rather than with everyone else folding.
+
+    Nothing in HoldemGame itself is instrumented. attach() shadows the measured methods of
+    one game with timing wrappers set on that instance, and detach() removes them again, so
+    games that aren't attached run the plain methods with no overhead at all. Hands are
+    counted as one of the game's observers.
+
+    Times are inclusive: a move that ends a round also counts the time spent in
+    _process_round(), and that in turn counts dealing.
+
+"Constant" Variables:
+    METHODS (string[]): Names of the HoldemGame methods measured
+    DEF_LOG_INTERVAL (float): Default seconds between log lines
+"""
+
+import time
+from texas_holdem import HoldemGame
+
+METHODS = ('deal', 'make_bid', 'call', 'check', 'fold', '_process_round', '_resolve_winnings')
+DEF_LOG_INTERVAL = 10.0
+
+class _Timed(object):
+    """Helper class that stands in for a method of one game, counting and timing calls."""
+    __slots__ = ('game', 'func', 'totals')
+
+    def __init__(self, game, func, totals):
+        self.game = game
+        self.func = func
+        self.totals = totals
+
+    def __call__(self, *args):
+        began = time.time()
+        try:
+            return self.func(self.game, *args)
+        finally:
+            totals = self.totals
+            totals[0] += 1
+            totals[1] += time.time() - began
+
+
+class Instrumentation:
+    """
+    Counters and timers of the games it's attached to.
+
+    Args:
+        log (function, optional): Called with a one-line summary at the end of a hand,
+            at most once every log_interval seconds, such as logging.info
+        log_interval (float, optional): Seconds between log lines
+
+    Attributes:
+        log (function): Called with a one-line summary every log_interval seconds
+        log_interval (float): Seconds between log lines
+        hands (int): Number of hands finished
+        showdowns (int): Number of hands that ended in a showdown
+        totals (dict): [calls, seconds] of each method, by name
+    """
+    def __init__(self, log=None, log_interval=DEF_LOG_INTERVAL):
+        self.log = log
+        self.log_interval = log_interval
+        self.totals = dict((name, [0, 0.0]) for name in METHODS)
+        self.reset()
+
+    def reset(self):
+        """Zeroes every counter and timer, and restarts the clock."""
+        self.hands = 0
+        self.showdowns = 0
+        #attached games hold on to these lists, so they're zeroed in place
+        for totals in self.totals.values():
+            totals[:] = [0, 0.0]
+        self._started = self._logged = time.time()
+
+    def attach(self, game):
+        """
+        Starts measuring a game.
+
+        Args:
+            game (HoldemGame): The game
+        """
+        for name in METHODS:
+            setattr(game, name, _Timed(game, HoldemGame.__dict__[name], self.totals[name]))
+        game.observers.append(self)
+
+    def detach(self, game):
+        """
+        Stops measuring a game, leaving it exactly as it was before attach().
+
+        Args:
+            game (HoldemGame): The game
+        """
+        for name in METHODS:
+            game.__dict__.pop(name, None)
+        game.observers.remove(self)
+
+    def observe_move(self, game, seat, move, amount):
+        pass
+
+    def observe_end(self, game):
+        """Counts a finished hand, and logs a summary if it's time to."""
+        self.hands += 1
+        if not game.everyone_folded:
+            self.showdowns += 1
+        if self.log is not None:
+            now = time.time()
+            if now - self._logged >= self.log_interval:
+                self._logged = now
+                self.log(self.line())
+
+    def snapshot(self):
+        """
+        Returns:
+            Dictionary of the counters: hands, showdowns, folds (hands everyone else folded
+            in), showdown_ratio, elapsed seconds, hands_per_second, and per method its calls,
+            seconds and seconds_per_call.
+        """
+        elapsed = time.time() - self._started
+        methods = {}
+        for name, (calls, seconds) in self.totals.items():
+            methods[name] = dict(calls=calls, seconds=seconds,
+                            seconds_per_call=seconds / calls if calls else 0.0)
+        return dict(hands=self.hands, showdowns=self.showdowns,
+                    folds=self.hands - self.showdowns,
+                    showdown_ratio=float(self.showdowns) / self.hands if self.hands else 0.0,
+                    elapsed=elapsed, hands_per_second=self.hands / elapsed if elapsed else 0.0,
+                    methods=methods)
+
+    def line(self):
+        """
+        Returns:
+            One-line summary of throughput, showdowns and the time spent in each method.
+        """
+        snapshot = self.snapshot()
+        parts = ["%d hands (%.0f hands/sec, %.0f%% showdowns)" % (snapshot['hands'],
+                        snapshot['hands_per_second'], 100 * snapshot['showdown_ratio'])]
+        for name in METHODS:
+            method = snapshot['methods'][name]
+            parts.append("%s %d/%.3fs" % (name.lstrip('_'), method['calls'], method['seconds']))
+        return ', '.join(parts)
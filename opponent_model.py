@@ -0,0 +1,222 @@
+"""
+Texas Hold'em Opponent Model (opponent_model)
+
+Description:
+    This module keeps running statistics of how each player plays, for computer players to
+    exploit: how often they voluntarily put money in before the flop (VPIP), how often they
+    raise before the flop (PFR), how aggressive they are, how often they fold to a raise,
+    and how often they go to showdown.
+
+    An OpponentModel watches games as one of HoldemGame.observers. Each move only bumps a
+    few counters of the current game, and when the game ends those are folded into each
+    player's running totals, which are first multiplied by a decay factor so older games
+    count for less. Every statistic is a ratio of two totals, so reading one never looks
+    back over past games.
+
+    Players are told apart by name, so statistics carry over from one session to the next
+    through save() and load().
+
+    File layout (little-endian):
+        header: magic 'OPPM', version (uint16), number of players (uint16)
+        per player: length of name (uint16), UTF-8 name, float64 totals[NUM_COUNTERS]
+
+"Constant" Variables:
+    MODEL_PATH (string): Default path of the model file, in a per-user data directory
+    HANDS, VPIP, PFR, RAISES, CALLS, FACED_RAISES, FOLDS_TO_RAISE, SHOWDOWNS (int): Counters
+    NUM_COUNTERS (int): Number of counters kept per player
+"""
+
+import os
+import struct
+from texas_holdem import Moves
+
+MODEL_PATH = os.path.join(os.path.expanduser('~'), '.learning-texas-holdem', 'opponents.bin')
+HANDS, VPIP, PFR, RAISES, CALLS, FACED_RAISES, FOLDS_TO_RAISE, SHOWDOWNS = range(8)
+NUM_COUNTERS = 8
+
+_MAGIC = 'OPPM'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHH')
+_NAME = struct.Struct('<H')
+_TOTALS = struct.Struct('<%dd' % NUM_COUNTERS)
+_LAST_PREFLOP_ROUND = 1 #betting rounds before the flop is revealed
+
+def _ratio(numerator, denominator):
+    """Helper function to divide two totals, or return None if nothing was counted."""
+    return numerator / denominator if denominator else None
+
+
+class PlayerStats(object):
+    """
+    Running statistics of one player.
+
+    Attributes:
+        totals (float[]): Decayed total of each counter over past games
+        current (int[]): Each counter over the game being played
+    """
+    __slots__ = ('totals', 'current')
+
+    def __init__(self):
+        self.totals = [0.0] * NUM_COUNTERS
+        self.current = [0] * NUM_COUNTERS
+
+    def end_game(self, decay):
+        """
+        Folds the game just played into the totals.
+
+        Args:
+            decay (float): Factor the totals of earlier games are multiplied by
+        """
+        totals = self.totals
+        current = self.current
+        for i in range(NUM_COUNTERS):
+            totals[i] = totals[i] * decay + current[i]
+            current[i] = 0
+
+    def hands(self):
+        return self.totals[HANDS]
+
+    def vpip(self):
+        """
+        Returns:
+            Share of games in which the player bet or called before the flop, or None if
+            no games have been counted.
+        """
+        return _ratio(self.totals[VPIP], self.totals[HANDS])
+
+    def pfr(self):
+        """
+        Returns:
+            Share of games in which the player raised before the flop, or None if no games
+            have been counted.
+        """
+        return _ratio(self.totals[PFR], self.totals[HANDS])
+
+    def aggression(self):
+        """
+        Returns:
+            Aggression factor, the player's bets and raises per call, or None if they
+            haven't called.
+        """
+        return _ratio(self.totals[RAISES], self.totals[CALLS])
+
+    def fold_to_raise(self):
+        """
+        Returns:
+            Share of the times the player faced a bet or raise that they folded, or None if
+            they never have.
+        """
+        return _ratio(self.totals[FOLDS_TO_RAISE], self.totals[FACED_RAISES])
+
+    def showdown(self):
+        """
+        Returns:
+            Share of games the player stayed in until the showdown, or None if no games
+            have been counted.
+        """
+        return _ratio(self.totals[SHOWDOWNS], self.totals[HANDS])
+
+
+class OpponentModel:
+    """
+    Statistics of every player seen, kept up to date as an observer of HoldemGames.
+
+    Args:
+        decay (float, optional): Factor every player's totals are multiplied by at the end
+            of each game they play; 1.0 keeps every game at full weight
+
+    Attributes:
+        decay (float): Factor totals are multiplied by at the end of each game
+        players (dict): PlayerStats of each player, by name
+    """
+    def __init__(self, decay=1.0):
+        self.decay = decay
+        self.players = {}
+
+    def stats(self, player):
+        """
+        Args:
+            player (Player): The player
+
+        Returns:
+            PlayerStats of the player, new if they haven't been seen before.
+        """
+        stats = self.players.get(player.name)
+        if stats is None:
+            stats = self.players[player.name] = PlayerStats()
+        return stats
+
+    def observe_move(self, game, seat, move, amount):
+        """Counts a move; called by HoldemGame before the move takes effect."""
+        player = game.players[seat]
+        current = self.stats(player).current
+        preflop = game.betting_round <= _LAST_PREFLOP_ROUND
+        if player.bid < game.bid:
+            current[FACED_RAISES] += 1
+            if move == Moves.FOLD:
+                current[FOLDS_TO_RAISE] += 1
+        if move == Moves.RAISE_BID:
+            current[RAISES] += 1
+            if preflop:
+                current[VPIP] = current[PFR] = 1
+        elif move == Moves.CALL:
+            current[CALLS] += 1
+            if preflop:
+                current[VPIP] = 1
+
+    def observe_end(self, game):
+        """Folds a finished game into its players' totals; called by HoldemGame."""
+        for p in game.players:
+            stats = self.stats(p)
+            stats.current[HANDS] = 1
+            if not (game.everyone_folded or p.folded):
+                stats.current[SHOWDOWNS] = 1
+            stats.end_game(self.decay)
+
+    def save(self, path=MODEL_PATH):
+        """
+        Atomically writes every player's totals to a file, creating its directory if
+        need be.
+
+        Args:
+            path (string, optional): Path of the model file
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        temp = path + '.tmp'
+        with open(temp, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, len(self.players)))
+            for name, stats in sorted(self.players.items()):
+                encoded = name.encode('utf-8')
+                f.write(_NAME.pack(len(encoded)) + encoded + _TOTALS.pack(*stats.totals))
+        os.rename(temp, path)
+
+    def load(self, path=MODEL_PATH):
+        """
+        Reads players' totals from a file, replacing those of any player already known.
+
+        Args:
+            path (string, optional): Path of the model file
+
+        Returns:
+            True if the file was loaded, False if it doesn't exist or isn't a model file.
+        """
+        if not os.path.exists(path):
+            return False
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            return False
+        offset = _HEADER.size
+        for _ in range(count):
+            length, = _NAME.unpack_from(data, offset)
+            offset += _NAME.size
+            name = data[offset:offset + length].decode('utf-8')
+            offset += length
+            stats = PlayerStats()
+            stats.totals = list(_TOTALS.unpack_from(data, offset))
+            offset += _TOTALS.size
+            self.players[name] = stats
+        return True
@@ -8,8 +8,20 @@ Description:
     This module implements a graphical user face implementation of the texas_holdem
     API. This implemenation is a 1v1 game between the player and an AI.
 
+    The AI decides on a worker thread, working on a copy of the game, and its move is
+    handed back to the GTK main loop with gobject.idle_add(), so the window keeps drawing
+    no matter how long the bot takes. A decision that takes longer than CPU_TIME_BUDGET
+    seconds is abandoned and the AI checks or calls instead.
+
+    The AI plays the strategy trained by cfr out of the policy file when there is one,
+    and at random otherwise. The player's tendencies are tracked by an
+    opponent_model.OpponentModel, saved when the window closes, and every hand is
+    recorded to the hand_history log.
+
 "Constant" Variables:
     FACE_DOWN (string): Plaintext path to the card-back image
+    CPU_TIME_BUDGET (float): Seconds the AI may spend on a single decision
+    OPPONENT_DECAY (float): Weight kept by earlier games in the player's statistics, per game
     SEA_GREEN (gtk.gdk.Color): Color to be used in GUI
     .
     .
@@ -19,17 +31,25 @@ Description:
     RankStrings (dict): Dictionary mapping texas_holdem.Ranks enums to strings
     SuitStrings (dict): Dictionary mapping texas_holdem.Suits enums to strings
 """
-#TODO: Write machine learning script, replace randomization with learned behavior in _cpu_move()
 
 import pygtk
+import gobject
 import gtk
 import texas_holdem
 import locale
 import pango
-import random
+import strategies
+import policy
+import opponent_model
+import hand_history
+import copy
+import threading
 pygtk.require('2.0')
+gobject.threads_init()
 
 FACE_DOWN = 'art_assets/black_joker.png'
+CPU_TIME_BUDGET = 5.0
+OPPONENT_DECAY = 0.99
 SEA_GREEN = gtk.gdk.Color(0.18, 0.55, 0.34)
 DARK_SLATE_BLUE = gtk.gdk.Color(0.28, 0.24, 0.55)
 GHOST_WHITE = gtk.gdk.Color(0.97, 0.97, 1.0)
@@ -48,12 +68,23 @@ HandStrings = {0:'HIGH CARD', 1:'PAIR', 2:'TWO PAIR', 3:'THREE OF A KIND', 4:'ST
 SuitStrings = {0:'_of_clubs', 1:'_of_diamonds', 2:'_of_hearts', 3:'_of_spades'}
 
 class PlayHoldem:
-    """Texas Hold'em GUI Implementation class"""
+    """
+    Texas Hold'em GUI Implementation class
+
+    Args:
+        model_path (string, optional): Path the player's statistics are loaded from and
+            saved to; None keeps them for this session only
+        history_path (string, optional): Path of the hand history log; None records nothing
+    """
 
     def delete_event(self, widget, event, data=None):
         return False
 
     def destroy(self, widget, data=None):
+        if self.model_path is not None:
+            self.opponent_model.save(self.model_path)
+        if self.history_log is not None:
+            self.history_log.close()
         gtk.main_quit()
 
     def _set_button(self, button, label, color):
@@ -66,25 +97,59 @@ class PlayHoldem:
         button.set_size_request(70, 70)
         button.show()
 
+    def _get_pixbuf(self, card):
+        """Helper function to get the scaled image of a card, decoding it on first use.
+        Empty cards get the card-back image."""
+        key = (card.rank, card.suit)
+        pixbuf = self.pixbufs.get(key)
+        if pixbuf is None:
+            if card.rank == None:
+                img_path = FACE_DOWN
+            else:
+                img_path = 'art_assets/' + RankStrings[card.rank] + SuitStrings[card.suit] + '.png'
+            pixbuf = gtk.gdk.pixbuf_new_from_file(img_path)
+            pixbuf = pixbuf.scale_simple(100, 150, gtk.gdk.INTERP_BILINEAR)
+            self.pixbufs[key] = pixbuf
+        return pixbuf
+
+    def _preload_pixbufs(self, cards):
+        """Idle callback that decodes one card image into the cache per call, so the
+        cache fills in the background while the window stays responsive."""
+        for card in cards:
+            if (card.rank, card.suit) not in self.pixbufs:
+                self._get_pixbuf(card)
+                return True #more to come; run again when idle
+        return False
+
     def _set_card_image(self, box, image, card):
         """Helper function to set card box's background color and image according to
-        the specified image path."""
-        #get appropriate color/image
+        the specified card, unless it already shows that card."""
+        #cards are shared instances, so an unchanged slot still holds the same object
+        if self.rendered.get(image) is card:
+            return
+        self.rendered[image] = card
+        #get appropriate color
         if card.rank == None:
             color = DARK_SLATE_BLUE
-            img_path = FACE_DOWN
         else:
             color = GHOST_WHITE
-            img_path = 'art_assets/' + RankStrings[card.rank] + SuitStrings[card.suit] + '.png'
         #change background color of widget
         box.modify_bg(gtk.STATE_NORMAL, color)
         #assign (presumably transparent) image to widget
-        pixbuf = gtk.gdk.pixbuf_new_from_file(img_path)
-        scaled_pixbuf = pixbuf.scale_simple(100, 150, gtk.gdk.INTERP_BILINEAR)
-        image.set_from_pixbuf(scaled_pixbuf)
+        image.set_from_pixbuf(self._get_pixbuf(card))
+
+    def _show_amount(self, widget, label, amount, y):
+        """Helper function to show a dollar amount in a TextView centered at height y,
+        unless it already shows that amount."""
+        if self.rendered.get(widget) == amount:
+            return
+        self.rendered[widget] = amount
+        self._set_text(widget, label + locale.format("%d", amount, grouping=True))
+        self.layout.move(widget, 325-(widget.get_buffer().get_char_count()*4), y)
 
     def _update_display(self, update_cpu):
-        """Helper function to update the GUI to reflect recent changes in the game's state."""
+        """Helper function to update the GUI to reflect recent changes in the game's state.
+        Only widgets whose values changed since they were last shown are touched."""
         self._set_card_image(self.player_card1_box, self.player_card1, self.player.card1)
         self._set_card_image(self.player_card2_box, self.player_card2, self.player.card2)
 
@@ -100,17 +165,19 @@ class PlayHoldem:
             #player doesn't have enough money to raise
             self.button_raise_bid.set_sensitive(False)
             self.bid_text.set_sensitive(False)
-        self.layout.move(self.prompt, 325-int(self.prompt.get_buffer().get_char_count()*5.5), 0)
-        self._set_text(self.pot_text, "Pot: $" + locale.format("%d", self.game.pot, grouping=True))
-        self.layout.move(self.pot_text, 325-int(self.pot_text.get_buffer().get_char_count()*5.5), 40)
-        self._set_text(self.cpu_money_text, "CPU: $" + locale.format("%d", self.cpu.balance, grouping=True))
-        self.layout.move(self.cpu_money_text, 325-(self.cpu_money_text.get_buffer().get_char_count()*4), 100)
-        self._set_text(self.cpu_bid_text, "Bid: $" + locale.format("%d", self.cpu.bid, grouping=True))
-        self.layout.move(self.cpu_bid_text, 325-(self.cpu_bid_text.get_buffer().get_char_count()*4), 120)
-        self._set_text(self.player_money_text, "Player: $" + locale.format("%d", self.player.balance, grouping=True))
-        self.layout.move(self.player_money_text, 325-(self.player_money_text.get_buffer().get_char_count()*4), 735)
-        self._set_text(self.player_bid_text, "Bid: $" + locale.format("%d", self.player.bid, grouping=True))
-        self.layout.move(self.player_bid_text, 325-(self.player_bid_text.get_buffer().get_char_count()*4), 715)
+        #the prompt is also set by moves, so recenter it whenever its length changed
+        prompt_length = self.prompt.get_buffer().get_char_count()
+        if self.rendered.get(self.prompt) != prompt_length:
+            self.rendered[self.prompt] = prompt_length
+            self.layout.move(self.prompt, 325-int(prompt_length*5.5), 0)
+        if self.rendered.get(self.pot_text) != self.game.pot:
+            self.rendered[self.pot_text] = self.game.pot
+            self._set_text(self.pot_text, "Pot: $" + locale.format("%d", self.game.pot, grouping=True))
+            self.layout.move(self.pot_text, 325-int(self.pot_text.get_buffer().get_char_count()*5.5), 40)
+        self._show_amount(self.cpu_money_text, "CPU: $", self.cpu.balance, 100)
+        self._show_amount(self.cpu_bid_text, "Bid: $", self.cpu.bid, 120)
+        self._show_amount(self.player_money_text, "Player: $", self.player.balance, 735)
+        self._show_amount(self.player_bid_text, "Bid: $", self.player.bid, 715)
         self._set_text(self.bid_text, str(max(50, self.game.lastraise)))
 
         if update_cpu:
@@ -118,6 +185,8 @@ class PlayHoldem:
             self._set_card_image(self.cpu_card2_box, self.cpu_card2, self.cpu.card2)
 
         #deactivate buttons if moves shouldn't be performed
+        if self.cpu_thinking:
+            return
         if self.player.bid < self.game.bid:
             self.button_check.set_sensitive(False)
             self.button_call.set_sensitive(True)
@@ -126,8 +195,12 @@ class PlayHoldem:
             self.button_call.set_sensitive(False)
 
     def _set_text(self, widget, text):
-        """Helper function to change the text in a TextView."""
+        """Helper function to change the text in a TextView, unless it already shows the
+        text."""
         buf = widget.get_buffer()
+        #compare against the buffer itself, since editable TextViews change under us
+        if buf.get_text(buf.get_start_iter(), buf.get_end_iter()) == text:
+            return
         buf.set_text(text)
         widget.set_buffer(buf)
         widget.show()
@@ -140,7 +213,7 @@ class PlayHoldem:
         self._toggle_interface(True)
         self._update_display(True)
         if self.game.is_next(self.cpu):
-            self._cpu_move()
+            self._start_cpu_move()
 
     def _toggle_interface(self, show):
         """Helper function to toggle the main game interface on/off when game starts/ends."""
@@ -172,30 +245,77 @@ class PlayHoldem:
 
         return message
 
-    def _cpu_move(self):
-        """Performs a move by the AI."""
-        #self.game.call(self.cpu)
-        decision = random.randrange(4)
-        if decision == 1 and self.game.lastraise == 0: #shouldn't call. check instead.
-            decision = 0
-        elif decision == 0 and self.cpu.bid < self.game.lastraise: #can't check. call instead.
-            decision = 1
-        if decision == 0:
+    def _start_cpu_move(self):
+        """Has the AI start deciding on its move on a worker thread. The player's buttons
+        stay disabled until the move has been made."""
+        self.cpu_thinking = True
+        self.cpu_decision += 1
+        self._toggle_interface(False)
+        self.button_shuffle.hide()
+        self._set_text(self.prompt, self.cpu.name + " is thinking...")
+        self._update_display(False)
+        #the worker gets its own copy of the game, so nothing it does can affect the GUI's
+        #the copy shares the RNG, and leaves the observers behind so the AI's lookahead
+        #isn't recorded as moves
+        game = copy.deepcopy(self.game, {id(self.game.deck.rng): self.game.deck.rng,
+                        id(self.game.observers): []})
+        worker = threading.Thread(target=self._cpu_decide,
+                        args=(self.cpu_decision, game, game.players[game.actor]))
+        worker.daemon = True
+        worker.start()
+        self.cpu_timer = gobject.timeout_add(int(CPU_TIME_BUDGET*1000), self._cpu_timeout,
+                        self.cpu_decision)
+
+    def _cpu_decide(self, decision, game, player):
+        """Runs on the worker thread to have the AI's strategy pick a move and hand it back
+        to the main loop."""
+        move, bid_amount = self.cpu_strategy.decide(game, player)
+        gobject.idle_add(self._cpu_move, decision, move, bid_amount)
+
+    def _cpu_timeout(self, decision):
+        """Timeout callback for when the AI runs out of time: it checks or calls instead."""
+        if decision == self.cpu_decision and self.cpu_thinking:
+            self.cpu_timer = None
+            if self.cpu.bid >= self.game.bid:
+                self._cpu_move(decision, texas_holdem.Moves.CHECK, 0)
+            else:
+                self._cpu_move(decision, texas_holdem.Moves.CALL, 0)
+        return False
+
+    def _cpu_move(self, decision, move, bid_amount):
+        """Performs a move by the AI, once its decision is back on the main loop."""
+        if decision != self.cpu_decision or not self.cpu_thinking:
+            #the decision came back too late and was already replaced
+            return False
+        self.cpu_thinking = False
+        if self.cpu_timer is not None:
+            gobject.source_remove(self.cpu_timer)
+            self.cpu_timer = None
+        if move == texas_holdem.Moves.FOLD:
+            self.game.fold(self.cpu)
+            self._set_text(self.prompt, self.cpu.name + " folded.")
+        elif move == texas_holdem.Moves.CHECK:
             self.game.check(self.cpu)
             self._set_text(self.prompt, self.cpu.name + " checked.")
-        elif decision == 1:
+        elif move == texas_holdem.Moves.CALL:
             self.game.call(self.cpu)
             self._set_text(self.prompt, self.cpu.name + " called.")
-        elif decision >= 2:
-            bid_amount = random.randrange(self.game.lastraise, self.game.lastraise*2+1)
-            bid_amount += 50 - (bid_amount % 50)
+        else:
             self.game.make_bid(self.cpu, bid_amount)
             self._set_text(self.prompt, self.cpu.name + " raised the bet to " \
                     + locale.format("%d", self.game.bid, grouping=True) + ".")
 
         self._update_display(False)
-        if self.game.is_next(self.cpu) and not self.game.finished:
-            self._cpu_move()
+        if self.game.finished:
+            self._update_display(not self.cpu.folded)
+            self._toggle_interface(False)
+        elif self.game.is_next(self.cpu):
+            self._start_cpu_move()
+        else:
+            #player's turn again
+            self._toggle_interface(True)
+            self._update_display(False)
+        return False
 
     def _player_move(self, opt, move):
         """Performs a move by the player when an action button is clicked."""
@@ -223,20 +343,40 @@ class PlayHoldem:
             self._toggle_interface(False)
             return True
         elif self.game.is_next(self.cpu):
-            self._cpu_move()
-            self._update_display(False)
-            if self.game.finished:
-                self._update_display(not self.cpu.folded)
-                self._toggle_interface(False)
+            self._start_cpu_move()
         return True
 
-    def __init__(self):
+    def __init__(self, model_path=opponent_model.MODEL_PATH,
+                    history_path=hand_history.HISTORY_PATH):
         #initialize a 2-player game
         self.game = texas_holdem.HoldemGame()
         self.player = texas_holdem.Player('The player')
         self.cpu = texas_holdem.Player('PokerMaster 3000')
         self.game.add_player(self.cpu)
         self.game.add_player(self.player)
+        #statistics of how the player plays, kept across sessions
+        self.model_path = model_path
+        self.opponent_model = opponent_model.OpponentModel(OPPONENT_DECAY)
+        if model_path is not None:
+            self.opponent_model.load(model_path)
+        self.game.observers.append(self.opponent_model)
+        #every hand played is recorded
+        self.history_log = None
+        if history_path is not None:
+            self.history_log = hand_history.HandLogWriter(history_path)
+            self.game.observers.append(self.history_log)
+        #the policy file isn't opened until the AI's first move; the AI draws its moves
+        #from the game's own stream rather than the module-global generator
+        rng = self.game.deck.rng
+        self.cpu_strategy = strategies.PolicyStrategy(policy.Policy(),
+                        fallback=strategies.RandomStrategy(rng), rng=rng)
+        self.cpu_thinking = False
+        self.cpu_decision = 0 #numbers the AI's decisions, so late ones can be told apart
+        self.cpu_timer = None
+        #decoded and scaled card images, keyed by (rank, suit); (None, None) is the card back
+        self.pixbufs = {}
+        #last value shown by each widget, so unchanged widgets can be skipped
+        self.rendered = {}
 
         #initialize window
         self.window = gtk.Window(gtk.WINDOW_TOPLEVEL)
@@ -392,6 +532,8 @@ class PlayHoldem:
 
         #player clicks shuffle to start game
         self._toggle_interface(False)
+        #decode the rest of the card images while waiting for the first click
+        gobject.idle_add(self._preload_pixbufs, iter(texas_holdem.CARDS))
 
 
     def main(self):
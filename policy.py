@@ -0,0 +1,197 @@
+"""
+Texas Hold'em Trained Policy Files (policy)
+
+Description:
+    This module serves strategies trained by cfr during play. A policy file holds the
+    average strategy of every info set of a CFRTrainer, along with the bet sizes, raise cap
+    and card abstraction it was trained with, so it can answer "what does the strategy do
+    here" for any heads-up HoldemGame.
+
+    Policy files are memory-mapped read-only and never parsed, so opening one costs the
+    same no matter how large it is, and processes playing from the same file share its
+    pages. A Policy doesn't even open its file until the first decision is asked of it, so
+    creating one at start-up is free.
+
+    A decision turns HoldemGame.history into a path through the abstract betting tree, one
+    step per move: raises become the abstract raise while the round's raise cap allows
+    it, and calls otherwise, and any moves made after the abstract round has closed are
+    skipped. The player's cards give their bucket for the round, and the info set's three
+    probabilities are read straight out of the file.
+
+    File layout (little-endian):
+        header: magic 'HPOL', version (uint16), raises per round (uint16), card abstraction
+            class name (char[32]), raise size per round (uint32[5]), buckets per round
+            (uint32[5]), number of info sets (uint64), byte offset of the probabilities
+            (uint64)
+        probabilities: uint16 probability[info sets][3] of FOLD, CALL and RAISE, out of
+            65535, in the info set order of cfr.BettingTree.assign_infosets()
+
+"Constant" Variables:
+    POLICY_PATH (string): Default path of the policy file, next to this module
+"""
+
+import mmap
+import os
+import struct
+from texas_holdem import Moves
+
+POLICY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'policy.bin')
+
+_MAGIC = 'HPOL'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHH32s5I5IQQ')
+_PROBS = struct.Struct('<3H')
+_SCALE = 65535
+#module each card abstraction a policy can be trained with is defined in
+_ABSTRACTIONS = {'HandTypeAbstraction': 'cfr', 'BucketAbstraction': 'hand_buckets'}
+#abstract action of each move (cfr.FOLD, CALL and RAISE)
+_ACTIONS = {Moves.FOLD: 0, Moves.CHECK: 1, Moves.CALL: 1, Moves.RAISE_BID: 2}
+
+def save_policy(trainer, path=POLICY_PATH):
+    """
+    Atomically writes the average strategy of a trainer to a policy file.
+
+    Args:
+        trainer (cfr.CFRTrainer): The trainer
+        path (string, optional): Path of the policy file to write
+    """
+    import numpy as np
+    name = trainer.abstraction.__class__.__name__
+    if name not in _ABSTRACTIONS:
+        raise ValueError("policies can't be trained with %s" % name)
+    strategy = trainer.average_strategy()
+    probs = np.round(strategy * _SCALE).astype('<u2')
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, trainer.max_raises, name,
+                        *(trainer.bet_sizes + trainer.tree.num_buckets +
+                        (len(probs), _HEADER.size))))
+        f.write(probs.tostring())
+    os.rename(temp, path)
+
+
+class Policy:
+    """
+    Trained strategy read out of a policy file, opened on first use.
+
+    Args:
+        path (string, optional): Path of the policy file
+
+    Attributes:
+        path (string): Path of the policy file
+        loaded (boolean): Whether the file has been opened successfully
+        bet_sizes (int[]): Raise size of each betting round, once loaded
+        max_raises (int): Raises allowed per betting round, once loaded
+    """
+    def __init__(self, path=POLICY_PATH):
+        self.path = path
+        self.loaded = False
+        self._tried = False
+
+    def load(self):
+        """
+        Memory-maps the policy file and builds the betting tree it was trained on. Does
+        nothing if that was already tried.
+
+        Returns:
+            True if the policy can be played, False if the file doesn't exist, isn't a
+            policy file, or its card abstraction isn't available.
+        """
+        if self._tried:
+            return self.loaded
+        self._tried = True
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        fields = _HEADER.unpack_from(mapped, 0)
+        magic, version, max_raises, name = fields[:4]
+        name = name.rstrip('\0')
+        if magic != _MAGIC or version != _VERSION or name not in _ABSTRACTIONS:
+            mapped.close()
+            return False
+        import cfr
+        try:
+            abstraction = getattr(__import__(_ABSTRACTIONS[name]), name)()
+        except (LookupError, IOError):
+            #the abstraction's tables haven't been generated
+            mapped.close()
+            return False
+        num_buckets = fields[9:14]
+        if tuple(abstraction.num_buckets) != num_buckets:
+            #the policy was trained on buckets other than the ones loaded
+            mapped.close()
+            return False
+        tree = cfr.BettingTree(fields[4:9], max_raises)
+        tree.assign_infosets(num_buckets)
+        if tree.num_infosets != fields[14]:
+            mapped.close()
+            return False
+        self.bet_sizes = tree.bet_sizes
+        self.max_raises = max_raises
+        self._tree = tree
+        self._abstraction = abstraction
+        self._mmap = mapped
+        self._offset = fields[15]
+        self.loaded = True
+        return True
+
+    def _close_rounds(self, node, rnd):
+        """
+        Helper function to call through the abstract betting rounds before the given one,
+        for when the real game has moved on. Returns -1 if the abstract hand is over.
+        """
+        tree = self._tree
+        #only decision nodes have info sets
+        while tree.offset[node] >= 0 and tree.round[node] < rnd:
+            node = tree.children[node][_ACTIONS[Moves.CALL]]
+        return node if tree.offset[node] >= 0 else -1
+
+    def _node(self, game):
+        """
+        Helper function to follow a game's history through the abstract betting tree.
+        Returns -1 if the history leaves the tree.
+        """
+        children = self._tree.children
+        rounds = self._tree.round
+        node = 0
+        for rnd, seat, move, amount in game.history:
+            node = self._close_rounds(node, rnd)
+            if node < 0:
+                return -1
+            if rounds[node] > rnd:
+                #the abstract round closed when a raise past the cap was taken as a call
+                continue
+            child = children[node][_ACTIONS[move]]
+            node = child if child >= 0 else children[node][_ACTIONS[Moves.CALL]]
+        return self._close_rounds(node, game.betting_round)
+
+    def distribution(self, game):
+        """
+        Looks up the strategy of the player whose turn it is.
+
+        Args:
+            game (HoldemGame): A heads-up game that isn't finished
+
+        Returns:
+            Tuple of the probabilities of folding, checking or calling, and raising, or
+            None if there's no policy loaded or the game isn't one it covers.
+        """
+        if not self.load() or len(game.players) != 2 or game.finished:
+            return None
+        node = self._node(game)
+        if node < 0 or self._tree.round[node] != game.betting_round:
+            return None
+        #abstract player 0 is the one after the dealer
+        first = (game.players.index(game.dealer) + 1) % 2
+        if self._tree.player[node] != (game.actor - first) % 2:
+            return None
+        player = game.players[game.actor]
+        board = [c for c in (game.card1, game.card2, game.card3, game.card4, game.card5)
+                        if c.rank is not None]
+        bucket = self._abstraction.bucket(game.betting_round, player.card1, player.card2,
+                        board)
+        probs = _PROBS.unpack_from(self._mmap,
+                        self._offset + (self._tree.offset[node] + bucket) * _PROBS.size)
+        total = float(sum(probs))
+        return tuple(p / total for p in probs)
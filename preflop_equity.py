@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+"""
+Texas Hold'em Preflop Equity Tables (preflop_equity)
+
+Description:
+    This module serves precomputed preflop equities for the 169 canonical starting hands,
+    both against 1 to 9 random opponents and heads-up against every other canonical hand.
+    The tables live in a binary file that is memory-mapped when the module is imported, so
+    a lookup is a single struct.unpack_from() with no startup computation. Running the
+    module as a script (re)generates the file by Monte Carlo sampling with NumPy.
+
+    Only generating the tables needs NumPy; looking them up needs nothing beyond the
+    standard library.
+
+    Canonical hands are numbered on a 13x13 grid: row*13 + col, where pairs sit on the
+    diagonal, suited hands have row > col and offsuit hands have row < col.
+
+    File layout (little-endian):
+        header: magic 'PFEQ', version (uint16), number of sections (uint16)
+        per section: num_decks (uint16), byte offset of its tables (uint32)
+        per section's tables: float32 vs_random[169][9], float32 headsup[169][169]
+
+"Constant" Variables:
+    TABLE_PATH (string): Default path of the table file, next to this module
+    NUM_CLASSES (int): Number of canonical starting hands
+    MAX_OPPONENTS (int): Largest number of random opponents tabulated
+"""
+
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import sys
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.bin')
+NUM_CLASSES = 169
+MAX_OPPONENTS = 9
+DEF_SAMPLES = 20000
+DEF_HEADSUP_SAMPLES = 2000
+
+_MAGIC = 'PFEQ'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHH')
+_SECTION = struct.Struct('<HI')
+_FLOAT = struct.Struct('<f')
+_HEADSUP_OFFSET = NUM_CLASSES * MAX_OPPONENTS * _FLOAT.size
+_SECTION_SIZE = _HEADSUP_OFFSET + NUM_CLASSES * NUM_CLASSES * _FLOAT.size
+_CHUNK_ROWS = 1 << 16 #deals dealt and scored at a time when tabulating
+
+_mmap = None
+_sections = {}
+
+def hand_class(card1, card2):
+    """
+    Args:
+        card1 (Card): First card in the hand
+        card2 (Card): Second card in the hand
+
+    Returns:
+        Canonical starting hand index in range(169).
+    """
+    high, low = max(card1.rank, card2.rank), min(card1.rank, card2.rank)
+    if card1.suit == card2.suit and high != low:
+        return high*13 + low
+    return low*13 + high
+
+def _class_combos(index):
+    """
+    Helper function to list every concrete hand of a canonical hand as pairs of
+    Card.index values.
+    """
+    row, col = divmod(index, 13)
+    if row == col:
+        return [(s1*13 + row, s2*13 + row) for s1 in range(4) for s2 in range(s1+1, 4)]
+    elif row > col:
+        return [(s*13 + row, s*13 + col) for s in range(4)]
+    return [(s1*13 + col, s2*13 + row) for s1 in range(4) for s2 in range(4) if s1 != s2]
+
+def load_tables(path=TABLE_PATH):
+    """
+    Memory-maps a table file, replacing any tables already loaded.
+
+    Args:
+        path (string, optional): Path of the table file
+
+    Returns:
+        True if the file was loaded, False if it doesn't exist or isn't a table file.
+    """
+    global _mmap, _sections
+    if not os.path.exists(path):
+        return False
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count = _HEADER.unpack_from(mapped, 0)
+    if magic != _MAGIC or version != _VERSION:
+        mapped.close()
+        return False
+    sections = {}
+    for i in range(count):
+        num_decks, offset = _SECTION.unpack_from(mapped, _HEADER.size + i*_SECTION.size)
+        sections[num_decks] = offset
+    _mmap, _sections = mapped, sections
+    return True
+
+def _section(num_decks):
+    """Helper function to find the byte offset of a deck count's tables."""
+    try:
+        return _sections[num_decks]
+    except KeyError:
+        raise LookupError("no preflop tables for %d deck(s); run preflop_equity.py" % num_decks)
+
+def class_equity(index, num_opponents=1, num_decks=1):
+    """
+    Args:
+        index (int): Canonical starting hand index
+        num_opponents (int, optional): Number of random opponents, from 1 to 9
+        num_decks (int, optional): Number of 52-card sets in the deck
+
+    Returns:
+        Equity of the hand against the random opponents.
+    """
+    offset = _section(num_decks) + (index*MAX_OPPONENTS + num_opponents-1) * _FLOAT.size
+    return _FLOAT.unpack_from(_mmap, offset)[0]
+
+def class_matchup(index, other, num_decks=1):
+    """
+    Args:
+        index (int): Canonical starting hand index
+        other (int): Opponent's canonical starting hand index
+        num_decks (int, optional): Number of 52-card sets in the deck
+
+    Returns:
+        Heads-up equity of the hand against the opponent's, averaged over suits.
+    """
+    offset = _section(num_decks) + _HEADSUP_OFFSET + (index*NUM_CLASSES + other) * _FLOAT.size
+    return _FLOAT.unpack_from(_mmap, offset)[0]
+
+def preflop_equity(card1, card2, num_opponents=1, num_decks=1):
+    """
+    Args:
+        card1 (Card): First card in the hand
+        card2 (Card): Second card in the hand
+        num_opponents (int, optional): Number of random opponents, from 1 to 9
+        num_decks (int, optional): Number of 52-card sets in the deck
+
+    Returns:
+        Equity of the hand against the random opponents.
+    """
+    return class_equity(hand_class(card1, card2), num_opponents, num_decks)
+
+
+def _shares(hero, opponents):
+    """
+    Helper function to compute the hero's pot share per row, given its strengths and an
+    (N, k) array of opponent strengths.
+    """
+    import numpy as np
+    best = opponents.max(axis=1)
+    tied = (opponents == best[:, None]).sum(axis=1)
+    return np.where(hero > best, 1.0, np.where(hero == best, 1.0 / (tied + 1), 0.0))
+
+def _deal(rng, rows, num_decks, used, count):
+    """
+    Helper function to deal count cards per row from a deck missing the positions in used.
+
+    Returns:
+        (rows, count) array of Card.index values.
+    """
+    import numpy as np
+    order = rng.rand(rows, 52*num_decks)
+    order[np.arange(rows)[:, None], used] = 2.0
+    return np.argsort(order, axis=1)[:, :count] % 52
+
+def _vs_random_task(args):
+    """
+    Helper function run by the workers to tabulate one hand against 1 to 9 opponents.
+    """
+    import numpy as np
+    import batch_evaluator
+    index, num_decks, samples, seed = args
+    rng = np.random.RandomState(seed)
+    hole = np.array(_class_combos(index)[0])
+    cards = _deal(rng, samples, num_decks, np.tile(hole, (samples, 1)), 5 + 2*MAX_OPPONENTS)
+    board = cards[:, :5]
+    hero = batch_evaluator.evaluate_batch(
+                    np.hstack((np.tile(hole, (samples, 1)), board)))[0]
+    opponents = np.column_stack([batch_evaluator.evaluate_batch(
+                    np.hstack((cards[:, 5+2*i:7+2*i], board)))[0] for i in range(MAX_OPPONENTS)])
+    return [_shares(hero, opponents[:, :k]).mean() for k in range(1, MAX_OPPONENTS+1)]
+
+def _headsup_task(args):
+    """
+    Helper function run by the workers to tabulate one hand against every hand at or
+    after it in index order. Deals are dealt and scored _CHUNK_ROWS at a time, so memory
+    stays flat however many samples are asked for.
+    """
+    import numpy as np
+    import batch_evaluator
+    index, num_decks, samples, seed = args
+    rng = np.random.RandomState(seed)
+    others = np.repeat(np.arange(index, NUM_CLASSES), samples)
+    combos = np.array(_class_combos(index))
+    other_combos = [np.array(_class_combos(other)) for other in range(NUM_CLASSES)]
+    totals = np.zeros(NUM_CLASSES - index)
+    counts = np.zeros(NUM_CLASSES - index)
+    for start in range(0, len(others), _CHUNK_ROWS):
+        chunk = others[start:start + _CHUNK_ROWS]
+        rows = len(chunk)
+        hole = combos[rng.randint(len(combos), size=rows)]
+        other_hole = np.empty((rows, 2), dtype=np.int64)
+        for other in np.unique(chunk):
+            chosen = chunk == other
+            other_hole[chosen] = other_combos[other][rng.randint(len(other_combos[other]),
+                            size=chosen.sum())]
+        #the opponent draws from the last copy of the deck, so only one deck can collide
+        valid = ((hole[:, :1] != other_hole) & (hole[:, 1:] != other_hole)).all(axis=1)
+        if num_decks > 1:
+            valid[:] = True
+        used = np.hstack((hole, other_hole + 52*(num_decks-1)))
+        board = _deal(rng, rows, num_decks, used, 5)
+        hero = batch_evaluator.evaluate_batch(np.hstack((hole, board)))[0]
+        villain = batch_evaluator.evaluate_batch(np.hstack((other_hole, board)))[0]
+        shares = _shares(hero, villain[:, None]) * valid
+        totals += np.bincount(chunk - index, weights=shares, minlength=len(totals))
+        counts += np.bincount(chunk - index, weights=valid, minlength=len(counts))
+    return totals / np.maximum(counts, 1)
+
+def generate_tables(path=TABLE_PATH, deck_counts=(1,), samples=DEF_SAMPLES,
+                    headsup_samples=DEF_HEADSUP_SAMPLES, processes=None, seed=None):
+    """
+    Computes the preflop tables by Monte Carlo sampling and writes them to a file, then
+    loads it.
+
+    Args:
+        path (string, optional): Path of the table file to write
+        deck_counts (int[], optional): Deck counts to tabulate, one section each
+        samples (int, optional): Deals sampled per hand against random opponents
+        headsup_samples (int, optional): Deals sampled per heads-up matchup
+        processes (int, optional): Worker processes; None uses every core
+        seed (int, optional): Master seed the per-task seeds are drawn from
+    """
+    import numpy as np
+    import hand_evaluator
+    hand_evaluator.build_tables()
+    master = random.Random(seed)
+    pool = multiprocessing.Pool(processes)
+    try:
+        sections = []
+        for num_decks in deck_counts:
+            vs_random = pool.map(_vs_random_task, [(i, num_decks, samples,
+                            master.getrandbits(32)) for i in range(NUM_CLASSES)])
+            upper = pool.map(_headsup_task, [(i, num_decks, headsup_samples,
+                            master.getrandbits(32)) for i in range(NUM_CLASSES)])
+            headsup = np.empty((NUM_CLASSES, NUM_CLASSES))
+            for i, row in enumerate(upper):
+                headsup[i:, i] = 1.0 - row
+                headsup[i, i:] = row
+            sections.append((num_decks, np.array(vs_random), headsup))
+    finally:
+        pool.terminate()
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(sections)))
+        offset = _HEADER.size + len(sections)*_SECTION.size
+        for i, (num_decks, _, _) in enumerate(sections):
+            f.write(_SECTION.pack(num_decks, offset + i*_SECTION_SIZE))
+        for _, vs_random, headsup in sections:
+            f.write(vs_random.astype('<f4').tostring())
+            f.write(headsup.astype('<f4').tostring())
+    load_tables(path)
+
+load_tables()
+
+
+if __name__ == "__main__":
+    #usage: preflop_equity.py [num_decks ...]
+    generate_tables(deck_counts=[int(arg) for arg in sys.argv[1:]] or [1])
@@ -0,0 +1,120 @@
+"""
+Texas Hold'em Bot Strategies (strategies)
+
+Description:
+    This module holds the decision-making logic of computer players, kept apart from any
+    GUI so the same strategies can play in play_holdem or headless in simulation.
+
+    A strategy is any object with a decide(game, player) method that returns a
+    (Moves enum, amount) tuple for the player whose turn it is. The amount is only used for
+    RAISE_BID moves. A strategy that reads the game's history of moves sets needs_history,
+    so headless tables only keep that history when someone reads it.
+
+    Strategies that can also decide for many tables of a batched_engine.BatchedHoldem at
+    once have a decide_batch(batch, rows, seat) method, which returns arrays of Moves enums
+    and amounts for the given tables, where it's the seat's turn. These need NumPy.
+"""
+
+import random
+from texas_holdem import Moves
+
+class RandomStrategy:
+    """
+    Picks checks, calls and raises at random, as the original CPU player did.
+
+    Args:
+        rng (random.Random, optional): Random number generator to draw decisions from
+
+    Attributes:
+        rng (random.Random): Random number generator to draw decisions from
+    """
+    RAISE_STEP = 50
+
+    def __init__(self, rng=random):
+        self.rng = rng
+        self._batch_rng = None
+
+    def decide(self, game, player):
+        decision = self.rng.randrange(4)
+        if decision == 1 and game.lastraise == 0: #shouldn't call. check instead.
+            decision = 0
+        elif decision == 0 and player.bid < game.lastraise: #can't check. call instead.
+            decision = 1
+        if decision == 0:
+            return (Moves.CHECK, 0)
+        elif decision == 1:
+            return (Moves.CALL, 0)
+        bid_amount = self.rng.randrange(game.lastraise, game.lastraise*2+1)
+        bid_amount += self.RAISE_STEP - (bid_amount % self.RAISE_STEP)
+        return (Moves.RAISE_BID, bid_amount)
+
+    def decide_batch(self, batch, rows, seat):
+        import numpy as np
+        if self._batch_rng is None:
+            #seeded from rng, so a seeded table still plays the same hands every time
+            self._batch_rng = np.random.RandomState(self.rng.getrandbits(32))
+        lastraise = batch.lastraise[rows]
+        decision = self._batch_rng.randint(4, size=len(rows))
+        decision[(decision == 1) & (lastraise == 0)] = 0 #shouldn't call. check instead.
+        decision[(decision == 0) & (batch.player_bid[rows, seat] < lastraise)] = 1 #can't check.
+        moves = np.choose(decision, (Moves.CHECK, Moves.CALL, Moves.RAISE_BID, Moves.RAISE_BID))
+        draw = self._batch_rng.rand(len(rows))
+        amounts = lastraise + (draw * (lastraise + 1)).astype(np.int64)
+        amounts += self.RAISE_STEP - (amounts % self.RAISE_STEP)
+        amounts[decision < 2] = 0
+        return moves, amounts
+
+
+class PassiveStrategy:
+    """Never raises or folds: checks when it can and calls otherwise."""
+
+    def decide(self, game, player):
+        if player.bid < game.bid:
+            return (Moves.CALL, 0)
+        return (Moves.CHECK, 0)
+
+    def decide_batch(self, batch, rows, seat):
+        import numpy as np
+        moves = np.where(batch.player_bid[rows, seat] < batch.bid[rows], Moves.CALL,
+                        Moves.CHECK)
+        return moves, np.zeros(len(rows), dtype=np.int64)
+
+
+class PolicyStrategy:
+    """
+    Plays a strategy trained by cfr out of a policy file, sampling a move from the
+    distribution of the info set it's in. Decides by another strategy wherever the policy
+    has nothing to say, such as games that aren't heads-up or when no policy file exists.
+
+    Args:
+        policy (policy.Policy): The trained policy
+        fallback (object, optional): Strategy to decide by when the policy can't;
+            PassiveStrategy by default
+        rng (random.Random, optional): Random number generator to sample moves with
+
+    Attributes:
+        policy (policy.Policy): The trained policy
+        fallback (object): Strategy to decide by when the policy can't
+        rng (random.Random): Random number generator to sample moves with
+    """
+    needs_history = True
+
+    def __init__(self, policy, fallback=None, rng=random):
+        self.policy = policy
+        self.fallback = fallback if fallback is not None else PassiveStrategy()
+        self.rng = rng
+
+    def decide(self, game, player):
+        probs = self.policy.distribution(game)
+        if probs is None:
+            return self.fallback.decide(game, player)
+        draw = self.rng.random()
+        if draw < probs[2]:
+            amount = max(self.policy.bet_sizes[game.betting_round], game.lastraise)
+            if player.balance >= amount + game.bid - player.bid:
+                return (Moves.RAISE_BID, amount)
+        elif draw < probs[2] + probs[0] and player.bid < game.bid:
+            return (Moves.FOLD, 0)
+        if player.bid < game.bid:
+            return (Moves.CALL, 0)
+        return (Moves.CHECK, 0)
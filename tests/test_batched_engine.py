@@ -0,0 +1,143 @@
+"""
+Regression tests that BatchedHoldem plays the same game as HoldemGame.
+
+Every table of a batch is shadowed by a HoldemGame dealt the same cards, and both are
+given the same random actions from short stacks, so raises, calls, checks, folds, all-ins
+and seats going broke all turn up. Every table is compared with its game after every step.
+"""
+
+import random
+import unittest
+from texas_holdem import CARDS, HoldemGame, Moves, Player
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TABLES = 8
+STEPS = 300
+STACKS = (20, 35, 50, 80, 120, 200)
+
+
+class _Deck(object):
+    """Deck dealing a stacked order of Card.index values instead of shuffling."""
+    def __init__(self):
+        self.num_decks = 1
+        self.rng = None
+        self._cards = []
+        self._next = 0
+
+    def reset(self):
+        pass
+
+    def stack(self, indices):
+        self._cards = [CARDS[i] for i in indices]
+        self._next = 0
+
+    def draw_card(self):
+        self._next += 1
+        return self._cards[self._next - 1]
+
+    def deal_many(self, n):
+        self._next += n
+        return self._cards[self._next - n:self._next]
+
+
+def _index(card):
+    """Helper function to get a card slot's Card.index, or -1 if it's empty."""
+    return -1 if card.rank is None else card.index
+
+
+@unittest.skipIf(np is None, "needs NumPy")
+class LockstepTest(unittest.TestCase):
+    def _shuffle(self, batch, t, game):
+        """Helper function to start a new game at a table and its HoldemGame."""
+        deck = self.rng.sample(range(52), 52)
+        batch.shuffle(tables=[t], decks=[deck])
+        game.shuffle()
+        game.deck.stack(deck)
+
+    def _action(self, game, player):
+        """Helper function to pick a random, sometimes invalid, action for the player."""
+        move = self.rng.choice((Moves.FOLD, Moves.CHECK, Moves.CHECK, Moves.CALL,
+                        Moves.CALL, Moves.RAISE_BID, Moves.RAISE_BID))
+        if move != Moves.RAISE_BID:
+            return move, 0
+        all_in = player.balance + player.bid - game.bid
+        return move, self.rng.choice((0, max(game.lastraise - 1, 0), all_in, all_in + 1,
+                        self.rng.randint(0, max(all_in, 0))))
+
+    def _compare(self, batch, t, game, seats):
+        """Helper function to check a table against its HoldemGame."""
+        self.assertEqual(batch.pot[t], game.pot)
+        self.assertEqual(batch.bid[t], game.bid)
+        self.assertEqual(batch.lastraise[t], game.lastraise)
+        self.assertEqual(batch.movecounter[t], game.movecounter)
+        self.assertEqual(batch.players_left[t], game.players_left)
+        self.assertEqual(batch.finished[t], game.finished)
+        self.assertTrue(game.is_next(seats[batch.actor[t]]))
+        for seat, p in enumerate(seats):
+            self.assertEqual(batch.balance[t, seat], p.balance)
+            self.assertEqual(batch.player_bid[t, seat], p.bid)
+            self.assertEqual(batch.folded[t, seat], p.folded)
+            self.assertEqual(batch.bankrupt[t, seat], p.bankrupt)
+            self.assertEqual(list(batch.hole[t, seat]), [_index(p.card1), _index(p.card2)])
+        self.assertEqual(list(batch.board[t]), [_index(c) for c in (game.card1, game.card2,
+                        game.card3, game.card4, game.card5)])
+        if game.finished:
+            self.assertEqual([p for p, won in zip(seats, batch.winners[t]) if won],
+                        [p for p in seats if p in game.winners])
+
+    def _play(self, num_players):
+        """Helper function to play TABLES tables of num_players seats in lockstep."""
+        from batched_engine import BatchedHoldem
+        self.rng = random.Random(num_players)
+        batch = BatchedHoldem(TABLES, num_players)
+        games = []
+        seats = []
+        for t in range(TABLES):
+            game = HoldemGame(verbose=False)
+            game.deck = _Deck()
+            for seat in range(num_players):
+                game.add_player(Player('seat %d' % seat, STACKS[seat]))
+                batch.balance[t, seat] = STACKS[seat]
+            games.append(game)
+            seats.append(list(game.players))
+            self._shuffle(batch, t, game)
+        seen = set()
+        for _ in range(STEPS):
+            players = [seats[t][batch.actor[t]] for t in range(TABLES)]
+            actions = [self._action(game, p) for game, p in zip(games, players)]
+            valid = batch.step([m for m, a in actions], [a for m, a in actions])
+            for t, game in enumerate(games):
+                move, amount = actions[t]
+                self.assertEqual(game.act(players[t], move, amount), valid[t])
+                if valid[t]:
+                    seen.add(move)
+                if batch.bankrupt[t].any():
+                    seen.add('all in')
+                self._compare(batch, t, game, seats[t])
+                if game.finished:
+                    if not all(p.balance for p in seats[t]):
+                        seen.add('broke')
+                    self._shuffle(batch, t, game)
+                    self._compare(batch, t, game, seats[t])
+        self.assertEqual(seen, set([Moves.FOLD, Moves.CHECK, Moves.CALL, Moves.RAISE_BID,
+                        'all in', 'broke']))
+
+    def test_heads_up(self):
+        self._play(2)
+
+    def test_three_seats(self):
+        self._play(3)
+
+    def test_four_seats(self):
+        self._play(4)
+
+    def test_six_seats(self):
+        self._play(6)
+
+
+if __name__ == '__main__':
+    unittest.main()
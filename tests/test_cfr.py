@@ -0,0 +1,58 @@
+"""
+Regression tests that CFR training gives the same tables for any number of processes and
+when resumed from a checkpoint.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import cfr
+
+BATCH_SIZE = 64
+MERGE_BATCHES = 2
+
+
+class TrainingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _train(self, batches, processes=1, checkpoint=None):
+        """Helper function to train a trainer to a number of batches."""
+        trainer = cfr.CFRTrainer()
+        trainer.train(batches * BATCH_SIZE, processes=processes, seed=7,
+                        batch_size=BATCH_SIZE, merge_batches=MERGE_BATCHES,
+                        checkpoint=checkpoint)
+        return trainer
+
+    def _assertSameTables(self, a, b):
+        self.assertEqual(a.iterations, b.iterations)
+        self.assertEqual(a.batches, b.batches)
+        self.assertTrue((a.regrets == b.regrets).all())
+        self.assertTrue((a.strategy_sum == b.strategy_sum).all())
+
+    def test_any_number_of_processes(self):
+        single = self._train(4)
+        self.assertEqual(single.iterations, 4 * BATCH_SIZE)
+        self.assertTrue(single.strategy_sum.any())
+        self._assertSameTables(single, self._train(4, processes=2))
+
+    def test_resume_from_checkpoint(self):
+        checkpoint = os.path.join(self.directory, 'cfr.npz')
+        self._train(2, checkpoint=checkpoint)
+        resumed = self._train(4, checkpoint=checkpoint)
+        self._assertSameTables(resumed, self._train(4))
+        #a checkpoint is only resumed by a run with the same settings
+        self.assertRaises(ValueError, cfr.CFRTrainer(plus=False).load, checkpoint)
+
+    def test_average_strategy_is_a_distribution(self):
+        strategy = self._train(1).average_strategy()
+        self.assertTrue((strategy >= 0).all())
+        self.assertTrue((abs(strategy.sum(axis=1) - 1.0) < 1e-9).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""
+Regression tests of the Monte Carlo equity estimator.
+"""
+
+import unittest
+from equity import estimate_equity
+from texas_holdem import Card, Ranks, Suits
+
+SAMPLES = 8000
+
+
+class EquityTest(unittest.TestCase):
+    def setUp(self):
+        self.aces = [Card(Ranks.ACE, Suits.SPADES), Card(Ranks.ACE, Suits.HEARTS)]
+
+    def test_same_seed_same_totals_in_any_pool(self):
+        alone = estimate_equity(self.aces, samples=SAMPLES, seed=3, processes=1,
+                        chunk_size=1000)
+        pooled = estimate_equity(self.aces, samples=SAMPLES, seed=3, processes=2,
+                        chunk_size=1000)
+        self.assertEqual(alone.samples, SAMPLES)
+        self.assertEqual((alone.wins, alone.ties, alone.losses),
+                        (pooled.wins, pooled.ties, pooled.losses))
+
+    def test_aces_against_one_hand(self):
+        estimate = estimate_equity(self.aces, samples=SAMPLES, seed=0, processes=1)
+        low, high = estimate.interval(z=4)
+        #pocket aces win about 85% against a random hand
+        self.assertTrue(low < 0.852 < high, (low, high))
+
+    def test_nut_hand_on_the_river(self):
+        board = [Card(Ranks.KING, Suits.SPADES), Card(Ranks.QUEEN, Suits.SPADES),
+                    Card(Ranks.JACK, Suits.SPADES), Card(Ranks.TEN, Suits.SPADES),
+                    Card(Ranks.TWO, Suits.HEARTS)]
+        estimate = estimate_equity(self.aces, board, num_opponents=3, samples=500, seed=0,
+                        processes=1)
+        self.assertEqual((estimate.wins, estimate.equity), (500, 1.0))
+
+    def test_needs_a_budget(self):
+        self.assertRaises(ValueError, estimate_equity, self.aces, samples=None)
+
+
+if __name__ == '__main__':
+    unittest.main()
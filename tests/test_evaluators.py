@@ -0,0 +1,56 @@
+"""
+Regression tests that the scalar and NumPy hand evaluators agree.
+"""
+
+import unittest
+import hand_evaluator
+from texas_holdem import CARDS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SAMPLES = 20000
+
+
+def _evaluate(row):
+    """Helper function to score a row of Card.index values with the scalar evaluator."""
+    return hand_evaluator.evaluate([CARDS[i] for i in row])
+
+
+@unittest.skipIf(np is None, "needs NumPy")
+class EvaluatorAgreementTest(unittest.TestCase):
+    def setUp(self):
+        import batch_evaluator
+        self.evaluate_batch = batch_evaluator.evaluate_batch
+        self.rng = np.random.RandomState(0)
+
+    def _hands(self, num_cards):
+        """Helper function to deal SAMPLES random hands from a single deck."""
+        return np.argsort(self.rng.rand(SAMPLES, 52), axis=1)[:, :num_cards]
+
+    def test_seven_card_hands(self):
+        hands = self._hands(7)
+        strengths, types = self.evaluate_batch(hands)
+        for row, strength, hand in zip(hands, strengths, types):
+            expected = _evaluate(row)
+            self.assertEqual(strength, expected)
+            self.assertEqual(hand, hand_evaluator.hand_type(expected))
+
+    def test_five_and_six_card_hands(self):
+        for num_cards in (5, 6):
+            hands = self._hands(num_cards)
+            strengths = self.evaluate_batch(hands)[0]
+            self.assertEqual(list(strengths), [_evaluate(row) for row in hands])
+
+    def test_every_category(self):
+        #random deals rarely make the strongest hands, so each is checked once by hand
+        hands = np.array([[8, 9, 10, 11, 12, 0, 14], [3, 4, 5, 6, 7, 20, 33],
+                        [0, 13, 26, 39, 5, 18, 7], [12, 0, 1, 2, 3, 20, 30]])
+        strengths = self.evaluate_batch(hands)[0]
+        self.assertEqual(list(strengths), [_evaluate(row) for row in hands])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Regression tests of exact heads-up equity against counting every matchup by hand.
+"""
+
+import itertools
+import unittest
+import hand_evaluator
+from texas_holdem import CARDS, Card, Ranks, Suits
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _brute_force(hole, board, holdings):
+    """Helper function to count wins, ties and matchups one runout and holding at a time."""
+    dead = set(c.index for c in hole + board)
+    wins = ties = samples = 0
+    for holding in holdings:
+        if dead & set(holding):
+            continue
+        live = [i for i in range(52) if i not in dead and i not in holding]
+        for runout in itertools.combinations(live, 5 - len(board)):
+            cards = [c.index for c in board] + list(runout)
+            mine = hand_evaluator.evaluate_indices([c.index for c in hole] + cards)
+            theirs = hand_evaluator.evaluate_indices(list(holding) + cards)
+            wins += mine > theirs
+            ties += mine == theirs
+            samples += 1
+    return samples, wins, ties
+
+
+@unittest.skipIf(np is None, "needs NumPy")
+class ExactEquityTest(unittest.TestCase):
+    def setUp(self):
+        import exact_equity
+        self.exact = exact_equity
+        self.hole = [Card(Ranks.ACE, Suits.SPADES), Card(Ranks.KING, Suits.SPADES)]
+        self.flop = [Card(Ranks.TWO, Suits.SPADES), Card(Ranks.SEVEN, Suits.HEARTS),
+                    Card(Ranks.JACK, Suits.DIAMONDS)]
+        self.turn = self.flop + [Card(Ranks.QUEEN, Suits.SPADES)]
+
+    def _totals(self, estimate):
+        return estimate.samples, estimate.wins, estimate.ties
+
+    def test_turn_against_random_hand(self):
+        holdings = list(itertools.combinations(range(52), 2))
+        self.assertEqual(self._totals(self.exact.equity_vs_random(self.hole, self.turn)),
+                        _brute_force(self.hole, self.turn, holdings))
+
+    def test_turn_against_hand(self):
+        opponent = [Card(Ranks.JACK, Suits.CLUBS), Card(Ranks.SEVEN, Suits.CLUBS)]
+        estimate = self.exact.equity_vs_hand(self.hole, self.turn, opponent)
+        self.assertEqual(self._totals(estimate), _brute_force(self.hole, self.turn,
+                        [(opponent[0].index, opponent[1].index)]))
+        self.assertEqual(estimate.samples, 44)
+
+    def test_flop_against_random_hand_matches_range(self):
+        everyone = [(c1, c2) for c1, c2 in itertools.combinations(CARDS, 2)]
+        self.assertEqual(self._totals(self.exact.equity_vs_random(self.hole, self.flop)),
+                        self._totals(self.exact.equity_vs_range(self.hole, self.flop,
+                                    everyone)))
+
+    def test_river_against_random_hand(self):
+        board = self.turn + [Card(Ranks.THREE, Suits.CLUBS)]
+        holdings = list(itertools.combinations(range(52), 2))
+        self.assertEqual(self._totals(self.exact.equity_vs_random(self.hole, board)),
+                        _brute_force(self.hole, board, holdings))
+
+    def test_shared_cards_are_rejected(self):
+        opponent = [Card(Ranks.ACE, Suits.SPADES), Card(Ranks.THREE, Suits.CLUBS)]
+        self.assertRaises(ValueError, self.exact.equity_vs_hand, self.hole, self.flop,
+                        opponent)
+        on_board = [Card(Ranks.TWO, Suits.SPADES), Card(Ranks.THREE, Suits.CLUBS)]
+        self.assertRaises(ValueError, self.exact.equity_vs_hand, self.hole, self.flop,
+                        on_board)
+        self.assertRaises(ValueError, self.exact.equity_vs_range, self.hole, self.flop,
+                        [opponent, on_board])
+        self.assertRaises(ValueError, self.exact.equity_vs_random, self.hole,
+                        self.flop + [self.hole[0]])
+        self.assertRaises(ValueError, self.exact.equity_vs_random, self.hole,
+                        self.flop[:2])
+
+
+if __name__ == '__main__':
+    unittest.main()
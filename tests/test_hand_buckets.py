@@ -0,0 +1,44 @@
+"""
+Regression tests of the expected hand strength estimates and clustering the hand buckets
+are generated from.
+"""
+
+import unittest
+import hand_buckets
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "needs NumPy")
+class GenerateTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.RandomState(0)
+
+    def test_ehs(self):
+        #a royal flush on the river, aces preflop and seven-deuce preflop
+        cards = [[12, 11, 10, 9, 8, 0, 14], [12, 25], [5, 13]]
+        ehs = [hand_buckets._ehs(np.array([c]), 4000, self.rng)[0] for c in cards]
+        self.assertEqual(ehs[0], 1.0)
+        self.assertAlmostEqual(ehs[1], 0.852, delta=0.03)
+        self.assertAlmostEqual(ehs[2], 0.346, delta=0.03)
+
+    def test_ehs_task_is_seeded(self):
+        first = hand_buckets._ehs_task((0, 100, 140, 50, 3))
+        self.assertEqual(first[:2], (0, 100))
+        self.assertEqual(first[2].dtype, np.float32)
+        self.assertEqual(list(first[2]), list(hand_buckets._ehs_task((0, 100, 140, 50, 3))[2]))
+
+    def test_cluster_separates_groups(self):
+        ehs = np.concatenate([self.rng.normal(center, 0.02, 5000)
+                        for center in (0.2, 0.5, 0.8)]).astype(np.float32)
+        bounds = hand_buckets._cluster(ehs, 3)
+        self.assertEqual(len(bounds), 2)
+        self.assertAlmostEqual(bounds[0], 0.35, delta=0.02)
+        self.assertAlmostEqual(bounds[1], 0.65, delta=0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
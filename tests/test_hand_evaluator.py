@@ -0,0 +1,114 @@
+"""
+Regression tests of hand_evaluator against a plain reference classification of 5-card
+hands, and of how its strengths order whole hands.
+"""
+
+import itertools
+import random
+import unittest
+import hand_evaluator
+from texas_holdem import Card, Hands, Ranks, Suits
+
+SAMPLES = 3000
+
+
+def _deck():
+    """Helper function to list one of every card."""
+    return [Card(r, s) for s in range(4) for r in range(13)]
+
+def _cards(*pairs):
+    """Helper function to make cards from (Ranks enum, Suits enum) pairs."""
+    return [Card(r, s) for r, s in pairs]
+
+def _category(cards):
+    """Helper function to classify a 5-card hand the long way, as a Hands enum."""
+    ranks = sorted((c.rank for c in cards), reverse=True)
+    counts = sorted((ranks.count(r) for r in set(ranks)), reverse=True)
+    flush = len(set(c.suit for c in cards)) == 1
+    straight = len(set(ranks)) == 5 and (ranks[0] - ranks[4] == 4 or
+                    ranks == [Ranks.ACE, Ranks.FIVE, Ranks.FOUR, Ranks.THREE, Ranks.TWO])
+    if straight and flush:
+        return Hands.ROYAL_FLUSH if ranks[4] == Ranks.TEN else Hands.STRAIGHT_FLUSH
+    if counts[0] == 4:
+        return Hands.FOUR_OF_A_KIND
+    if counts[:2] == [3, 2]:
+        return Hands.FULL_HOUSE
+    if flush:
+        return Hands.FLUSH
+    if straight:
+        return Hands.STRAIGHT
+    if counts[0] == 3:
+        return Hands.THREE_OF_A_KIND
+    if counts[:2] == [2, 2]:
+        return Hands.TWO_PAIR
+    if counts[0] == 2:
+        return Hands.PAIR
+    return Hands.HIGH_CARD
+
+
+class HandEvaluatorTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def test_categories_match_reference(self):
+        deck = _deck()
+        for _ in range(SAMPLES):
+            cards = self.rng.sample(deck, 5)
+            self.assertEqual(hand_evaluator.hand_type(hand_evaluator.evaluate(cards)),
+                            _category(cards))
+
+    def test_every_category(self):
+        s, h, d, c = Suits.SPADES, Suits.HEARTS, Suits.DIAMONDS, Suits.CLUBS
+        hands = [_cards((Ranks.TEN, s), (Ranks.JACK, s), (Ranks.QUEEN, s), (Ranks.KING, s),
+                            (Ranks.ACE, s)),
+                    _cards((Ranks.ACE, h), (Ranks.TWO, h), (Ranks.THREE, h), (Ranks.FOUR, h),
+                            (Ranks.FIVE, h)),
+                    _cards((Ranks.NINE, s), (Ranks.NINE, h), (Ranks.NINE, d), (Ranks.NINE, c),
+                            (Ranks.TWO, c)),
+                    _cards((Ranks.THREE, s), (Ranks.THREE, h), (Ranks.THREE, d),
+                            (Ranks.TWO, s), (Ranks.TWO, c)),
+                    _cards((Ranks.ACE, c), (Ranks.TWO, s), (Ranks.THREE, d), (Ranks.FOUR, h),
+                            (Ranks.FIVE, c))]
+        for cards in hands:
+            self.assertEqual(hand_evaluator.hand_type(hand_evaluator.evaluate(cards)),
+                            _category(cards))
+
+    def test_seven_cards_make_best_five(self):
+        deck = _deck()
+        for _ in range(SAMPLES // 10):
+            cards = self.rng.sample(deck, 7)
+            self.assertEqual(hand_evaluator.evaluate(cards),
+                            max(hand_evaluator.evaluate(list(five))
+                                for five in itertools.combinations(cards, 5)))
+
+    def test_wheel_is_lowest_straight(self):
+        s, h = Suits.SPADES, Suits.HEARTS
+        wheel = _cards((Ranks.ACE, s), (Ranks.TWO, h), (Ranks.THREE, s), (Ranks.FOUR, h),
+                        (Ranks.FIVE, s))
+        six_high = _cards((Ranks.SIX, s), (Ranks.TWO, h), (Ranks.THREE, s), (Ranks.FOUR, h),
+                        (Ranks.FIVE, s))
+        self.assertLess(hand_evaluator.evaluate(wheel), hand_evaluator.evaluate(six_high))
+        self.assertEqual(hand_evaluator.kickers(hand_evaluator.evaluate(wheel)), [Ranks.FIVE])
+
+    def test_kicker_breaks_tie(self):
+        s, h, d = Suits.SPADES, Suits.HEARTS, Suits.DIAMONDS
+        board = _cards((Ranks.KING, s), (Ranks.KING, h), (Ranks.SEVEN, d), (Ranks.FOUR, s),
+                        (Ranks.TWO, h))
+        ace = hand_evaluator.evaluate(board + _cards((Ranks.ACE, d), (Ranks.THREE, d)))
+        queen = hand_evaluator.evaluate(board + _cards((Ranks.QUEEN, d), (Ranks.JACK, d)))
+        self.assertGreater(ace, queen)
+        self.assertEqual(hand_evaluator.tiebreak_rank(ace, queen), Ranks.ACE)
+        self.assertEqual(hand_evaluator.tiebreak_rank(ace, ace), None)
+
+    def test_five_of_a_kind_with_two_decks(self):
+        #as in the showdown code this replaced, all five kickers are the rank itself
+        s, h, d, c = Suits.SPADES, Suits.HEARTS, Suits.DIAMONDS, Suits.CLUBS
+        strength = hand_evaluator.evaluate(_cards((Ranks.FIVE, s), (Ranks.FIVE, h),
+                        (Ranks.FIVE, d), (Ranks.FIVE, c), (Ranks.FIVE, s), (Ranks.KING, s),
+                        (Ranks.QUEEN, h)))
+        self.assertEqual(hand_evaluator.hand_type(strength), Hands.FOUR_OF_A_KIND)
+        self.assertEqual(hand_evaluator.kickers(strength), [Ranks.FIVE]*5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Regression tests of the hand_history log: games read back as they were played, and a log
+whose writer crashed is picked up where its last complete block ends.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import hand_history
+import simulation
+import strategies
+
+BLOCK_HANDS = 100
+
+
+class _Recorder(object):
+    """Observer keeping every game's fields as they should read back from the log."""
+    def __init__(self):
+        self.games = []
+        self._balances = None
+
+    def observe_move(self, game, seat, move, amount):
+        if len(game.history) == 1:
+            self._balances = [p.balance for p in game.players]
+
+    def observe_end(self, game):
+        self.games.append((self._balances, game.players.index(game.dealer),
+                        [None if p.card1.rank is None else (p.card1.index, p.card2.index)
+                            for p in game.players],
+                        [c.index for c in (game.card1, game.card2, game.card3, game.card4,
+                            game.card5) if c.rank is not None],
+                        list(game.history), game.pot,
+                        [game.players.index(w) for w in game.winners]))
+
+
+def _fields(record):
+    """Helper function to get a HandRecord's fields in the order _Recorder keeps them."""
+    return (record.balances, record.dealer, record.hole_cards, record.board,
+                    [tuple(m) for m in record.moves], record.pot, record.winners)
+
+
+class HandLogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'logs', 'hands.hhl')
+        self.recorder = _Recorder()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _play(self, log, hands, seed=0):
+        """Helper function to self-play hands at a three-seat table into the log."""
+        rng = random.Random(seed)
+        table = simulation.SelfPlay([strategies.RandomStrategy(rng)] * 2 +
+                        [strategies.PassiveStrategy()], rng=rng, log=log)
+        table.game.observers.append(self.recorder)
+        table.run(hands)
+
+    def test_games_read_back_as_played(self):
+        log = hand_history.HandLogWriter(self.path, block_hands=BLOCK_HANDS)
+        self._play(log, 250)
+        log.close()
+        records = list(hand_history.read_hands(self.path))
+        self.assertEqual([r.number for r in records], range(250))
+        self.assertEqual([_fields(r) for r in records], self.recorder.games)
+        self.assertEqual(records[0].names, [u'RandomStrategy 0', u'RandomStrategy 1',
+                        u'PassiveStrategy 2'])
+        later = list(hand_history.read_hands(self.path, start=170))
+        self.assertEqual([r.number for r in later], range(170, 250))
+        self.assertEqual([_fields(r) for r in later], self.recorder.games[170:])
+
+    def test_crashed_block_is_dropped(self):
+        log = hand_history.HandLogWriter(self.path, block_hands=BLOCK_HANDS)
+        self._play(log, 300)
+        log.close()
+        #a crash halfway through writing out the third block
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 20)
+        log = hand_history.HandLogWriter(self.path, block_hands=BLOCK_HANDS)
+        self.assertEqual(log.hands, 200)
+        self.assertEqual(os.path.getsize(self.path + '.idx'), 2 * hand_history._INDEX.size)
+        self._play(log, 150, seed=1)
+        log.close()
+        records = list(hand_history.read_hands(self.path))
+        self.assertEqual([r.number for r in records], range(350))
+        games = self.recorder.games[:200] + self.recorder.games[300:]
+        self.assertEqual([_fields(r) for r in records], games)
+
+    def test_unbuffered_games_are_lost_with_the_writer(self):
+        log = hand_history.HandLogWriter(self.path, block_hands=BLOCK_HANDS)
+        self._play(log, 150)
+        log._file.close()
+        log._index.close()
+        log = hand_history.HandLogWriter(self.path, block_hands=BLOCK_HANDS)
+        self.assertEqual(log.hands, 100)
+        log.close()
+        self.assertEqual(len(list(hand_history.read_hands(self.path))), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Regression tests that hand_indexer numbers hands densely up to suit isomorphism, and that
+its scalar and batch forms agree.
+"""
+
+import itertools
+import random
+import unittest
+import hand_indexer
+from hand_indexer import PREFLOP, FLOP, TURN, RIVER, STREET_CARDS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SAMPLES = 300
+
+
+def _rename(cards, suits):
+    """Helper function to rename the suits of a hand's Card.index values."""
+    return [suits[c // 13]*13 + c % 13 for c in cards]
+
+def _canonical(cards):
+    """Helper function to get a hand up to suit renaming, the long way."""
+    return min((sorted(h[:2]), sorted(h[2:])) for h in
+                    (_rename(cards, suits) for suits in itertools.permutations(range(4))))
+
+
+class HandIndexerTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def _hands(self, street):
+        """Helper function to deal SAMPLES random hands of a street."""
+        return [self.rng.sample(range(52), STREET_CARDS[street]) for _ in range(SAMPLES)]
+
+    def test_sizes(self):
+        self.assertEqual([hand_indexer.size(s) for s in (PREFLOP, FLOP, TURN, RIVER)],
+                        [169, 1286792, 13960050, 123156254])
+
+    def test_preflop_is_dense(self):
+        indices = set(hand_indexer.index(list(h))
+                        for h in itertools.combinations(range(52), 2))
+        self.assertEqual(indices, set(range(169)))
+        for idx in range(169):
+            self.assertEqual(hand_indexer.index(hand_indexer.unindex(PREFLOP, idx)), idx)
+
+    def test_round_trip(self):
+        for street in (FLOP, TURN, RIVER):
+            for hand in self._hands(street):
+                idx = hand_indexer.index(hand)
+                self.assertTrue(0 <= idx < hand_indexer.size(street))
+                cards = hand_indexer.unindex(street, idx)
+                self.assertEqual(_canonical(cards), _canonical(hand))
+                self.assertEqual(hand_indexer.index(cards), idx)
+            for idx in self.rng.sample(xrange(hand_indexer.size(street)), SAMPLES // 10):
+                self.assertEqual(hand_indexer.index(hand_indexer.unindex(street, idx)), idx)
+
+    def test_suit_renaming_and_order_keep_index(self):
+        for street in (FLOP, RIVER):
+            for hand in self._hands(street)[:SAMPLES // 3]:
+                suits = self.rng.sample(range(4), 4)
+                board = hand[2:]
+                self.rng.shuffle(board)
+                self.assertEqual(hand_indexer.index(_rename(hand[1::-1] + board, suits)),
+                                hand_indexer.index(hand))
+
+    @unittest.skipIf(np is None, "needs NumPy")
+    def test_batch_forms_match(self):
+        for street in (PREFLOP, FLOP, TURN, RIVER):
+            hands = self._hands(street)
+            indices = hand_indexer.index_batch(np.array(hands))
+            self.assertEqual(list(indices), [hand_indexer.index(h) for h in hands])
+            self.assertEqual(hand_indexer.unindex_batch(street, indices).tolist(),
+                            [hand_indexer.unindex(street, i) for i in indices])
+
+
+if __name__ == '__main__':
+    unittest.main()
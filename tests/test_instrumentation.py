@@ -0,0 +1,54 @@
+"""
+Regression tests that Instrumentation measures attached games without changing how they
+play, and leaves them as they were when detached.
+"""
+
+import unittest
+import instrumentation
+import simulation
+import strategies
+from texas_holdem import RandomStream
+
+HANDS = 300
+
+
+class InstrumentationTest(unittest.TestCase):
+    def _table(self):
+        """Helper function to make a seeded three-seat self-play table."""
+        rng = RandomStream(0)
+        return simulation.SelfPlay([strategies.RandomStrategy(rng)] * 2 +
+                        [strategies.PassiveStrategy()], rng=rng)
+
+    def test_attached_game_plays_the_same(self):
+        plain = self._table()
+        plain.run(HANDS)
+        measured = self._table()
+        lines = []
+        meter = instrumentation.Instrumentation(log=lines.append, log_interval=0.0)
+        meter.attach(measured.game)
+        measured.run(HANDS)
+        self.assertEqual(measured.winnings, plain.winnings)
+        snapshot = meter.snapshot()
+        self.assertEqual(snapshot['hands'], HANDS)
+        self.assertEqual(snapshot['showdowns'] + snapshot['folds'], HANDS)
+        self.assertEqual(len(lines), HANDS)
+        self.assertTrue(lines[-1].startswith("%d hands" % HANDS))
+        for name in ('deal', '_process_round', '_resolve_winnings'):
+            self.assertGreater(snapshot['methods'][name]['calls'], 0)
+        meter.reset()
+        self.assertEqual((meter.hands, meter.totals['deal']), (0, [0, 0.0]))
+
+    def test_detach_restores_game(self):
+        table = self._table()
+        before = dict(table.game.__dict__)
+        meter = instrumentation.Instrumentation()
+        meter.attach(table.game)
+        meter.detach(table.game)
+        self.assertEqual(table.game.__dict__, before)
+        self.assertEqual(table.game.observers, [])
+        table.run(10)
+        self.assertEqual(meter.hands, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Regression tests of the statistics an OpponentModel keeps, and of saving and loading them.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import opponent_model
+import simulation
+import strategies
+from texas_holdem import Player
+
+HANDS = 200
+
+
+class OpponentModelTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'data', 'opponents.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _play(self, model):
+        """Helper function to self-play HANDS hands at a three-seat table the model watches."""
+        rng = random.Random(0)
+        table = simulation.SelfPlay([strategies.RandomStrategy(rng)] * 2 +
+                        [strategies.PassiveStrategy()], rng=rng)
+        table.game.observers.append(model)
+        table.run(HANDS)
+        return [model.players[p.name] for p in table.players]
+
+    def test_statistics(self):
+        random_stats, _, passive = self._play(opponent_model.OpponentModel())
+        self.assertEqual([s.hands() for s in (random_stats, passive)], [HANDS, HANDS])
+        self.assertEqual(passive.pfr(), 0.0)
+        self.assertEqual(passive.aggression(), 0.0)
+        self.assertGreater(passive.vpip(), 0.0)
+        self.assertGreater(random_stats.pfr(), 0.0)
+        self.assertGreater(random_stats.aggression(), 0.0)
+        self.assertEqual(passive.fold_to_raise(), 0.0)
+        self.assertTrue(0.0 < passive.showdown() <= 1.0)
+        self.assertEqual(opponent_model.PlayerStats().vpip(), None)
+
+    def test_decay_weights_recent_games(self):
+        stats = self._play(opponent_model.OpponentModel(decay=0.5))[2]
+        self.assertAlmostEqual(stats.hands(), 2.0)
+
+    def test_save_and_load(self):
+        model = opponent_model.OpponentModel()
+        self._play(model)
+        model.stats(Player(u'Zo\xeb')).totals[opponent_model.VPIP] = 3.5
+        model.save(self.path)
+        loaded = opponent_model.OpponentModel()
+        self.assertTrue(loaded.load(self.path))
+        self.assertEqual(sorted(loaded.players), sorted(model.players))
+        for name, stats in model.players.items():
+            self.assertEqual(loaded.players[name].totals, stats.totals)
+        self.assertFalse(loaded.load(os.path.join(self.directory, 'missing.bin')))
+        with open(self.path, 'r+b') as f:
+            f.write('XXXX')
+        self.assertFalse(opponent_model.OpponentModel().load(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Regression tests that a policy file serves the strategy it was trained to, and that
+PolicyStrategy plays from it.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import cfr
+import policy
+import simulation
+import strategies
+
+
+class _CountingPolicy(policy.Policy):
+    """Policy counting the decisions it had something to say about."""
+    answered = 0
+
+    def distribution(self, game):
+        probs = policy.Policy.distribution(self, game)
+        if probs is not None:
+            self.answered += 1
+        return probs
+
+
+class PolicyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'policy.bin')
+        self.trainer = cfr.CFRTrainer()
+        self.trainer.train(128, processes=1, batch_size=64)
+        policy.save_policy(self.trainer, self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_first_decision_matches_trainer(self):
+        served = policy.Policy(self.path)
+        table = simulation.SelfPlay([strategies.PassiveStrategy()] * 2, rng=random.Random(0))
+        table.game.shuffle()
+        probs = served.distribution(table.game)
+        self.assertTrue(served.loaded)
+        self.assertEqual(served.bet_sizes, self.trainer.tree.bet_sizes)
+        expected = self.trainer.average_strategy()[self.trainer.tree.offset[0]]
+        for p, e in zip(probs, expected):
+            self.assertAlmostEqual(p, e, delta=1e-4)
+
+    def test_missing_file_falls_back(self):
+        served = policy.Policy(os.path.join(self.directory, 'missing.bin'))
+        self.assertFalse(served.load())
+        table = simulation.SelfPlay([strategies.PassiveStrategy()] * 2, rng=random.Random(0))
+        table.game.shuffle()
+        self.assertEqual(served.distribution(table.game), None)
+
+    def test_strategy_plays_from_policy(self):
+        rng = random.Random(0)
+        served = _CountingPolicy(self.path)
+        table = simulation.SelfPlay([strategies.PolicyStrategy(served, rng=rng),
+                        strategies.RandomStrategy(rng)], rng=rng)
+        table.run(50)
+        self.assertEqual(table.hands, 50)
+        self.assertGreater(served.answered, 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
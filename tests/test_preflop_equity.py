@@ -0,0 +1,63 @@
+"""
+Regression tests of the canonical starting hands and the preflop equity tables.
+"""
+
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+import preflop_equity
+from texas_holdem import CARDS, Card, Ranks, Suits
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class HandClassTest(unittest.TestCase):
+    def test_every_hand_has_one_class(self):
+        classes = {}
+        for c1, c2 in itertools.combinations(CARDS, 2):
+            index = preflop_equity.hand_class(c1, c2)
+            self.assertEqual(index, preflop_equity.hand_class(c2, c1))
+            classes.setdefault(index, set()).add(tuple(sorted((c1.index, c2.index))))
+        self.assertEqual(sorted(classes), range(preflop_equity.NUM_CLASSES))
+        for index, combos in classes.items():
+            row, col = divmod(index, 13)
+            self.assertEqual(len(combos), 6 if row == col else 4 if row > col else 12)
+            self.assertEqual(set(tuple(sorted(c)) for c in
+                            preflop_equity._class_combos(index)), combos)
+
+
+@unittest.skipIf(np is None, "needs NumPy")
+class TableTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        preflop_equity.generate_tables(os.path.join(self.directory, 'tables.bin'),
+                        samples=400, headsup_samples=10, processes=1, seed=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        preflop_equity.load_tables()
+
+    def test_tables(self):
+        aces = preflop_equity.hand_class(Card(Ranks.ACE, Suits.SPADES),
+                        Card(Ranks.ACE, Suits.HEARTS))
+        trash = preflop_equity.hand_class(Card(Ranks.SEVEN, Suits.SPADES),
+                        Card(Ranks.TWO, Suits.HEARTS))
+        self.assertGreater(preflop_equity.class_equity(aces), 0.75)
+        self.assertLess(preflop_equity.class_equity(trash), 0.4)
+        self.assertGreater(preflop_equity.class_equity(aces),
+                        preflop_equity.class_equity(aces, num_opponents=5))
+        self.assertEqual(preflop_equity.preflop_equity(Card(Ranks.ACE, Suits.CLUBS),
+                        Card(Ranks.ACE, Suits.DIAMONDS)), preflop_equity.class_equity(aces))
+        for index, other in ((aces, trash), (5, 100), (168, 0)):
+            self.assertAlmostEqual(preflop_equity.class_matchup(index, other) +
+                            preflop_equity.class_matchup(other, index), 1.0, places=5)
+        self.assertRaises(LookupError, preflop_equity.class_equity, aces, num_decks=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Regression tests that hands recorded to a hand_history log replay exactly, one at a time
+and in bulk.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import hand_history
+import replay
+import simulation
+import strategies
+from replay import ReplayEngine
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HANDS = 2000
+
+
+class _LogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'hands.hhl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _record(self, num_seats):
+        """Helper function to self-play HANDS hands into the log."""
+        rng = random.Random(num_seats)
+        log = hand_history.HandLogWriter(self.path, block_hands=300, append=False)
+        seats = [strategies.RandomStrategy(rng)] * (num_seats - 1) + \
+                        [strategies.PassiveStrategy()]
+        simulation.SelfPlay(seats, rng=rng, log=log).run(HANDS)
+        log.close()
+
+
+class RecordReplayTest(_LogTest):
+    def test_heads_up(self):
+        self._record(2)
+        engine = ReplayEngine()
+        engine.run(hand_history.read_hands(self.path))
+        self.assertEqual(engine.hands, HANDS)
+        self.assertEqual(engine.mismatches, [])
+
+    def test_full_table(self):
+        self._record(6)
+        engine = ReplayEngine()
+        engine.run(hand_history.read_hands(self.path))
+        self.assertEqual(engine.hands, HANDS)
+        self.assertEqual(engine.mismatches, [])
+
+    def test_tampered_hand_mismatches(self):
+        self._record(2)
+        records = list(hand_history.read_hands(self.path, start=HANDS - 10))
+        self.assertEqual([r.number for r in records], range(HANDS - 10, HANDS))
+        records[0].pot += 1
+        engine = ReplayEngine()
+        engine.run(records)
+        self.assertEqual(engine.mismatches, [HANDS - 10])
+
+
+@unittest.skipIf(np is None, "needs NumPy")
+class BulkReplayTest(_LogTest):
+    def test_columns_match_records(self):
+        self._record(6)
+        records = list(hand_history.read_hands(self.path, start=450))[:1000]
+        games = [(c, i) for c in hand_history.read_columns(self.path, start=450, stop=1450,
+                        batch_hands=400) for i in range(len(c))]
+        self.assertEqual(len(games), len(records))
+        for record, (columns, i) in zip(records, games):
+            seats = columns.seats[i]
+            first = columns.first_move[i]
+            self.assertEqual(record.number, columns.numbers[i])
+            self.assertEqual(record.dealer, columns.dealer[i])
+            self.assertEqual(record.balances, list(columns.balances[i, :seats]))
+            self.assertEqual([h or (-1, -1) for h in record.hole_cards],
+                            [tuple(h) for h in columns.hole_cards[i, :seats]])
+            self.assertEqual(record.board, [c for c in columns.board[i] if c >= 0])
+            self.assertEqual(record.moves, [tuple(int(f) for f in m) for m in
+                            columns.moves[first:first + columns.num_moves[i]]])
+            self.assertEqual(record.pot, columns.pot[i])
+            self.assertEqual(sorted(record.winners),
+                            list(columns.winners[i, :seats].nonzero()[0]))
+
+    def test_bulk_heads_up(self):
+        self._record(2)
+        engine = ReplayEngine()
+        engine.run(hand_history.read_hands(self.path))
+        bulk = ReplayEngine()
+        bulk.run_columns(hand_history.read_columns(self.path, batch_hands=700))
+        self.assertEqual((bulk.hands, bulk.moves, bulk.mismatches),
+                        (engine.hands, engine.moves, []))
+
+    def test_bulk_full_table(self):
+        self._record(6)
+        engine = ReplayEngine()
+        engine.run(hand_history.read_hands(self.path))
+        bulk = ReplayEngine()
+        bulk.run_columns(hand_history.read_columns(self.path))
+        self.assertEqual((bulk.hands, bulk.moves, bulk.mismatches),
+                        (engine.hands, engine.moves, []))
+
+    def test_bulk_tampered_hand_mismatches(self):
+        self._record(2)
+        columns = next(hand_history.read_columns(self.path, start=HANDS - 10))
+        columns.pot[0] += 1
+        last = columns.first_move[5] + columns.num_moves[5] - 1
+        columns.moves['seat'][last] ^= 1
+        engine = ReplayEngine()
+        engine.run_columns([columns])
+        self.assertEqual(engine.hands, 10)
+        self.assertEqual(engine.mismatches, [HANDS - 10, HANDS - 5])
+
+    def test_pool_splits_log(self):
+        self._record(3)
+        self.assertEqual(replay._split(self.path, 500), [(0, 600), (600, 1200),
+                        (1200, 1800), (1800, None)])
+        result = replay.replay_logs([self.path], processes=2, task_hands=500)
+        self.assertEqual((result.hands, result.mismatches), (HANDS, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Regression tests of how HoldemGame settles a showdown.
+
+Hands are dealt from a stacked deck, with the dealer in seat 0 so hole cards go out in
+seat order, and played out by checking and calling.
+"""
+
+import unittest
+from texas_holdem import Card, HoldemGame, Player, Ranks, Suits
+
+BURN = Card(Ranks.TWO, Suits.CLUBS)
+
+
+class _Deck(object):
+    """Deck dealing the given cards in order instead of shuffling."""
+    def __init__(self, cards):
+        self.num_decks = 1
+        self.rng = None
+        self._cards = list(cards)
+
+    def reset(self):
+        pass
+
+    def draw_card(self):
+        return self._cards.pop(0)
+
+    def deal_many(self, n):
+        return [self.draw_card() for _ in range(n)]
+
+
+def _play(holes, board, folds=()):
+    """
+    Helper function to play a hand out to the end.
+
+    Args:
+        holes (tuple[]): Hole cards of each seat, as (Card, Card)
+        board (Card[]): The five flop cards
+        folds (int[]): Seats that fold as soon as the hole cards are dealt
+
+    Returns:
+        Tuple of the finished HoldemGame and its players in seating order.
+    """
+    game = HoldemGame()
+    for i in range(len(holes)):
+        game.add_player(Player('seat %d' % i))
+    seats = list(game.players)
+    game.shuffle()
+    game.deck = _Deck([h[0] for h in holes] + [h[1] for h in holes] + [BURN] + board[:3] +
+                    [BURN] + board[3:4] + [BURN] + board[4:])
+    while not game.finished:
+        seat = [i for i, p in enumerate(seats) if game.is_next(p)][0]
+        player = seats[seat]
+        if player.card1.rank is not None and seat in folds:
+            game.fold(player)
+        elif player.bid < game.bid:
+            game.call(player)
+        else:
+            game.check(player)
+    return game, seats
+
+
+class ShowdownTest(unittest.TestCase):
+    def test_folded_player_cannot_win(self):
+        board = [Card(Ranks.ACE, Suits.SPADES), Card(Ranks.ACE, Suits.HEARTS),
+                    Card(Ranks.SEVEN, Suits.CLUBS), Card(Ranks.NINE, Suits.DIAMONDS),
+                    Card(Ranks.FOUR, Suits.HEARTS)]
+        holes = [(Card(Ranks.ACE, Suits.CLUBS), Card(Ranks.ACE, Suits.DIAMONDS)),
+                    (Card(Ranks.THREE, Suits.SPADES), Card(Ranks.FIVE, Suits.CLUBS)),
+                    (Card(Ranks.EIGHT, Suits.SPADES), Card(Ranks.JACK, Suits.CLUBS))]
+        game, seats = _play(holes, board, folds=(0,))
+        self.assertTrue(seats[0].folded)
+        self.assertEqual(game.winners, [seats[2]])
+
+    def test_full_house_uses_highest_pair(self):
+        board = [Card(Ranks.KING, Suits.SPADES), Card(Ranks.KING, Suits.HEARTS),
+                    Card(Ranks.KING, Suits.CLUBS), Card(Ranks.FIVE, Suits.DIAMONDS),
+                    Card(Ranks.FIVE, Suits.HEARTS)]
+        holes = [(Card(Ranks.QUEEN, Suits.CLUBS), Card(Ranks.QUEEN, Suits.DIAMONDS)),
+                    (Card(Ranks.SIX, Suits.SPADES), Card(Ranks.SIX, Suits.CLUBS))]
+        game, seats = _play(holes, board)
+        winner = seats[0]
+        self.assertEqual(game.winners, [winner])
+        self.assertEqual(winner.kickers, [Ranks.KING]*3 + [Ranks.QUEEN]*2)
+
+    def test_full_house_from_two_trips(self):
+        board = [Card(Ranks.KING, Suits.SPADES), Card(Ranks.KING, Suits.HEARTS),
+                    Card(Ranks.KING, Suits.CLUBS), Card(Ranks.FIVE, Suits.DIAMONDS),
+                    Card(Ranks.TWO, Suits.HEARTS)]
+        holes = [(Card(Ranks.FIVE, Suits.CLUBS), Card(Ranks.FIVE, Suits.HEARTS)),
+                    (Card(Ranks.FOUR, Suits.SPADES), Card(Ranks.FOUR, Suits.CLUBS))]
+        game, seats = _play(holes, board)
+        self.assertEqual(game.winners, [seats[0]])
+        self.assertEqual(seats[0].kickers, [Ranks.KING]*3 + [Ranks.FIVE]*2)
+
+    def test_split_pot(self):
+        board = [Card(Ranks.TEN, Suits.SPADES), Card(Ranks.JACK, Suits.HEARTS),
+                    Card(Ranks.QUEEN, Suits.CLUBS), Card(Ranks.KING, Suits.DIAMONDS),
+                    Card(Ranks.ACE, Suits.HEARTS)]
+        holes = [(Card(Ranks.TWO, Suits.HEARTS), Card(Ranks.THREE, Suits.DIAMONDS)),
+                    (Card(Ranks.FOUR, Suits.SPADES), Card(Ranks.FIVE, Suits.CLUBS)),
+                    (Card(Ranks.SIX, Suits.SPADES), Card(Ranks.SEVEN, Suits.CLUBS))]
+        game, seats = _play(holes, board)
+        self.assertEqual(game.winners, seats)
+        balances = set(p.balance for p in seats)
+        self.assertEqual(balances, set([Player.DEF_BALANCE]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Regression tests of headless self-play, one game at a time and on batched tables.
+"""
+
+import unittest
+import policy
+import simulation
+import strategies
+from texas_holdem import RandomStream
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HANDS = 3000
+
+
+def _seats(rng, num_seats):
+    """Helper function to seat RandomStrategies and a PassiveStrategy."""
+    return [strategies.RandomStrategy(rng)] * (num_seats - 1) + [strategies.PassiveStrategy()]
+
+
+class _Observer(object):
+    """Observer that only counts moves."""
+    def __init__(self):
+        self.moves = 0
+
+    def observe_move(self, game, seat, move, amount):
+        self.moves += 1
+
+    def observe_end(self, game):
+        pass
+
+
+class SelfPlayTest(unittest.TestCase):
+    def test_history_only_kept_when_read(self):
+        rng = RandomStream(0)
+        table = simulation.SelfPlay(_seats(rng, 2), rng=rng)
+        self.assertFalse(table.game.keep_history)
+        table.run(10)
+        self.assertEqual(table.game.history, [])
+        observer = _Observer()
+        table.game.observers.append(observer)
+        table.play_hand()
+        self.assertEqual(len(table.game.history), observer.moves)
+        table = simulation.SelfPlay([strategies.PolicyStrategy(policy.Policy(), rng=rng),
+                        strategies.PassiveStrategy()], rng=rng)
+        self.assertTrue(table.game.keep_history)
+
+    def test_seed_replays_the_same_hands(self):
+        results = []
+        for _ in range(2):
+            rng = RandomStream(1)
+            table = simulation.SelfPlay(_seats(rng, 3), rng=rng)
+            table.run(HANDS // 10)
+            results.append(table.winnings)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(table.hands, HANDS // 10)
+
+
+@unittest.skipIf(np is None, "needs NumPy")
+class BatchedSelfPlayTest(unittest.TestCase):
+    def _run(self, seed, num_seats, batch_tables=256, num_hands=HANDS):
+        """Helper function to play hands on batched tables."""
+        rng = RandomStream(seed)
+        table = simulation.SelfPlay(_seats(rng, num_seats), rng=rng, batch_tables=batch_tables)
+        table.run(num_hands)
+        return table
+
+    def test_hands_counted(self):
+        for num_seats in (2, 6):
+            table = self._run(0, num_seats)
+            self.assertEqual(table.hands, HANDS)
+            self.assertTrue(table.batch.finished.all())
+            #a split pot's odd chips are lost, so nothing is won from nowhere
+            self.assertLessEqual(sum(table.winnings), 0)
+        #fewer hands than tables leaves the rest unplayed
+        table = self._run(0, 2, num_hands=100)
+        self.assertEqual(table.hands, 100)
+        table.run(50)
+        self.assertEqual(table.hands, 150)
+
+    def test_seed_replays_the_same_hands(self):
+        self.assertEqual(self._run(1, 3).winnings, self._run(1, 3).winnings)
+        self.assertNotEqual(self._run(1, 3).winnings, self._run(2, 3).winnings)
+
+    def test_random_raises(self):
+        from batched_engine import BatchedHoldem
+        from texas_holdem import Moves
+        batch = BatchedHoldem(1000, 2, seed=0)
+        batch.shuffle()
+        batch.lastraise[:] = np.arange(1000)
+        rows = np.arange(0, 1000, 2)
+        moves, amounts = strategies.RandomStrategy(RandomStream(0)).decide_batch(batch, rows,
+                        0)
+        raised = moves == Moves.RAISE_BID
+        self.assertTrue(raised.any() and not raised.all())
+        self.assertEqual(list(amounts[~raised]), [0] * (~raised).sum())
+        self.assertTrue((amounts[raised] % strategies.RandomStrategy.RAISE_STEP == 0).all())
+        self.assertTrue((amounts[raised] > rows[raised]).all())
+
+    def test_unbatchable_tables_rejected(self):
+        rng = RandomStream(0)
+        with self.assertRaises(ValueError):
+            simulation.SelfPlay([strategies.PolicyStrategy(policy.Policy()),
+                            strategies.PassiveStrategy()], rng=rng, batch_tables=16)
+
+    def test_farm(self):
+        result = simulation.run_farm(HANDS, processes=1, shard_size=1000, batch_tables=256)
+        self.assertEqual(result.hands, HANDS)
+        self.assertEqual(sorted(result.shards_done), [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
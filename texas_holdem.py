@@ -12,9 +12,13 @@ Attributes:
     Ranks (enum): Enumerates card ranks
     Suits (enum): Enumerates card suits
     Hands (enum): Enumerates hand types
+    Moves (enum): Enumerates player actions
+    CARDS (Card[]): Every card in a 52-card set, indexed by Card.index
+    SUIT_MASK (int): Mask of the 13 rank bits of one suit within a card bitmask
 """
 
 import random
+import hand_evaluator
 
 def _enum(**enums):
     return type('Enumerator', (), enums)
@@ -24,11 +28,17 @@ Ranks = _enum(TWO=0, THREE=1, FOUR=2, FIVE=3, SIX=4, SEVEN=5, EIGHT=6,
 Suits = _enum(CLUBS=0, DIAMONDS=1, HEARTS=2, SPADES=3)
 Hands = _enum(HIGH_CARD=0, PAIR=1, TWO_PAIR=2, THREE_OF_A_KIND=3, STRAIGHT=4,
             FLUSH=5, FULL_HOUSE=6, FOUR_OF_A_KIND=7, STRAIGHT_FLUSH=8, ROYAL_FLUSH=9)
+Moves = _enum(FOLD=0, CHECK=1, CALL=2, RAISE_BID=3)
 
-class Card:
+class Card(object):
     """
     Card objects hold basic information to be identified by.
 
+        Cards are interned: constructing a Card returns the one shared instance for that
+        rank and suit, so they must never be modified. Each card is also identified by a
+        compact index, suit*13 + rank, and a 52-bit mask with only that index's bit set.
+        Empty card slots use Card(), which has no index and an empty mask.
+
     Note:
         Use Ranks/Suits enums for args.
 
@@ -39,40 +49,292 @@ class Card:
     Attributes:
         rank (int): Card rank
         suit (int): Card suit
+        index (int): Card index in range(52), or None for an empty slot
+        mask (int): Bitmask of the card's index, or 0 for an empty slot
+    """
+    __slots__ = ('rank', 'suit', 'index', 'mask')
+    _interned = {}
+
+    def __new__(cls, rank=None, suit=None):
+        card = cls._interned.get((rank, suit))
+        if card is None:
+            card = object.__new__(cls)
+            card.rank = rank
+            card.suit = suit
+            if rank is None:
+                card.index = None
+                card.mask = 0
+            else:
+                card.index = suit*13 + rank
+                card.mask = 1 << card.index
+            cls._interned[(rank, suit)] = card
+        return card
+
+    def __reduce__(self):
+        return (Card, (self.rank, self.suit))
+
+#every card in a single deck, indexed by Card.index
+CARDS = tuple(Card(r, s) for s in range(4) for r in range(13))
+SUIT_MASK = 0x1FFF #mask of all 13 ranks in a suit, shifted by suit*13
+_NO_CARD = Card() #the empty card slot
+
+def cards_mask(cards):
+    """
+    Combines Card objects into a single bitmask. Empty slots are ignored.
+
+    Note:
+        Duplicate cards from combined decks share a bit, so masks count each card once.
+
+    Args:
+        cards (Card[]): Cards to combine
+
+    Returns:
+        Bitmask with the bit of every card set.
+    """
+    mask = 0
+    for c in cards:
+        mask |= c.mask
+    return mask
+
+def mask_cards(mask):
+    """
+    Args:
+        mask (int): Bitmask of cards
+
+    Returns:
+        List of the Card objects in the mask, in index order.
+    """
+    return [c for c in CARDS if mask & c.mask]
+
+def suit_ranks(mask, suit):
+    """
+    Args:
+        mask (int): Bitmask of cards
+        suit (int): Suits enum
+
+    Returns:
+        13-bit mask of the ranks held in the suit (bit n is set for rank n).
+    """
+    return (mask >> (suit*13)) & SUIT_MASK
+
+def flush_suit(mask):
+    """
+    Args:
+        mask (int): Bitmask of cards
+
+    Returns:
+        Suits enum of the suit with 5 or more cards in the mask, or None if there isn't one.
+    """
+    for s in range(4):
+        if bin(suit_ranks(mask, s)).count('1') >= 5:
+            return s
+    return None
+
+
+class RandomStream(random.Random):
+    """
+    Random number generator of a single table, so tables never draw from each other's
+    stream and any run can be reproduced from its seed.
+
+        split() derives child streams for worker processes or other tables; they depend
+        only on the parent's seed and on how many were split off before. deals() shuffles
+        the decks of many games in one vectorized call, with the same Fisher-Yates steps
+        Deck takes one card at a time, and is the only part that needs NumPy.
+
+    Args:
+        seed (int, optional): Seed of the stream; None seeds it from the operating system
     """
-    def __init__(self, rank=None, suit=None):
-        self.rank = rank
-        self.suit = suit
+    def split(self, n):
+        """
+        Args:
+            n (int): Number of streams to derive
+
+        Returns:
+            List of n new RandomStreams seeded from this one.
+        """
+        return [RandomStream(self.getrandbits(64)) for _ in range(n)]
+
+    def deals(self, count, num_cards=52, num_decks=1):
+        """
+        Shuffles the decks of several games at once.
+
+        Args:
+            count (int): Number of games
+            num_cards (int, optional): Number of cards each game needs from the top of its
+                deck
+            num_decks (int, optional): Number of 52-card sets in each deck
+
+        Returns:
+            (count, num_cards) NumPy array of the Card.index values each game draws, in
+            order.
+        """
+        import numpy as np
+        size = 52 * num_decks
+        rand = np.random.RandomState(self.getrandbits(32)).rand(count, num_cards)
+        cards = np.tile(np.arange(size) % 52, (count, 1))
+        rows = np.arange(count)
+        for i in range(num_cards):
+            j = i + (rand[:, i] * (size - i)).astype(np.int64)
+            picked = cards[rows, j]
+            cards[rows, j] = cards[:, i]
+            cards[:, i] = picked
+        return cards[:, :num_cards]
 
 
 class Deck:
     """
     Deck objects hold a specified amount of sets of Card objects.
 
+        The cards live in one reusable list that is shuffled lazily: each draw performs a
+        single Fisher-Yates step, swapping a random undealt card to the cursor and advancing
+        past it. Resetting just rewinds the cursor, so a deck is never rebuilt between games.
+
     Note:
         Default is 1 deck's worth (52 cards)
 
     Args:
         rank (int, optional): Number of 52-card sets to initialize
+        rng (random.Random, optional): Random number generator to shuffle with; a new
+            RandomStream by default
 
     Attributes:
-        _cards (Card[]): List of Card objects remaining in the deck
+        num_decks (int): Number of 52-card sets in the deck
+        rng (random.Random): Random number generator to shuffle with
+        _cards (Card[]): List of Card objects; those at or past _next are still in the deck
+        _next (int): Index of the next card to be dealt
+    """
+    def __init__(self, num_decks, rng=None):
+        self.num_decks = num_decks
+        self.rng = rng if rng is not None else RandomStream()
+        #initialize the full set of playing cards (cards are shared, not copied)
+        self._cards = list(CARDS) * num_decks
+        self._next = 0
+
+    def __len__(self):
+        return len(self._cards) - self._next
+
+    def reset(self):
+        """Returns all dealt cards to the deck."""
+        self._next = 0
+
+    def draw_card(self):
+        """
+        Deals a random card from the deck.
+
+        Returns:
+            The Card object drawn.
+
+        Raises:
+            IndexError: The deck is empty.
+        """
+        cards = self._cards
+        i = self._next
+        j = i + int(self.rng.random() * (len(cards) - i))
+        cards[i], cards[j] = cards[j], cards[i]
+        self._next = i + 1
+        return cards[i]
+
+    def deal_many(self, n):
+        """
+        Deals several random cards from the deck at once.
+
+        Args:
+            n (int): Number of cards to deal
+
+        Returns:
+            List of the Card objects drawn, in the order they were drawn.
+
+        Raises:
+            IndexError: The deck has fewer than n cards left.
+        """
+        cards = self._cards
+        size = len(cards)
+        start = self._next
+        end = start + n
+        if end > size:
+            raise IndexError("not enough cards left in the deck")
+        rand = self.rng.random
+        for i in range(start, end):
+            j = i + int(rand() * (size - i))
+            cards[i], cards[j] = cards[j], cards[i]
+        self._next = end
+        return cards[start:end]
+
+
+class StackedDeck(Deck):
+    """
+    Deck that deals a fixed sequence of cards instead of random ones, so a known deal can
+    be played out again on a HoldemGame.
+
+        The sequence must hold every card the game draws, in the order it draws them: the
+        hole cards (a first card to each player in turn, then a second), then a burn card
+        before each part of the flop is revealed. A game deals from it once it's assigned
+        to HoldemGame.deck, and keeps it through shuffle().
+
+    Args:
+        num_decks (int, optional): Number of 52-card sets the game is played with
     """
-    def __init__(self, num_decks):
+    def __init__(self, num_decks=1):
+        Deck.__init__(self, num_decks)
         self._cards = []
-        ranks = range(13)
-        suits = range(4)
-        #initialize the full set of playing cards
-        for _ in range(num_decks):
-            for r in ranks:
-                for s in suits:
-                    self._cards.append(Card(r, s))
+
+    def stack(self, cards):
+        """
+        Sets the cards to deal, starting over from the first.
+
+        Args:
+            cards (Card[]): Cards in the order they are to be drawn
+        """
+        self._cards = list(cards)
+        self._next = 0
 
     def draw_card(self):
-        card =  random.choice(self._cards)
-        self._cards.remove(card)
+        card = self._cards[self._next]
+        self._next += 1
         return card
 
+    def deal_many(self, n):
+        start = self._next
+        if start + n > len(self._cards):
+            raise IndexError("not enough cards left in the deck")
+        self._next = start + n
+        return self._cards[start:start + n]
+
+
+class BulkDeck(StackedDeck):
+    """
+    Deck that shuffles the decks of many games at once with RandomStream.deals(), which
+    takes a fraction of the time of drawing each card from the random number generator.
+    Needs NumPy.
+
+        Every reset() moves on to the next game's shuffled deck, and a new batch is dealt
+        once they run out. A game deals from it once it's assigned to HoldemGame.deck.
+
+    Args:
+        num_decks (int): Number of 52-card sets in the deck
+        rng (RandomStream, optional): Random number generator to shuffle with; a new one by
+            default
+        num_cards (int, optional): Number of cards a game can draw, at most 52*num_decks;
+            2*players + 8 covers a game of HoldemGame
+        batch (int, optional): Number of games shuffled at once
+    """
+    DEF_BATCH = 4096
+
+    def __init__(self, num_decks, rng=None, num_cards=None, batch=DEF_BATCH):
+        StackedDeck.__init__(self, num_decks)
+        if rng is not None:
+            self.rng = rng
+        self.num_cards = num_cards or 52 * num_decks
+        self.batch = batch
+        self._orders = []
+        self.reset()
+
+    def reset(self):
+        if not self._orders:
+            self._orders = self.rng.deals(self.batch, self.num_cards, self.num_decks).tolist()
+            self._orders.reverse()
+        self.stack([CARDS[i] for i in self._orders.pop()])
+
 
 class Player:
     """
@@ -98,6 +360,10 @@ class Player:
         bankrupt (boolean): Denotes whether or not the player has gone bankrupt
         hand (int): Type of hand the player has at end of game
         kickers (int[]): List of ranks of cards used case of tiebreaker at end of game
+        strength (int): Comparable hand strength at end of game (see hand_evaluator)
+        hand_state (HandState): Evaluation state of the player's cards and the revealed flop
+            cards, for querying the current hand and draws during play
+        hand_mask (int): Bitmask of card1 and card2
     """
     DEF_BALANCE = 10000
 
@@ -111,6 +377,12 @@ class Player:
         self.bankrupt = False
         self.hand = 0
         self.kickers = []
+        self.strength = 0
+        self.hand_state = hand_evaluator.HandState()
+
+    @property
+    def hand_mask(self):
+        return self.card1.mask | self.card2.mask
 
 
 class HoldemGame:
@@ -122,10 +394,16 @@ class HoldemGame:
 
     Args:
         num_decks (int): Number of 52-card sets to be initialized in Deck object
+        verbose (boolean, optional): Print a message when a move is rejected or adjusted
+        rng (random.Random, optional): Random number generator the deck shuffles with; a
+            new RandomStream by default, so every game has its own
+        keep_history (boolean, optional): Keep the history of moves even when nothing
+            observes the game
 
     Attributes:
         deck (Deck): Deck of cards to be drawn from for the current game
         num_decks (int): Number of 52-card sets to be initialized in Deck object
+        verbose (boolean): Print a message when a move is rejected or adjusted
         card1 (Card): First card in the 5-card flop
         card2 (Card): Second card in the 5-card flop
         card3 (Card): Third card in the 5-card flop
@@ -134,21 +412,33 @@ class HoldemGame:
         pot (int): Amount of money currently in the pot
         bid (int): Current highest bid from any player
         lastraise (int): Last amount the bid was raised by
-        players (Player[]): List of all players in the game
+        players (Player[]): List of all players in the game, in seating order
+        actor (int): Seat index in players of the player whose turn it is
         dealer (Player): Current dealer
         movecounter (int): Tracks how many non-volatile moves left in round
+        betting_round (int): Current betting round; 0 is the round before the deal, 1 the
+            round before the flop is revealed, up to 4 after its fifth card
+        history (tuple[]): (betting_round, seat, Moves enum, amount) of every move made this
+            game, where amount is what was bid or raised by for RAISE_BID and 0 otherwise;
+            only kept while keep_history is set or the game has observers
+        keep_history (boolean): Keep the history even when nothing observes the game
+        observers (object[]): Objects told about every move, through an
+            observe_move(game, seat, move, amount) method called before the move takes
+            effect, and about the end of every game, through an observe_end(game) method
         players_left (int): Tracks how many players haven't folded/bankrupted
         winners (Player[]): List of players who win the pot at end of game
         tiebreaker (boolean): Denotes whether or not a tiebreaker was used to decide winner(s)
         tiebreaker_value (int): Card rank that broke a tie, if there was one
         everyone_folded (boolean): Denotes whether or not all except one player has folded
+        board_mask (int): Bitmask of the revealed cards in the flop
     """
     BASE_BID = 0
     DEF_NUM_DECKS = 1
 
-    def __init__(self, num_decks=DEF_NUM_DECKS):
-        self.deck = Deck(num_decks)
+    def __init__(self, num_decks=DEF_NUM_DECKS, verbose=True, rng=None, keep_history=True):
+        self.deck = Deck(num_decks, rng)
         self.num_decks = num_decks
+        self.verbose = verbose
         self.card1 = Card()
         self.card2 = Card()
         self.card3 = Card()
@@ -158,8 +448,16 @@ class HoldemGame:
         self.bid = self.BASE_BID
         self.lastraise = 0
         self.players = []
+        self.actor = 0
         self.dealer = None
+        self._dealer_seat = 0
+        self._in_hand = 0 #bit per seat that hasn't folded
+        self._active = 0 #bit per seat that can still make moves
         self.movecounter = 0
+        self.betting_round = 0
+        self.history = []
+        self.keep_history = keep_history
+        self.observers = []
         self.players_left = 0
         self.finished = False
         self.winners = []
@@ -167,195 +465,91 @@ class HoldemGame:
         self.tiebreaker_value = 0
         self.everyone_folded = False
 
+    @property
+    def board_mask(self):
+        return (self.card1.mask | self.card2.mask | self.card3.mask | self.card4.mask |
+                    self.card5.mask)
+
+    @staticmethod
+    def _seat_from(seats, seat):
+        """
+        Helper function to find the first seat at or after the given one, wrapping around
+        the table, whose bit is set in a mask of seats. Returns None if the mask is empty.
+        """
+        later = seats >> seat
+        if later:
+            return seat + (later & -later).bit_length() - 1
+        if seats:
+            return (seats & -seats).bit_length() - 1
+        return None
+
+    def _rotation(self):
+        """Helper function to list the players in turn order, starting from the actor."""
+        return self.players[self.actor:] + self.players[:self.actor]
+
+    def _remove_active(self, fold=False):
+        """
+        Helper function to take the actor out of the seats that can make moves, and out of
+        the hand as well if they fold.
+        """
+        bit = 1 << self.actor
+        self._active &= ~bit
+        if fold:
+            self._in_hand &= ~bit
+
     def _next_player(self):
         """
-        Helper function to rotate the players queue until it reaches the
-        next player who is still able to make moves.
-        """
-        #next player to have a turn is always at index 0
-        temp = self.players.pop(0)
-        self.players.append(temp)
-        while self.players[0].folded or self.players[0].bankrupt:
-            temp = self.players.pop(0)
-            self.players.append(temp)
-
-    def _is_straight(self, player, card_ranks, regular, royal):
-        """
-        Helper function used by _set_player_hand() to generate kickers for
-        any hand that is considered to have a straight.
-        """
-        #royal and regular must be 0 or 1, denoting the range of straights to check for
-        for i in range(Ranks.NINE+royal, Ranks.NINE-(8*regular), -1):
-            if (i in card_ranks and i+1 in card_ranks and i+2 in card_ranks and
-                        i+3 in card_ranks and i+4 in card_ranks):
-                player.kickers.append(i+4)
-                return True
-        if (regular and Ranks.ACE in card_ranks and Ranks.TWO in card_ranks and Ranks.THREE
-                    in card_ranks and Ranks.FOUR in card_ranks and Ranks.FIVE in card_ranks):
-            player.kickers.append(Ranks.FIVE)
-            return True
-        return False
+        Helper function to pass the turn to the next player who is still able to make
+        moves.
+        """
+        #_seat_from() inlined, as this runs after most moves
+        active = self._active
+        seat = (self.actor + 1) % len(self.players)
+        later = active >> seat
+        if later:
+            self.actor = seat + (later & -later).bit_length() - 1
+        elif active:
+            self.actor = (active & -active).bit_length() - 1
 
-    def _set_player_hand(self, player, card_ranks, card_suits, rank_counts, suit_counts):
+    def _set_player_hand(self, player):
         """
         Helper function used by _resolve_winnings() to determine the player's hand strength
         and generate kickers to be used as potential tiebreakers.
         """
-        #ROYAL/STRAIGHT FLUSH
-        if 5 in suit_counts or 6 in suit_counts or 7 in suit_counts:
-            #separate cards that are part of the flush
-            flush_suit = suit_counts.index(max(suit_counts))
-            flush_hand = []
-            for i in range(7):
-                if card_suits[i] == flush_suit:
-                    flush_hand.append(card_ranks[i])
-            #ROYAL FLUSH
-            if self._is_straight(player, flush_hand, 0, 1):
-                player.hand = Hands.ROYAL_FLUSH
-                return
-            #STRAIGHT_FLUSH
-            elif self._is_straight(player, flush_hand, 1, 0):
-                player.hand = Hands.STRAIGHT_FLUSH
-                return
-        #FOUR OF A KIND
-        if 4 in rank_counts or 5 in rank_counts or 6 in rank_counts or 7 in rank_counts:
-            player.hand = Hands.FOUR_OF_A_KIND
-            while len(player.kickers) < 5:
-                temp = rank_counts.index(max(rank_counts))
-                if temp in card_ranks:
-                    player.kickers.append(temp)
-                    card_ranks.remove(temp)
-                else:
-                    player.kickers.append(max(card_ranks))
-        #FULL HOUSE
-        elif (2 in rank_counts and 3 in rank_counts) or rank_counts.count(3) == 2:
-            player.hand = Hands.FULL_HOUSE
-            while len(player.kickers) < 5 and 3 in rank_counts:
-                temp = len(rank_counts)-1 - rank_counts[::-1].index(3) #get index of last 3
-                while len(player.kickers) < 5 and temp in card_ranks:
-                    player.kickers.append(temp)
-                    card_ranks.remove(temp)
-                rank_counts[temp] = 0
-            while len(player.kickers) < 5:
-                temp = rank_counts.index(2)
-                while temp in card_ranks:
-                    player.kickers.append(temp)
-                    card_ranks.remove(temp)
-        #FLUSH
-        elif 5 in suit_counts or 6 in suit_counts or 7 in suit_counts:
-            player.hand = Hands.FLUSH
-            #separate cards that are part of the flush
-            flush_suit = suit_counts.index(max(suit_counts))
-            flush_hand = []
-            for i in range(7):
-                if card_suits[i] == flush_suit:
-                    flush_hand.append(card_ranks[i])
-            for _ in range(5):
-                temp = max(flush_hand)
-                player.kickers.append(temp)
-                flush_hand.remove(temp)
-        #STRAIGHT
-        elif self._is_straight(player, card_ranks, 1, 1):
-            player.hand = Hands.STRAIGHT
-        #THREE OF A KIND
-        elif 3 in rank_counts:
-            player.hand = Hands.THREE_OF_A_KIND
-            temp = rank_counts.index(3)
-            for _ in range(3):
-                player.kickers.append(temp)
-                card_ranks.remove(temp)
-            for _ in range(2):
-                temp = max(card_ranks)
-                player.kickers.append(temp)
-                card_ranks.remove(temp)
-        #TWO PAIR
-        elif rank_counts.count(2) >= 2:
-            player.hand = Hands.TWO_PAIR
-            while len(player.kickers) < 4 and 2 in rank_counts:
-                temp = len(rank_counts)-1 - rank_counts[::-1].index(2) #get index of last 2
-                while temp in card_ranks:
-                    player.kickers.append(temp)
-                    card_ranks.remove(temp)
-                rank_counts[temp] = 0
-            player.kickers.append(max(card_ranks))
-        #PAIR
-        elif 2 in rank_counts:
-            player.hand = Hands.PAIR
-            temp = rank_counts.index(2)
-            for _ in range(2):
-                player.kickers.append(temp)
-                card_ranks.remove(temp)
-            for _ in range(3):
-                temp = max(card_ranks)
-                player.kickers.append(temp)
-                card_ranks.remove(temp)
-        #HIGH CARD
-        else:
-            player.hand = Hands.HIGH_CARD
-            for _ in range(5):
-                temp = max(card_ranks)
-                player.kickers.append(temp)
-                card_ranks.remove(temp)
+        player.strength = player.hand_state.strength()
+        player.hand = hand_evaluator.hand_type(player.strength)
+        player.kickers = hand_evaluator.kickers(player.strength)
 
     def _set_winners(self):
         """
         Helper function used by _resolve_winnings() to determine which player(s)
         win the current game and get the money in the pot.
         """
-        self.winners = []
-        tiebreakers = []
-        for p in self.players:
-            tiebreakers.append(p.hand)
-        maxval = max(tiebreakers)
-        for p in self.players:
-            if p.hand == maxval:
-                self.winners.append(p)
-        if len(self.winners) == 1:
-            self.tiebreaker = False
-            return
-        kicker_count = len(self.winners[0].kickers)
-        for i in range(kicker_count):
-            tiebreakers = []
-            for p in self.winners:
-                tiebreakers.append(p.kickers[i])
-            maxval = max(tiebreakers)
-            for p in self.winners:
-                if p.kickers[i] < maxval:
-                    self.winners.remove(p)
-            if len(self.winners) == 1:
-                self.tiebreaker = True
-                self.tiebreaker_value = maxval
-                return
+        contenders = [p for p in self._rotation() if not p.folded]
+        maxval = max(p.strength for p in contenders)
+        self.winners = [p for p in contenders if p.strength == maxval]
         self.tiebreaker = False
-        return
+        if len(self.winners) > 1:
+            return
+        #a tiebreaker was used if anyone else had the same type of hand
+        beaten = [p.strength for p in contenders if p.strength != maxval and
+                        hand_evaluator.hand_type(p.strength) == self.winners[0].hand]
+        if beaten:
+            self.tiebreaker = True
+            self.tiebreaker_value = hand_evaluator.tiebreak_rank(maxval, max(beaten))
 
     def _resolve_winnings(self):
         """
         Helper function used by _resolve_game() to perform end-of-game resolutions.
         """
         if self.everyone_folded:
-            for p in self.players:
-                if not p.folded:
-                    self.winners.append(p)
-                    break
+            self.winners.append(self.players[self._seat_from(self._in_hand, self.actor)])
         else:
             for p in self.players:
-                #cumulate hand values
-                card_ranks = [p.card1.rank, p.card2.rank, self.card1.rank, self.card2.rank,
-                                    self.card3.rank, self.card4.rank, self.card5.rank]
-                card_suits = [p.card1.suit, p.card2.suit, self.card1.suit, self.card2.suit,
-                                    self.card3.suit, self.card4.suit, self.card5.suit]
-                rank_counts = [card_ranks.count(Ranks.TWO), card_ranks.count(Ranks.THREE),
-                                card_ranks.count(Ranks.FOUR), card_ranks.count(Ranks.FIVE),
-                                card_ranks.count(Ranks.SIX), card_ranks.count(Ranks.SEVEN),
-                                card_ranks.count(Ranks.EIGHT), card_ranks.count(Ranks.NINE),
-                                card_ranks.count(Ranks.TEN), card_ranks.count(Ranks.JACK),
-                                card_ranks.count(Ranks.QUEEN), card_ranks.count(Ranks.KING),
-                                card_ranks.count(Ranks.ACE)]
-                suit_counts = [card_suits.count(Suits.CLUBS), card_suits.count(Suits.DIAMONDS),
-                                card_suits.count(Suits.HEARTS), card_suits.count(Suits.SPADES)]
-
-                self._set_player_hand(p, card_ranks, card_suits, rank_counts, suit_counts)
+                if p.folded:
+                    #players can fold before being dealt, so only score those still in
+                    continue
+                self._set_player_hand(p)
             self._set_winners()
         num_winners = len(self.winners)
         for p in self.winners:
@@ -369,30 +563,44 @@ class HoldemGame:
         self.finished = True
         self._resolve_winnings()
         #reset next player after dealer to first
-        while self.players[0] != self.dealer:
-            temp = self.players.pop(0)
-            self.players.append(temp)
-        temp = self.players.pop(0)
-        self.players.append(temp)
+        self.actor = (self._dealer_seat + 1) % len(self.players)
+        for o in self.observers:
+            o.observe_end(self)
+
+    def _record_move(self, move, amount):
+        """Helper function to add the actor's move to the history and tell every observer."""
+        self.history.append((self.betting_round, self.actor, move, amount))
+        for o in self.observers:
+            o.observe_move(self, self.actor, move, amount)
+
+    def _reveal(self, cards):
+        """
+        Helper function to add newly revealed flop cards to the hand state of every player
+        still in the game.
+        """
+        for p in self.players:
+            if not p.folded:
+                p.hand_state.add_cards(cards)
 
     def _resolve_game_abrupt(self):
         """
         Helper function used to draw all cards without actions being taken and end the game, in the
         situation where all or all but one player has folded/brankrupted.
         """
-        if self.players[0].card1.rank is None:
+        if self.players[self.actor].card1.rank is None:
             self.deal()
         if self.card1.rank is None:
             self.deck.draw_card() #burn one as per standard poker rules (pointless, i know)
-            self.card1 = self.deck.draw_card()
-            self.card2 = self.deck.draw_card()
-            self.card3 = self.deck.draw_card()
+            self.card1, self.card2, self.card3 = self.deck.deal_many(3)
+            self._reveal((self.card1, self.card2, self.card3))
         if self.card4.rank is None:
             self.deck.draw_card() #burn one as per standard poker rules (pointless, i know)
             self.card4 = self.deck.draw_card()
+            self._reveal((self.card4,))
         if self.card5.rank is None:
             self.deck.draw_card() #burn one as per standard poker rules (pointless, i know)
             self.card5 = self.deck.draw_card()
+            self._reveal((self.card5,))
         self._resolve_game()
 
     def _process_round(self):
@@ -410,7 +618,8 @@ class HoldemGame:
             #game should end before more turns are taken
             self._resolve_game_abrupt()
             return
-        if self.players[0].card1.rank is None:
+        self.betting_round += 1
+        if self.players[self.actor].card1.rank is None:
             #hands haven't been dealt yet
             self.deal()
         else:
@@ -419,22 +628,38 @@ class HoldemGame:
                 #burn one as per standard poker rules (pointless, i know)
                 self.deck.draw_card()
             if self.card1.rank is None:
-                self.card1 = self.deck.draw_card()
-                self.card2 = self.deck.draw_card()
-                self.card3 = self.deck.draw_card()
+                self.card1, self.card2, self.card3 = self.deck.deal_many(3)
+                self._reveal((self.card1, self.card2, self.card3))
             elif self.card4.rank is None:
                 self.card4 = self.deck.draw_card()
+                self._reveal((self.card4,))
             elif self.card5.rank is None:
                 self.card5 = self.deck.draw_card()
+                self._reveal((self.card5,))
             else:
                 self._resolve_game()
                 return
         #reset next non-folded player after dealer to first
-        while self.players[0] != self.dealer:
-            temp = self.players.pop(0)
-            self.players.append(temp)
+        self.actor = self._dealer_seat
         self._next_player()
 
+    def _end_turn(self):
+        """
+        Helper function used at the end of every move to process the round if it's over, or
+        pass the turn on otherwise.
+        """
+        if self.movecounter and self.players_left:
+            #the round goes on; _next_player() inlined, as this is the common case
+            active = self._active
+            seat = (self.actor + 1) % len(self.players)
+            later = active >> seat
+            if later:
+                self.actor = seat + (later & -later).bit_length() - 1
+            elif active:
+                self.actor = (active & -active).bit_length() - 1
+        elif not self._end_move():
+            self._next_player()
+
     def _end_move(self):
         """
         Helper function used after a move to either end the current game abruptly
@@ -445,6 +670,7 @@ class HoldemGame:
             self._resolve_game_abrupt()
             for p in self.players:
                 p.bankrupt = False
+            self._active = self._in_hand
         elif self.movecounter == 0:
             self._process_round()
             return True
@@ -458,16 +684,20 @@ class HoldemGame:
             player (Player): The Player object to be added
         """
         self.players.append(player)
+        if not (player.folded or player.bankrupt):
+            bit = 1 << (len(self.players) - 1)
+            self._in_hand |= bit
+            self._active |= bit
 
     def deal(self):
         """Deals two cards to each player."""
         #deal one card at a time, as per standard poker rules (pointless, i know)
-        for p in self.players:
-            if p.folded == False:
-                p.card1 = self.deck.draw_card()
-        for p in self.players:
-            if p.folded == False:
-                p.card2 = self.deck.draw_card()
+        dealt = [p for p in self._rotation() if p.folded == False]
+        cards = self.deck.deal_many(2 * len(dealt))
+        for i, p in enumerate(dealt):
+            p.card1 = cards[i]
+            p.card2 = cards[len(dealt) + i]
+            p.hand_state.add_cards((p.card1, p.card2))
 
     def shuffle(self):
         """
@@ -477,32 +707,41 @@ class HoldemGame:
         and rotating the dealer to the next player after them.
         """
         #reset cards
-        self.deck = Deck(self.num_decks)
+        if self.deck.num_decks == self.num_decks:
+            self.deck.reset()
+        else:
+            self.deck = Deck(self.num_decks, self.deck.rng)
         for p in self.players:
-            p.card1 = Card()
-            p.card2 = Card()
+            p.card1 = _NO_CARD
+            p.card2 = _NO_CARD
             p.bid = 0
             p.folded = False
             p.bankrupt = False
             p.hand = 0
             p.kickers = []
+            p.strength = 0
+            p.hand_state.reset()
             if p.balance == 0:
                 p.balance = Player.DEF_BALANCE
-        self.card1 = Card()
-        self.card2 = Card()
-        self.card3 = Card()
-        self.card4 = Card()
-        self.card5 = Card()
+        self.card1 = _NO_CARD
+        self.card2 = _NO_CARD
+        self.card3 = _NO_CARD
+        self.card4 = _NO_CARD
+        self.card5 = _NO_CARD
         self.bid = self.BASE_BID
         self.lastraise = 0
         self.pot = 0
         self.movecounter = len(self.players)
+        self.betting_round = 0
+        self.history = []
         self.players_left = len(self.players)
         self.finished = False
         self.everyone_folded = False
         self.winners = []
+        self._in_hand = self._active = (1 << len(self.players)) - 1
         #rotate dealer
-        self.dealer = self.players[0]
+        self._dealer_seat = self.actor
+        self.dealer = self.players[self.actor]
         self._next_player()
 
     def is_next(self, player):
@@ -515,11 +754,31 @@ class HoldemGame:
         Returns:
             True if player is next, False otherwise.
         """
-        if self.players[0] == player:
+        if self.players[self.actor] is player:
             return True
         else:
             return False
 
+    def act(self, player, move, amount=0):
+        """
+        Performs the action for the specified player named by a Moves enum.
+
+        Args:
+            player (Player): The player to perform the action
+            move (int): Moves enum of the action
+            amount (int, optional): The amount of money to bid/raise, for RAISE_BID
+
+        Returns:
+            True if successful, False otherwise.
+        """
+        if move == Moves.FOLD:
+            return self.fold(player)
+        elif move == Moves.CHECK:
+            return self.check(player)
+        elif move == Moves.CALL:
+            return self.call(player)
+        return self.make_bid(player, amount)
+
     def make_bid(self, player, amount):
         """
         Performs a raise or bid action for the specified player.
@@ -535,20 +794,25 @@ class HoldemGame:
             True if successful, False otherwise.
         """
         #check if it's the player's turn
-        if not self.is_next(player):
-            print "it's not the player's turn yet"
+        if self.players[self.actor] is not player:
+            if self.verbose:
+                print "it's not the player's turn yet"
             return False
         #check if bid/raise is actually a call
         if amount == 0:
             return self.call(player)
         #check if player's balance is too low or bid isn't high enough
         if amount < self.lastraise:
-            print "invalid bid. try again."
+            if self.verbose:
+                print "invalid bid. try again."
             return False
         elif player.balance < amount + self.bid - player.bid:
-            print "player needs more money to raise."
+            if self.verbose:
+                print "player needs more money to raise."
             return False
         else:
+            if self.keep_history or self.observers:
+                self._record_move(Moves.RAISE_BID, amount)
             self.movecounter = self.players_left #reset number of non-volatile moves to be performed.
             self.movecounter -= 1 #this move counts whether volatile or not
             if self.lastraise < amount:
@@ -561,9 +825,9 @@ class HoldemGame:
             if player.balance == 0:
                 self.players_left -= 1 #the player can't make moves until next round
                 player.bankrupt = True
+                self._remove_active()
             #turn is over. ready next player's turn.
-            if not self._end_move():
-                self._next_player()
+            self._end_turn()
             return True
 
     def call(self, player):
@@ -579,29 +843,34 @@ class HoldemGame:
             True if successful, False otherwise.
         """
         #check if it's the player's turn
-        if not self.is_next(player):
-            print "it's not the player's turn yet"
+        if self.players[self.actor] is not player:
+            if self.verbose:
+                print "it's not the player's turn yet"
             return False
         elif player.bid == self.bid:
-            print "player has already bid enough. checking instead."
+            if self.verbose:
+                print "player has already bid enough. checking instead."
             return self.check(player)
         else:
+            if self.keep_history or self.observers:
+                self._record_move(Moves.CALL, 0)
             #player went all in
             if player.balance <= self.bid - player.bid:
-                print "player went all in!"
+                if self.verbose:
+                    print "player went all in!"
                 self.pot += player.balance
                 player.bid += player.balance
                 player.balance = 0
                 self.players_left -= 1 #the player can't make moves until next round
                 player.bankrupt = True
+                self._remove_active()
             else:
                 self.pot += self.bid - player.bid
                 player.balance -= self.bid - player.bid
                 player.bid = self.bid
             self.movecounter -= 1
             #turn is over. ready next player's turn.
-            if not self._end_move():
-                self._next_player()
+            self._end_turn()
             return True
 
     def check(self, player):
@@ -617,17 +886,20 @@ class HoldemGame:
             True if successful, False otherwise.
         """
         #check if it's the player's turn
-        if not self.is_next(player):
-            print "it's not the player's turn yet"
+        if self.players[self.actor] is not player:
+            if self.verbose:
+                print "it's not the player's turn yet"
             return False
         if player.bid < self.bid:
-            print "player can't check right now."
+            if self.verbose:
+                print "player can't check right now."
             return False
         else:
+            if self.keep_history or self.observers:
+                self._record_move(Moves.CHECK, 0)
             self.movecounter -= 1
             #turn is over. ready next player's turn.
-            if not self._end_move():
-                self._next_player()
+            self._end_turn()
             return True
 
     def fold(self, player):
@@ -644,17 +916,20 @@ class HoldemGame:
             True if successful, False otherwise.
         """
         #check if it's the player's turn
-        if not self.is_next(player):
-            print "it's not the player's turn yet"
+        if self.players[self.actor] is not player:
+            if self.verbose:
+                print "it's not the player's turn yet"
             return False
+        if self.keep_history or self.observers:
+            self._record_move(Moves.FOLD, 0)
         self.movecounter -= 1
         self.players_left -= 1
         player.folded = True
+        self._remove_active(fold=True)
         #turn is over. ready next player's turn.
         if self.players_left == 1:
             self.everyone_folded = True
             self._resolve_game()
             return True
-        if not self._end_move():
-            self._next_player()
+        self._end_turn()
         return True